@@ -37,11 +37,10 @@ if (not path.exists(input_drainage_database)):
 print("INFO: Input drainage database file: %s" % input_drainage_database)
 
 # Read the input drainage database file.
+# Only the 'DA' attribute is read from the file (other attributes are skipped).
 print("INFO: Reading %s." % input_drainage_database)
 drainage_r2c = r2cfile()
-r2cgridfromr2c(drainage_r2c, input_drainage_database)
-r2cmetafromr2c(drainage_r2c, input_drainage_database)
-r2cattributesfromr2c(drainage_r2c, input_drainage_database)
+r2cfromr2c(drainage_r2c, input_drainage_database, attributes = ["DA"])
 
 # Gather necessary attributes to derive information about the domain.
 drainage_area = []
@@ -60,8 +59,7 @@ if (drainage_area == []):
 # This example compacted to just the basic commands:
 print("INFO: Re-running 'Example 1' (basic commands only)...")
 drainage_r2c = r2cfile()
-r2cgridfromr2c(drainage_r2c, input_drainage_database)
-r2cattributesfromr2c(drainage_r2c, input_drainage_database)
+r2cfromr2c(drainage_r2c, input_drainage_database, readmeta = False, attributes = ["DA"])
 drainage_area = []
 for i, a in enumerate(drainage_r2c.attr):
     if (a.AttributeName.lower() == "da"):
@@ -93,19 +91,17 @@ print("INFO: Input data file: %s" % input_data_file)
 # Read header information from the file.
 print("INFO: Reading %s." % input_data_file)
 qo_r2c = r2cfile()
-r2cgridfromr2c(qo_r2c, input_data_file)
 
 # Read the time-series from the file (this process can take a while).
 print("INFO: Reading all records from file...")
-r2cattributesfromr2c(qo_r2c, input_data_file)
+r2cfromr2c(qo_r2c, input_data_file, readmeta = False)
 print("INFO: Complete.")
 
 # End of documented example.
 # This example compacted to just the basic commands:
 print("INFO: Re-running 'Example 2' (basic commands only)...")
 qo_r2c = r2cfile()
-r2cgridfromr2c(qo_r2c, input_data_file)
-r2cattributesfromr2c(qo_r2c, input_data_file)
+r2cfromr2c(qo_r2c, input_data_file, readmeta = False)
 print("INFO: Complete.")
 
 # Print some indicative items from the data to illustrate the field...
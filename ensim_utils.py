@@ -1,10 +1,22 @@
 #!/usr/bin/python
 
 # Import base pacakges.
+import bz2
+import gzip
+import hashlib
+import io
+import lzma
+import multiprocessing
+from multiprocessing import shared_memory
+import os
 from os import path
+import queue
+import threading
 from time import gmtime, strftime, mktime
-from datetime import datetime
+from datetime import datetime, timedelta
+import re
 import shlex
+import warnings
 import numpy as np
 import pandas as pd
 
@@ -27,6 +39,120 @@ except:
 	rmn = rmn_z()
 	RUNRPNPY = False
 
+# Import zstandard if the library exists.
+# The library is only required to read and write 'zstd' compressed files.
+RUNZSTD = True
+try:
+	import zstandard
+except:
+	RUNZSTD = False
+
+# Import netCDF4 if the library exists.
+# The library is only required to read and write netCDF format files.
+RUNNETCDF = True
+try:
+	import netCDF4
+except:
+	RUNNETCDF = False
+
+# Import scipy if the library exists.
+# The library is only used to apply interpolation weights as sparse matrices (see 'fstweightsapply'); otherwise, the weights are applied using numpy.
+RUNSCIPY = True
+try:
+	import scipy.sparse
+except:
+	RUNSCIPY = False
+
+# Compression of files identified by extension (see 'filecompression').
+FILECOMPRESSIONEXTENSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz', '.zst': 'zstd'}
+
+# Compression of files identified by the leading bytes of the file (see 'filecompression').
+FILECOMPRESSIONMAGIC = [(b'\x1f\x8b', 'gzip'), (b'BZh', 'bz2'), (b'\xfd7zXZ\x00', 'xz'), (b'\x28\xb5\x2f\xfd', 'zstd')]
+
+# Number of frames after which 'r2cframewriter' flushes the file. If '0', the file is only flushed when the buffer is full or the file is closed.
+R2CFLUSHFRAMES = 0
+
+# Maximum number of frames waiting to be written by each thread of 'r2cbackgroundwriter'.
+R2CWRITEQUEUESIZE = 64
+
+# Number of frames in each chunk of multi-frame variables in netCDF format files (see 'ncvariablefromattribute').
+NCCHUNKFRAMES = 24
+
+# Level of zlib compression (1-9) of variables in netCDF format files.
+NCCOMPLEVEL = 4
+
+# Type of the values of non-integer variables in netCDF format files (e.g., 'f4' or 'f8').
+NCDTYPE = 'f4'
+
+# Units of the time coordinate in netCDF format files.
+NCTIMEUNITS = 'seconds since 1970-01-01 00:00:00'
+
+# Number of frames by which the array of multi-frame 'r2c' data is grown when read from file.
+R2CFRAMECHUNK = 256
+
+# Maximum number of values of single-frame attributes formatted together when written to 'r2c' format files (see 'r2cfileappendattributes').
+R2CFORMATBLOCKSIZE = 1024*1024
+
+# Number of processes used to format single-frame attributes written to 'r2c' format files (see 'r2cfileappendattributes'). If '1', attributes are formatted serially.
+# Independent of 'R2CPROCESSES', which sets the processes used to read files. The same guard of "if __name__ == '__main__':" applies (see 'R2CPROCESSES').
+R2CFORMATPROCESSES = 1
+
+# Minimum number of values of the attributes written by 'r2cfileappendattributes' to format in parallel. Fewer values are formatted serially.
+R2CFORMATPARALLELMINVALUES = 8*1024*1024
+
+# Number of records formatted together when written to 'tb0' format files (see 'tb0filewriterecords').
+TB0RECORDCHUNK = 4096
+
+# Size of the blocks read from file when scanning for ':Frame' markers (bytes).
+R2CSCANBLOCKSIZE = 16*1024*1024
+
+# Size of the buffer used to read 'r2c' and 'tb0' format files (bytes).
+R2CBUFFERSIZE = 1024*1024
+
+# Type of the arrays of data read from 'r2c' format files (e.g., 'np.float64' or 'np.float32').
+R2CDTYPE = np.float64
+
+# Frame indices of multi-frame 'r2c' files already scanned in this session (indexed by the absolute path of the file).
+R2CFRAMEINDEXCACHE = {}
+
+# Number of processes used to read multi-frame 'r2c' format files (see 'r2cattributedatafromr2cparallel'). If '1', files are read serially.
+# On platforms that start new processes by 'spawn' (e.g., Windows), scripts that use more than one process must guard their code with "if __name__ == '__main__':".
+R2CPROCESSES = 1
+
+# Minimum size of multi-frame 'r2c' format files read in parallel (bytes). Smaller files are read serially.
+R2CPARALLELMINSIZE = 64*1024*1024
+
+# If 'True', the data read from 'r2c' format files are saved to binary cache files, which are loaded instead of parsing the file again (see 'r2ccachepath').
+R2CCACHE = False
+
+# Directory of the cache files. If 'None', the cache files are saved beside the 'r2c' format file.
+R2CCACHEDIR = None
+
+# Maximum total size of the cache files in 'R2CCACHEDIR' (bytes). If 'None', cache files are never removed.
+R2CCACHEMAXSIZE = None
+
+# Grids of records read from standard files (fst) in this session (indexed by the grid descriptors of the records, see 'fstgridfromrecord').
+FSTGRIDCACHE = {}
+
+# Active ezscint interpolation set ('Set', as the pair of grid ids) and interpolation degree ('InterpDegree') (see 'fstezdefset' and 'fstezsetinterp').
+FSTEZSTATE = {'Set': None, 'InterpDegree': None}
+
+# Hit and miss counters of the grid cache, interpolation sets, and interpolation weights (see 'fstcachestats').
+# 'WeightsRejected' counts the records interpolated by ezscint because the weights were rejected (see 'fstweightsfromrecord'); these are not hits.
+FSTCACHESTATS = {'GridHits': 0, 'GridMisses': 0, 'SetHits': 0, 'SetMisses': 0, 'WeightsHits': 0, 'WeightsMisses': 0, 'WeightsRejected': 0}
+
+# If 'True', nearest and linear interpolation of fields read from standard files (fst) use precomputed interpolation weights instead of ezscint (see 'r2cfieldfromrecord').
+FSTWEIGHTS = False
+
+# Directory of the interpolation weight files (see 'fstweightsfromrecord'). If 'None', weights are only kept in memory for the session.
+FSTWEIGHTSDIR = None
+
+# Largest difference of fields interpolated using computed weights and ezscint, relative to the largest absolute value of the field (at least 1).
+FSTWEIGHTSTOLERANCE = 1.0e-4
+
+# Interpolation weights in this session (indexed by the key of the weights, see 'fstweightskey'); 'None' if the weights are not used.
+FSTWEIGHTSCACHE = {}
+
 # Structures.
 # Variable structures used across routines.
 
@@ -73,6 +199,14 @@ class r2cattribute(object):
 		self.AttributeData = AttributeData
 		self.FrameCount = 0
 
+		# Time-stamps of multi-frame attributes ('datetime64' array, one per frame).
+		self.FrameTimes = None
+
+		# Number of significant digits ('%.Ng') or fixed decimals ('%.Nf') of values printed to file (see 'r2cattributeformat').
+		# If both are 'None', values are printed using '%g'.
+		self.AttributeDigits = None
+		self.AttributeDecimals = None
+
 # Generic structure for 'r2c' file format.
 class r2cfile(object):
 	def __init__(self):
@@ -80,7 +214,20 @@ class r2cfile(object):
 		self.grid = r2cgrid()
 		self.attr = []
 
+# Byte offsets and time-stamps of the frames in a multi-frame 'r2c' format file.
+# 'FileSize' and 'FileMTime' (nanoseconds) identify the version of the file that was indexed.
+# 'FrameOffsets' are the byte offsets of the ':Frame' markers from the start of the file.
+class r2cframeindex(object):
+	def __init__(self):
+		self.FilePath = ''
+		self.FileSize = 0
+		self.FileMTime = 0
+		self.FrameOffsets = np.zeros(0, dtype = np.int64)
+		self.FrameNumbers = np.zeros(0, dtype = np.int64)
+		self.FrameTimes = np.zeros(0, dtype = 'datetime64[s]')
+
 # Meta information listed in tb0 format files.
+# 'DeltaT' and 'RoutingDeltaT' are numbers of hours or 'timedelta' (see 'tb0deltatfromstring').
 class tb0meta(object):
 	def __init__(self):
 		self.StartTime = None
@@ -99,20 +246,52 @@ class tb0column(object):
 		self.ColumnData = None
 
 # Generic structure for 'tb0' file format.
+# 'Data' is the (records, columns) array of the data read from file (see 'tb0columnsfromtb0'), if read.
+# 'TimeIndex' is the array of the time-stamps of the records, built when first requested (see 'tb0timeindex').
 class tb0file(object):
 	def __init__(self):
 		self.meta = None
 		self.proj = r2cgrid()
 		self.cols = []
 		self.RecordCount = 0
+		self.Data = None
+		self.TimeIndex = None
+		self.TimeIndexKey = None
+
+# Interpolation weights from a source grid to a target grid (see 'fstweightsfromgrids').
+# 'SourceI' and 'SourceJ' are the indices of the source cells used by the weights; 'Columns' and 'Weights' are the (points, 1) ('nearest')
+# or (points, 4) ('linear') arrays of the positions of the source cells in 'SourceI' and 'SourceJ' and their weights for the points of the target grid.
+# 'Matrix' is the sparse matrix of the weights, built when first applied (see 'fstweightsapply').
+class fstweights(object):
+	def __init__(self):
+		self.Key = ''
+		self.InterpDegree = None
+		self.TargetShape = (0, 0)
+		self.SourceShape = (0, 0)
+		self.SourceI = np.zeros(0, dtype = np.int64)
+		self.SourceJ = np.zeros(0, dtype = np.int64)
+		self.Columns = np.zeros((0, 1), dtype = np.int64)
+		self.Weights = np.zeros((0, 1))
+		self.Matrix = None
 
 # Generic structure for conversion field ('fst' to 'r2c').
 # This structure is only used with standard file (fst) format.
+# 'fileformat' is the format of the output file ('r2c', 'seq', or 'nc'); if 'None', the format is derived from the extension of the file ('.seq', '.nc'; see 'framewriterfromfield').
 class r2cconversionfieldfromfst(object):
-	def __init__(self, fpathr2cout, fstnomvar, AttributeName, AttributeType = None, AttributeUnits = None, fpathsystem = 'hrdps', fstetiket = ' ', fstip1 = -1, intpopt = rmn.EZ_INTERP_NEAREST, constmul = 1.0, constadd = 0.0, constrmax = float('inf'), constrmin = float('-inf')):
+	def __init__(self, fpathr2cout, fstnomvar, AttributeName, AttributeType = None, AttributeUnits = None, fpathsystem = 'hrdps', fstetiket = ' ', fstip1 = -1, intpopt = rmn.EZ_INTERP_NEAREST, constmul = 1.0, constadd = 0.0, constrmax = float('inf'), constrmin = float('-inf'), AttributeDigits = None, AttributeDecimals = None, fileformat = None):
 		self.r2c = r2cfile()
 		self.r2c.attr.append(r2cattribute(AttributeName = AttributeName, AttributeType = AttributeType, AttributeUnits = AttributeUnits))
+		self.r2c.attr[0].AttributeDigits = AttributeDigits
+		self.r2c.attr[0].AttributeDecimals = AttributeDecimals
 		self.fpathr2cout = fpathr2cout
+		if (fileformat is None):
+			if (path.splitext(fpathr2cout)[1].lower() == '.seq'):
+				fileformat = 'seq'
+			elif (path.splitext(fpathr2cout)[1].lower() == '.nc'):
+				fileformat = 'nc'
+			else:
+				fileformat = 'r2c'
+		self.fileformat = fileformat
 		self.fstnomvar = fstnomvar
 		self.fpathsystem = fpathsystem
 		self.fstetiket = fstetiket
@@ -144,6 +323,133 @@ class conversionfieldfromfst(object):
 # Routines.
 # File manipulation routines.
 
+# Return the compression of a file ('gzip', 'bz2', 'xz', 'zstd'), or 'None' if the file is not compressed.
+# The compression is identified by the extension of the file (see 'FILECOMPRESSIONEXTENSIONS').
+# If 'mode' is a read mode and the file exists, files with other extensions are identified by the leading bytes of the file (see 'FILECOMPRESSIONMAGIC').
+def filecompression(fpath, mode = 'r'):
+
+	# Check the extension.
+	compression = FILECOMPRESSIONEXTENSIONS.get(path.splitext(fpath)[1].lower())
+	if (not compression is None or mode[0] != 'r' or not path.isfile(fpath)):
+		return compression
+
+	# Check the leading bytes.
+	with open(fpath, 'rb') as f:
+		b = f.read(6)
+	for (magic, compression) in FILECOMPRESSIONMAGIC:
+		if (b.startswith(magic)):
+			return compression
+	return None
+
+# Seekable reader of a 'zstd' compressed file (used by 'fileopen').
+# Seeking backward restarts decompression from the start of the file; seeking forward decompresses and discards the data in between.
+class zstdfile(io.RawIOBase):
+	def __init__(self, fpath):
+		self.fpath = fpath
+		self.reader = None
+		self.pos = 0
+		self.rewind()
+	def rewind(self):
+		if (not self.reader is None):
+			self.reader.close()
+		self.reader = zstandard.ZstdDecompressor().stream_reader(open(self.fpath, 'rb'), closefd = True, read_across_frames = True)
+		self.pos = 0
+	def readable(self):
+		return True
+	def seekable(self):
+		return True
+	def readinto(self, b):
+		n = self.reader.readinto(b)
+		self.pos += n
+		return n
+	def tell(self):
+		return self.pos
+	def seek(self, offset, whence = 0):
+		if (whence == 1):
+			offset += self.pos
+		elif (whence == 2):
+			offset = None
+		if (not offset is None and offset < self.pos):
+			self.rewind()
+		b = bytearray(R2CBUFFERSIZE)
+		while (offset is None or self.pos < offset):
+			n = self.readinto(memoryview(b)[:(R2CBUFFERSIZE if offset is None else min(R2CBUFFERSIZE, offset - self.pos))])
+			if (n == 0):
+				break
+		return self.pos
+	def close(self):
+		if (not self.reader is None):
+			self.reader.close()
+			self.reader = None
+		io.RawIOBase.close(self)
+
+# Open a file that may be compressed (see 'filecompression').
+# Uncompressed files are opened by 'open' with 'mode' and 'buffering'.
+# Compressed files are decompressed and compressed as the file is read and written, and are complete when the file is closed (e.g., at the end of 'with fileopen(fpath, 'a') as f:').
+# Appending to a compressed file ('a') adds a compressed stream to the end of the file, which is read as a continuation of the data of the file.
+# Writers that append many times (e.g., 'r2cframewriter' and 'tb0recordwriter') keep the file open so that the data are written to a single stream.
+# 'zstd' compressed files require the 'zstandard' package.
+def fileopen(fpath, mode = 'r', buffering = -1):
+
+	# Open uncompressed files.
+	compression = filecompression(fpath, mode)
+	if (compression is None):
+		return open(fpath, mode, buffering)
+
+	# Check for 'zstandard'.
+	if (compression == 'zstd' and not RUNZSTD):
+		print('ERROR: The zstandard library is required to read or write the file: %s. The script cannot continue.' % fpath)
+		exit()
+
+	# Open the compressed file (binary).
+	m = mode[0] + 'b'
+	if (compression == 'gzip'):
+		f = gzip.open(fpath, m)
+	elif (compression == 'bz2'):
+		f = bz2.open(fpath, m)
+	elif (compression == 'xz'):
+		f = lzma.open(fpath, m)
+	elif (m == 'rb'):
+		f = zstdfile(fpath)
+	else:
+		f = zstandard.ZstdCompressor().stream_writer(open(fpath, m), closefd = True, write_return_read = True)
+	f = (io.BufferedReader if (m == 'rb') else io.BufferedWriter)(f, R2CBUFFERSIZE)
+
+	# Open text files.
+	if (not 'b' in mode):
+		f = io.TextIOWrapper(f, encoding = 'latin-1')
+	return f
+
+# Save a checkpoint file of 'key value' lines (e.g., ':FrameCount 120') from the dictionary 'checkpoint'.
+# The file is written to a temporary file beside the file and then replaced, so that an existing checkpoint is never left incomplete.
+def checkpointfilecreate(fpathcheckpoint, checkpoint):
+
+	# Write the temporary file.
+	fpathtmp = fpathcheckpoint + '.tmp'
+	with open(fpathtmp, 'w') as f:
+		for (k, v) in checkpoint.items():
+			f.write(':%s %s\n' % (k, v))
+		f.flush()
+		os.fsync(f.fileno())
+
+	# Replace the checkpoint file.
+	os.replace(fpathtmp, fpathcheckpoint)
+
+# Read a checkpoint file saved by 'checkpointfilecreate'.
+# Returns a dictionary of the values (as strings), or 'None' if the file does not exist.
+def checkpointfromfile(fpathcheckpoint):
+
+	# Read the file.
+	if (not path.isfile(fpathcheckpoint)):
+		return None
+	checkpoint = {}
+	with open(fpathcheckpoint, 'r') as f:
+		for l in f:
+			m = l.rstrip('\n').split(' ', 1)
+			if (m[0].startswith(':')):
+				checkpoint[m[0][1:]] = (m[1] if (len(m) > 1) else '')
+	return checkpoint
+
 # Open and print the header to file using information provided via 'r2c'.
 # Overwrites any existing file with the same file information.
 # Supports 'r2c' format files with and without drainage database meta information.
@@ -152,7 +458,7 @@ def r2cfilecreateheader(r2c, fpathr2cout):
 
 	# Write the header.
 	# Writing the header overwrites any existing file.
-	with open(fpathr2cout, 'w') as r2cfid:
+	with fileopen(fpathr2cout, 'w') as r2cfid:
 
 		# Write the file type.
 		r2cfid.write('########################################\n')
@@ -245,23 +551,62 @@ def r2cfilecreateheader(r2c, fpathr2cout):
 # 'r2cfilecreateheader' should be called in advance of this routine to properly create the file.
 # The file can contain multiple attributes.
 # File operation re-opens and appends to the file to reduce memory usage.
-def r2cfileappendattributes(r2c, fpathr2cout):
+# Attributes are formatted in blocks of rows of at most 'R2CFORMATBLOCKSIZE' values (see 'r2cattributeblocks'), which are written to the buffer of the file ('R2CBUFFERSIZE').
+# If 'processes' is greater than '1' (default: 'R2CFORMATPROCESSES'), the blocks of the attributes are formatted in parallel and written in order
+# if the attributes have at least 'R2CFORMATPARALLELMINVALUES' values.
+# If 'verbose' is 'True', the name of each attribute is printed as it is saved.
+def r2cfileappendattributes(r2c, fpathr2cout, verbose = True, processes = None):
+
+	# Number of processes.
+	# Attributes are formatted in parallel if they have at least 'R2CFORMATPARALLELMINVALUES' values.
+	if (processes is None):
+		processes = R2CFORMATPROCESSES
+	if (sum([np.size(a.AttributeData) for a in r2c.attr]) < R2CFORMATPARALLELMINVALUES):
+		processes = 1
 
 	# Data frame (single-frame, no ':Frame'/':EndFrame' wrapper.
 	# Will append to existing file.
-	with open(fpathr2cout, 'a') as r2cfid:
-		for i, a in enumerate(r2c.attr):
+	with fileopen(fpathr2cout, 'a', R2CBUFFERSIZE) as r2cfid:
+		if (processes > 1):
+			with multiprocessing.Pool(processes) as pool:
+				for (i, text) in pool.imap(r2ctextfromblock, r2cattributeblocks(r2c)):
+					if (verbose and not i is None):
+						r2cprintsaving(r2c, i)
+					r2cfid.write(text)
+		else:
+			for (i, block, fmt) in r2cattributeblocks(r2c):
+				if (verbose and not i is None):
+					r2cprintsaving(r2c, i)
+				r2cfid.write(r2ctextfromarray(block, fmt))
 
-			# Print diagnostic information to screen.
-			if (not a.AttributeName is None):
-				print('Saving ... ' + a.AttributeName)
-			else:
-				print('Saving ... Attribute ' + str(i + 1))
+# Print the name of an attribute of an 'r2c' object being saved (see 'r2cfileappendattributes').
+def r2cprintsaving(r2c, i):
+
+	# Print diagnostic information to screen.
+	if (not r2c.attr[i].AttributeName is None):
+		print('Saving ... ' + r2c.attr[i].AttributeName)
+	else:
+		print('Saving ... Attribute ' + str(i + 1))
+
+# Generator over the blocks of the single-frame attributes of an 'r2c' object as written to 'r2c' format files.
+# Each attribute is split into blocks of rows of at most 'R2CFORMATBLOCKSIZE' values (at least one row).
+# Yields the index of the attribute (for the first block of the attribute, otherwise 'None'), the data of the block (xCount, rows), and the format of the attribute (see 'r2cattributeformat').
+def r2cattributeblocks(r2c):
+
+	# Split the attributes.
+	for i, a in enumerate(r2c.attr):
+		data = np.asarray(a.AttributeData)
+		fmt = r2cattributeformat(a)
+		(nx, ny) = np.shape(data)
+		rows = max(1, R2CFORMATBLOCKSIZE//max(nx, 1))
+		for y0 in range(0, max(ny, 1), rows):
+			yield ((i if (y0 == 0) else None), data[:, y0:(y0 + rows)], fmt)
 
-			# Determine formatting by the type of variable (%g).
-			for r in np.transpose(a.AttributeData):
-				r.tofile(r2cfid, sep = ' ', format = '%g')
-				r2cfid.write('\n')
+# Return the index of the attribute and the text of a block of data yielded by 'r2cattributeblocks' (used by 'r2cfileappendattributes' to format blocks in parallel).
+def r2ctextfromblock(block):
+
+	# Format the block.
+	return (block[0], r2ctextfromarray(block[1], block[2]))
 
 # Append multi-frame attributes to an 'r2c' format file (time-series).
 # Appends records to an existing file.
@@ -275,18 +620,717 @@ def r2cfileappendmultiframe(r2c, fpathr2cout, frameno, frametime):
 	# Standard date format for 'r2c'/EnSim formats: "yyyy/MM/dd HH:mm:ss.SSS".
 	r2c.attr[0].FrameCount += 1
 	frameno = r2c.attr[0].FrameCount
-	with open(fpathr2cout, 'a') as r2cfid:
+	with fileopen(fpathr2cout, 'a') as r2cfid:
+		r2cfilewriteframe(r2cfid, r2c.attr[0].AttributeData, frameno, frametime, r2cattributeformat(r2c.attr[0]))
+
+# Write a single frame of data (xCount, yCount) to an open 'r2c' format file.
+# 'frameno' is printed as the frame number and 'frametime' as the time-stamp of the frame.
+# Values are formatted by 'fmt' (see 'r2ctextfromarray').
+def r2cfilewriteframe(r2cfid, data, frameno, frametime, fmt = '%g'):
+
+	# Print the leading frame header (date in standard format for EnSim/GK).
+	r2cfid.write(':Frame %d %d \"%s\"\n' % (frameno, frameno, strftime('%Y/%m/%d %H:%M:%S', frametime.timetuple())))
+
+	# Print the data.
+	r2cfid.write(r2ctextfromarray(data, fmt))
+
+	# Print footer.
+	r2cfid.write(':EndFrame\n')
+
+# Append multiple frames of multi-frame attributes to an 'r2c' format file (time-series).
+# Appends records to an existing file.
+# 'r2cfilecreateheader' should be called in advance of this routine to properly create the file.
+# 'data' is a (frames, xCount, yCount) array and 'frametimes' the time-stamp of each frame (see 'r2cdatetime64').
+# Frames are numbered by the 'FrameCount' of the first attribute, which is incremented by the number of frames (as by 'r2cfileappendmultiframe').
+# The output is identical to that of calling 'r2cfileappendmultiframe' for each frame.
+def r2cfileappendframes(r2c, fpathr2cout, data, frametimes):
+
+	# Will append to existing file.
+	with fileopen(fpathr2cout, 'a') as r2cfid:
+		r2cfilewriteframes(r2cfid, data, r2c.attr[0].FrameCount + 1, frametimes, r2cattributeformat(r2c.attr[0]))
+	r2c.attr[0].FrameCount += len(data)
+
+# Return the format of the values of an attribute printed to 'r2c' format files.
+# Returns '%.Nf' if 'AttributeDecimals' is set, '%.Ng' if 'AttributeDigits' is set, and '%g' otherwise.
+def r2cattributeformat(a):
+
+	# Determine the format.
+	if (not a.AttributeDecimals is None):
+		return '%%.%df' % a.AttributeDecimals
+	elif (not a.AttributeDigits is None):
+		return '%%.%dg' % a.AttributeDigits
+	else:
+		return '%g'
+
+# Return the text of a block of data (xCount, yCount) as printed to 'r2c' format files.
+# Each of the 'yCount' rows is printed on a line, with values separated by spaces and formatted by 'fmt' (e.g., '%g', '%.4g', '%.2f').
+# All values are formatted together by a single string operation, which gives the same text as formatting each value by 'fmt'.
+def r2ctextfromarray(data, fmt = '%g'):
+
+	# Format the data.
+	(nx, ny) = np.shape(data)
+	if (nx == 0 or ny == 0):
+		return '\n'*ny
+	return ((' '.join([fmt]*nx) + '\n')*ny) % tuple(np.transpose(data).ravel().tolist())
+
+# Write multiple frames of data (frames, xCount, yCount) to an open 'r2c' format file.
+# Frames are numbered from 'frameno' and 'frametimes' printed as the time-stamps of the frames (see 'r2cdatetime64').
+# Values are formatted by 'fmt' (see 'r2ctextfromarray').
+# Frames are formatted in blocks of 'R2CFRAMECHUNK' frames, which are written to the file together.
+def r2cfilewriteframes(r2cfid, data, frameno, frametimes, fmt = '%g'):
+
+	# Format the time-stamps (date in standard format for EnSim/GK).
+	frame_marks = np.datetime_as_string(np.array([r2cdatetime64(t) for t in frametimes], dtype = 'datetime64[s]'), unit = 's')
+
+	# Print the frames.
+	text = []
+	for i in range(len(data)):
+		text.append(':Frame %d %d \"%s\"\n' % (frameno + i, frameno + i, frame_marks[i].replace('-', '/').replace('T', ' ')))
+		text.append(r2ctextfromarray(data[i], fmt))
+		text.append(':EndFrame\n')
+		if (len(text) >= 3*R2CFRAMECHUNK):
+			r2cfid.write(''.join(text))
+			text = []
+	r2cfid.write(''.join(text))
+
+# Writer of multi-frame attributes to an 'r2c' format file (time-series) that keeps the file open.
+# Creates the file and prints the header using information provided via 'r2c' (see 'r2cfilecreateheader').
+# Frames are written by 'writeframe' (or 'writeframes' for multiple frames, see 'r2cfileappendframes') to the buffer of the open file ('buffering', default: 'R2CBUFFERSIZE') and numbered by the 'FrameCount' of the first attribute (as by 'r2cfileappendmultiframe').
+# The file is flushed every 'flushframes' frames (default: 'R2CFLUSHFRAMES') and closed by 'close'.
+# If 'resume' is 'True', frames are appended to the existing file (e.g., trimmed by 'r2cfiletrimframes') and the header is not written;
+# 'FrameCount' must then be the number of frames in the file.
+# Use as a context manager (e.g., 'with r2cframewriter(r2c, fpath) as w:') to close the file if an exception occurs.
+class r2cframewriter(object):
+	def __init__(self, r2c, fpathr2cout, flushframes = None, buffering = None, resume = False):
+		self.r2c = r2c
+		self.FilePath = fpathr2cout
+		self.FlushFrames = R2CFLUSHFRAMES if (flushframes is None) else flushframes
+		if (not resume):
+			r2cfilecreateheader(r2c, fpathr2cout)
+		self.context = fileopen(fpathr2cout, 'a', R2CBUFFERSIZE if (buffering is None) else buffering)
+		self.f = self.context.__enter__()
+	def __enter__(self):
+		return self
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+	def writeframe(self, data, frametime):
+
+		# Write the frame (use the data of the first attribute if 'data' is 'None').
+		if (data is None):
+			data = self.r2c.attr[0].AttributeData
+		self.r2c.attr[0].FrameCount += 1
+		r2cfilewriteframe(self.f, data, self.r2c.attr[0].FrameCount, frametime, r2cattributeformat(self.r2c.attr[0]))
+
+		# Flush the file.
+		if (self.FlushFrames > 0 and self.r2c.attr[0].FrameCount % self.FlushFrames == 0):
+			self.f.flush()
+	def writeframes(self, data, frametimes):
+
+		# Write the frames.
+		n = self.r2c.attr[0].FrameCount
+		r2cfilewriteframes(self.f, data, n + 1, frametimes, r2cattributeformat(self.r2c.attr[0]))
+		self.r2c.attr[0].FrameCount += len(data)
+
+		# Flush the file if the frames cross a multiple of 'FlushFrames' (as 'writeframe').
+		if (self.FlushFrames > 0 and self.r2c.attr[0].FrameCount//self.FlushFrames > n//self.FlushFrames):
+			self.f.flush()
+	def flush(self):
+		self.f.flush()
+	def close(self):
+		if (not self.f is None):
+			self.context.__exit__(None, None, None)
+			self.f = None
+
+# Writer of frames to 'r2cframewriter' objects on background threads.
+# Frames passed to 'writeframe' are copied and added to the queue of a thread, which formats and writes them while the calling thread continues.
+# Each 'r2cframewriter' is assigned to a single thread (of 'threads') so that its frames are written in order.
+# All 'ncframewriter' objects are assigned to the same thread, as the netCDF4/HDF5 library is not thread-safe.
+# Each queue holds at most 'maxsize' frames (default: 'R2CWRITEQUEUESIZE'); 'writeframe' waits if the queue is full.
+# An exception raised by a thread is raised again by the next call to 'writeframe', or by 'flush' or 'close', which wait for all frames to be written.
+# Use as a context manager (e.g., 'with r2cbackgroundwriter() as b:') to stop the threads if an exception occurs.
+class r2cbackgroundwriter(object):
+	def __init__(self, threads = 1, maxsize = None):
+		self.queues = [queue.Queue(R2CWRITEQUEUESIZE if (maxsize is None) else maxsize) for i in range(max(1, threads))]
+		self.threads = [threading.Thread(target = self.run, args = (q, ), daemon = True) for q in self.queues]
+		self.assigned = {}
+		self.count = 0
+		self.error = None
+		for t in self.threads:
+			t.start()
+	def __enter__(self):
+		return self
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close(raiseerror = (exc_type is None))
+	def run(self, q):
+
+		# Write frames until stopped ('None').
+		# Frames are discarded after an error so that the calling thread does not wait on a full queue.
+		while True:
+			task = q.get()
+			if (task is None):
+				return
+			if (self.error is None):
+				try:
+					(w, data, frametime) = task
+					w.writeframe(data, frametime)
+				except BaseException as e:
+					self.error = e
+			q.task_done()
+	def check(self):
+
+		# Raise the exception of a thread.
+		if (not self.error is None):
+			raise self.error
+	def writeframe(self, w, data, frametime):
+
+		# Assign the writer to a thread.
+		# 'ncframewriter' objects share the thread of the first 'ncframewriter'.
+		self.check()
+		i = self.assigned.get(id(w))
+		if (i is None):
+			if (isinstance(w, ncframewriter) and 'nc' in self.assigned):
+				i = self.assigned['nc']
+			else:
+				i = self.count % len(self.queues)
+				self.count += 1
+				if (isinstance(w, ncframewriter)):
+					self.assigned['nc'] = i
+			self.assigned[id(w)] = i
+
+		# Add the frame to the queue.
+		self.queues[i].put((w, np.array(data, copy = True), frametime))
+	def flush(self):
+
+		# Wait for the frames in the queues to be written.
+		for q in self.queues:
+			q.join()
+		self.check()
+	def close(self, raiseerror = True):
+
+		# Stop the threads after the frames in the queues are written.
+		for q in self.queues:
+			q.put(None)
+		for t in self.threads:
+			t.join()
+		self.queues = []
+		self.threads = []
+		if (raiseerror):
+			self.check()
+
+# Return the last match of 'pattern' (compiled 'bytes' pattern) that ends before byte 'end' of file 'f' (opened 'rb'), or 'None' if none exists.
+# The file is searched backward in blocks of 'R2CSCANBLOCKSIZE' bytes; matches must be shorter than 'overlap' bytes.
+# Returns the byte offsets of the start and end of the match and the matched bytes.
+def filesearchlast(f, pattern, end, overlap = 1024):
+
+	# Search the file.
+	pos = end
+	carry = b''
+	while (pos > 0):
+		n = min(R2CSCANBLOCKSIZE, pos)
+		pos -= n
+		f.seek(pos)
+		b = f.read(n) + carry
+		m = None
+		for m in pattern.finditer(b):
+			pass
+		if (not m is None):
+			return (pos + m.start(), pos + m.end(), m.group(0))
+		carry = b[:overlap]
+	return None
+
+# Trim an existing multi-frame 'r2c' format file after the last complete frame (the last ':EndFrame' line).
+# Any incomplete frame at the end of the file (e.g., if writing was interrupted) is removed.
+# If 'frames' is provided, frames after the first 'frames' frames are also removed.
+# Returns the number of frames in the trimmed file (by the number of the last frame), or -1 if the file does not exist or the header is incomplete.
+# Compressed files cannot be trimmed (calls 'exit()').
+def r2cfiletrimframes(fpathr2c, frames = None):
+
+	# Check the file.
+	if (not path.isfile(fpathr2c)):
+		return -1
+	if (not filecompression(fpathr2c, 'rb') is None):
+		print('ERROR: Compressed files cannot be trimmed: %s. The script cannot continue.' % fpathr2c)
+		exit()
+
+	# Find the last complete frame, or the end of the header if no frame is complete.
+	with open(fpathr2c, 'r+b') as f:
+		size = f.seek(0, 2)
+		m = filesearchlast(f, re.compile(b'(?:^|\n):endframe[^\n]*\n', re.IGNORECASE), size)
+		if (not m is None):
+			keep = m[1]
+			m = filesearchlast(f, re.compile(b'\n:frame[ \t][^\n]*', re.IGNORECASE), m[0] + 1)
+			count = int(m[2].split()[1])
+		else:
+			m = filesearchlast(f, re.compile(b'(?:^|\n):endheader[^\n]*\n', re.IGNORECASE), size)
+			if (m is None):
+				return -1
+			keep = m[1]
+			count = 0
+
+		# Remove the incomplete frame.
+		if (keep < size):
+			f.truncate(keep)
+
+	# Remove frames after 'frames'.
+	if (not frames is None and frames < count):
+		index = r2cframeindexscan(fpathr2c)
+		with open(fpathr2c, 'r+b') as f:
+			f.truncate(index.FrameOffsets[max(0, frames)])
+		count = max(0, frames)
+	return count
+
+# Return the indices of the cells of an 'r2c' grid written to MESH binary sequential ('seq') format files.
+# Indices are positions in the flattened (xCount, yCount) array of the data (e.g., 'AttributeData.ravel()').
+# If 'rank' (xCount, yCount) is provided (e.g., the 'Rank' attribute of the drainage database), the cells with 'rank' > 0 are returned in order of rank;
+# otherwise, all cells are returned in the order of 'r2c' format files (by row of 'yCount').
+# Calls 'exit()' if the ranks are not consecutive from 1.
+def seqcellindex(r2c, rank = None):
+
+	# All cells.
+	(nx, ny) = (r2c.grid.xCount, r2c.grid.yCount)
+	if (rank is None):
+		return np.arange(nx*ny).reshape(nx, ny).transpose().ravel()
+
+	# Active cells.
+	rank = np.asarray(rank).astype(np.int64).ravel()
+	active = np.flatnonzero(rank > 0)
+	index = np.full(active.size, -1, dtype = np.int64)
+	if (active.size > 0 and rank[active].max() == active.size):
+		index[rank[active] - 1] = active
+	if (np.any(index < 0)):
+		print('ERROR: The ranks of the grid are not consecutive from 1. The script cannot continue.')
+		exit()
+	return index
+
+# Return the record type of a frame of 'count' values in MESH binary sequential ('seq') format files.
+# Each frame is written as two Fortran unformatted sequential records, each enclosed by its length (int32, bytes):
+# the frame number (int32) and the values (float32).
+def seqrecordtype(count):
+
+	# Record type.
+	return np.dtype([('FrameHead', '<i4'), ('FrameNumber', '<i4'), ('FrameTail', '<i4'), ('DataHead', '<i4'), ('Data', '<f4', (count, )), ('DataTail', '<i4')])
+
+# Return the records of frames of data (frames, xCount, yCount) for MESH binary sequential ('seq') format files (see 'seqrecordtype').
+# Frames are numbered from 'frameno' and only the cells in 'index' are written (see 'seqcellindex').
+def seqrecordsfromframes(data, frameno, index):
+
+	# Create the records.
+	data = np.asarray(data)
+	n = data.shape[0]
+	records = np.empty(n, dtype = seqrecordtype(index.size))
+	records['FrameHead'] = 4
+	records['FrameNumber'] = np.arange(frameno, frameno + n)
+	records['FrameTail'] = 4
+	records['DataHead'] = 4*index.size
+	records['Data'] = data.reshape(n, -1)[:, index]
+	records['DataTail'] = 4*index.size
+	return records
+
+# Writer of multi-frame attributes to a MESH binary sequential ('seq') format file (time-series) that keeps the file open.
+# Creates the file, which has no header, and writes frames in the format of 'seqrecordtype' for the cells of 'seqcellindex' (see for 'rank').
+# Frames are written by 'writeframe' (or 'writeframes' for multiple frames) and numbered by the 'FrameCount' of the first attribute (as by 'r2cframewriter').
+# Time-stamps are not written to the file; 'frametime' is accepted for compatibility with 'r2cframewriter' (e.g., for 'r2cbackgroundwriter').
+# If 'resume' is 'True', frames are appended to the existing file (e.g., trimmed by 'seqfiletrimframes'); 'FrameCount' must then be the number of frames in the file.
+# Use as a context manager (e.g., 'with seqframewriter(r2c, fpath, rank) as w:') to close the file if an exception occurs.
+class seqframewriter(object):
+	def __init__(self, r2c, fpathseqout, rank = None, flushframes = None, buffering = None, resume = False):
+		self.r2c = r2c
+		self.FilePath = fpathseqout
+		self.FlushFrames = R2CFLUSHFRAMES if (flushframes is None) else flushframes
+		self.index = seqcellindex(r2c, rank)
+		self.f = open(fpathseqout, 'ab' if (resume) else 'wb', R2CBUFFERSIZE if (buffering is None) else buffering)
+	def __enter__(self):
+		return self
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+	def writeframe(self, data, frametime = None):
+
+		# Write the frame (use the data of the first attribute if 'data' is 'None').
+		if (data is None):
+			data = self.r2c.attr[0].AttributeData
+		self.writeframes(np.asarray(data)[np.newaxis], None)
+	def writeframes(self, data, frametimes = None):
+
+		# Write the frames.
+		n = self.r2c.attr[0].FrameCount
+		self.f.write(seqrecordsfromframes(data, n + 1, self.index).tobytes())
+		self.r2c.attr[0].FrameCount += len(data)
+
+		# Flush the file if the frames cross a multiple of 'FlushFrames' (as 'r2cframewriter').
+		if (self.FlushFrames > 0 and self.r2c.attr[0].FrameCount//self.FlushFrames > n//self.FlushFrames):
+			self.f.flush()
+	def flush(self):
+		self.f.flush()
+	def close(self):
+		if (not self.f is None):
+			self.f.close()
+			self.f = None
+
+# Return the frame numbers and values (frames, count) of the frames in a MESH binary sequential ('seq') format file (see 'seqrecordtype').
+# 'count' is the number of values in each frame (e.g., the number of active cells, see 'seqcellindex').
+# The file is memory-mapped; values are only read from file when accessed.
+# Calls 'exit()' if the file does not contain records of 'count' values.
+def seqframesfromseq(fpathseqin, count):
+
+	# Check the size of the file.
+	rtype = seqrecordtype(count)
+	size = os.stat(fpathseqin).st_size
+	if (size % rtype.itemsize != 0):
+		print('ERROR: The file does not contain frames of %d values: %s. The script cannot continue.' % (count, fpathseqin))
+		exit()
+	if (size == 0):
+		return (np.zeros(0, dtype = np.int32), np.zeros((0, count), dtype = np.float32))
+
+	# Read the records.
+	records = np.memmap(fpathseqin, dtype = rtype, mode = 'r')
+	if (np.any(records['FrameHead'] != 4) or np.any(records['DataHead'] != 4*count) or np.any(records['DataTail'] != 4*count)):
+		print('ERROR: The file does not contain frames of %d values: %s. The script cannot continue.' % (count, fpathseqin))
+		exit()
+	return (records['FrameNumber'], records['Data'])
+
+# Trim an existing MESH binary sequential ('seq') format file after the last complete frame of 'count' values (see 'seqrecordtype').
+# If 'frames' is provided, frames after the first 'frames' frames are also removed.
+# Returns the number of frames in the trimmed file, or -1 if the file does not exist.
+def seqfiletrimframes(fpathseq, count, frames = None):
+
+	# Check the file.
+	if (not path.isfile(fpathseq)):
+		return -1
+
+	# Trim the file.
+	rtype = seqrecordtype(count)
+	size = os.stat(fpathseq).st_size
+	n = size//rtype.itemsize
+	if (not frames is None):
+		n = max(0, min(n, frames))
+	if (n*rtype.itemsize < size):
+		with open(fpathseq, 'r+b') as f:
+			f.truncate(n*rtype.itemsize)
+	return n
+
+# Read the frames of a MESH binary sequential ('seq') format file to the first attribute of an 'r2c' object.
+# The grid specification must already exist in the 'r2c' object (e.g., read by 'r2cgridfromr2c' from the drainage database).
+# The cells of the frames are given by 'rank' (see 'seqcellindex'); other cells are assigned zero.
+# Frames are assigned to 'AttributeData' as a (frames, xCount, yCount) array ('seq' format files have no time-stamps).
+def r2cattributefromseq(r2c, fpathseqin, rank = None):
+
+	# Read the frames.
+	index = seqcellindex(r2c, rank)
+	(frame_numbers, values) = seqframesfromseq(fpathseqin, index.size)
+
+	# Assign the values to the cells of the grid.
+	frame_data = np.zeros((frame_numbers.size, r2c.grid.xCount*r2c.grid.yCount), dtype = R2CDTYPE)
+	frame_data[:, index] = values
+	if (not r2c.attr):
+		r2c.attr.append(r2cattribute())
+	r2c.attr[0].AttributeData = frame_data.reshape(frame_numbers.size, r2c.grid.xCount, r2c.grid.yCount)
+	r2c.attr[0].FrameCount = frame_numbers.size
+	r2c.attr[0].FrameTimes = None
+
+# Return the frame writer of a conversion field (see 'r2cconversionfieldfromfst').
+# Returns a 'seqframewriter' if the 'fileformat' of the field is 'seq' (see for 'rank'), an 'ncframewriter' if 'nc', otherwise an 'r2cframewriter'.
+# The 'r2c' object of the field must already contain the grid specification.
+# If 'resume' is 'True', frames are appended to the existing file (see 'filetrimframesfromfield'); 'nc' format files cannot be resumed (calls 'exit()').
+def framewriterfromfield(c, rank = None, resume = False):
+
+	# Create the writer.
+	if (c.fileformat == 'seq'):
+		return seqframewriter(c.r2c, c.fpathr2cout, rank, resume = resume)
+	elif (c.fileformat == 'nc'):
+		if (resume):
+			print('ERROR: netCDF format files cannot be resumed: %s. The script cannot continue.' % c.fpathr2cout)
+			exit()
+		return ncframewriter(c.r2c, c.fpathr2cout)
+	else:
+		return r2cframewriter(c.r2c, c.fpathr2cout, resume = resume)
+
+# Trim the existing output file of a conversion field (see 'r2cconversionfieldfromfst') after the last complete frame, or after 'frames' frames.
+# Uses 'r2cfiletrimframes' or 'seqfiletrimframes' (see for 'rank') by the 'fileformat' of the field; the 'r2c' object must already contain the grid specification.
+# Returns the number of frames in the trimmed file, or -1 if the file does not exist or is incomplete.
+# 'nc' format files cannot be trimmed (calls 'exit()').
+def filetrimframesfromfield(c, rank = None, frames = None):
+
+	# Trim the file.
+	if (c.fileformat == 'seq'):
+		return seqfiletrimframes(c.fpathr2cout, seqcellindex(c.r2c, rank).size, frames)
+	elif (c.fileformat == 'nc'):
+		print('ERROR: netCDF format files cannot be trimmed: %s. The script cannot continue.' % c.fpathr2cout)
+		exit()
+	else:
+		return r2cfiletrimframes(c.fpathr2cout, frames)
+
+# Stop with an error if netCDF4 is not loaded (see 'RUNNETCDF').
+def ncchecklibrary(fname):
 
-		# Print the leading frame header (date in standard format for EnSim/GK).
-		r2cfid.write(':Frame %d %d \"%s\"\n' % (frameno, frameno, strftime('%Y/%m/%d %H:%M:%S', frametime.timetuple())))
+	# Check for 'RUNNETCDF'.
+	if (not RUNNETCDF):
+		print('ERROR: netCDF4 is not loaded. Function cannot continue: %s' % fname)
+		exit()
 
-		# Determine formatting by the type of variable (%g).
-		for r in np.transpose(r2c.attr[0].AttributeData):
-			r.tofile(r2cfid, sep = ' ', format = '%g')
-			r2cfid.write('\n')
+# Return the name of the netCDF variable of an attribute (characters other than letters, digits, and '_' are replaced by '_').
+def ncvariablename(a, i = 0):
+
+	# Derive the name.
+	if (a.AttributeName is None):
+		return 'Attribute%d' % (i + 1)
+	return re.sub('[^A-Za-z0-9_]', '_', a.AttributeName.strip('"'))
+
+# Return the time-stamps of frames as seconds since 'NCTIMEUNITS' (see 'r2cdatetime64').
+def ncsecondsfromtimes(frametimes):
+
+	# Convert the time-stamps.
+	t = np.array([r2cdatetime64(t) for t in frametimes], dtype = 'datetime64[s]')
+	return (t - np.datetime64('1970-01-01T00:00:00', 's')).astype(np.int64)
+
+# Create a netCDF-CF format file with the grid of an 'r2c' object.
+# Creates the dimensions and coordinates of the grid ('lat'/'lon' for 'LATLONG', 'rlat'/'rlon' for 'ROTLATLONG') and the grid mapping variable ('crs').
+# The rotated pole of 'ROTLATLONG' grids is taken from 'GridNorthPoleLatitude', 'GridNorthPoleLongitude', and 'NorthPoleGridLongitude'.
+# The EnSim grid specification and meta information are saved as global attributes (prefixed 'ensim_') to read the file back to an 'r2c' object.
+# If 'framed' is 'True', creates the unlimited 'time' dimension and coordinate.
+# Returns the open 'netCDF4.Dataset'.
+def ncfilecreate(r2c, fpathncout, framed = False):
+
+	# Create the file.
+	ds = netCDF4.Dataset(fpathncout, 'w', format = 'NETCDF4')
+	ds.Conventions = 'CF-1.6'
+	ds.history = 'Created by ensim_utils.py %s' % strftime('%Y/%m/%d %H:%M:%S', gmtime())
+
+	# EnSim grid specification and meta information.
+	for k in ['Projection', 'Ellipsoid', 'xOrigin', 'yOrigin', 'xCount', 'yCount', 'xDelta', 'yDelta', 'CentreLatitude', 'CentreLongitude', 'RotationLatitude', 'RotationLongitude']:
+		if (hasattr(r2c.grid, k)):
+			ds.setncattr('ensim_' + k, getattr(r2c.grid, k))
+	if (not r2c.meta is None):
+		for (k, v) in vars(r2c.meta).items():
+			ds.setncattr('ensim_meta_' + k, v)
+
+	# Dimensions and coordinates.
+	if (r2c.grid.Projection.lower() == 'rotlatlong'):
+		(ydim, xdim) = ('rlat', 'rlon')
+		(ystd, xstd) = ('grid_latitude', 'grid_longitude')
+		(yunits, xunits) = ('degrees', 'degrees')
+	else:
+		(ydim, xdim) = ('lat', 'lon')
+		(ystd, xstd) = ('latitude', 'longitude')
+		(yunits, xunits) = ('degrees_north', 'degrees_east')
+	if (framed):
+		ds.createDimension('time', None)
+		v = ds.createVariable('time', 'i8', ('time', ))
+		v.standard_name = 'time'
+		v.units = NCTIMEUNITS
+		v.calendar = 'standard'
+		v.axis = 'T'
+	ds.createDimension(ydim, r2c.grid.yCount)
+	ds.createDimension(xdim, r2c.grid.xCount)
+	v = ds.createVariable(ydim, 'f8', (ydim, ))
+	v.standard_name = ystd
+	v.units = yunits
+	v.axis = 'Y'
+	v[:] = r2c.grid.yOrigin + (np.arange(r2c.grid.yCount) + 0.5)*r2c.grid.yDelta
+	v = ds.createVariable(xdim, 'f8', (xdim, ))
+	v.standard_name = xstd
+	v.units = xunits
+	v.axis = 'X'
+	v[:] = r2c.grid.xOrigin + (np.arange(r2c.grid.xCount) + 0.5)*r2c.grid.xDelta
+
+	# Grid mapping.
+	v = ds.createVariable('crs', 'i4')
+	if (r2c.grid.Projection.lower() == 'rotlatlong'):
+		v.grid_mapping_name = 'rotated_latitude_longitude'
+		v.grid_north_pole_latitude = r2c.grid.GridNorthPoleLatitude
+		v.grid_north_pole_longitude = r2c.grid.GridNorthPoleLongitude
+		v.north_pole_grid_longitude = r2c.grid.NorthPoleGridLongitude
+	else:
+		v.grid_mapping_name = 'latitude_longitude'
+	v.earth_radius = 6371229.0
+	return ds
+
+# Create the variable of an attribute in a netCDF-CF format file created by 'ncfilecreate'.
+# The data are stored as (time, y, x) if 'framed' is 'True' (otherwise (y, x)), in chunks of 'chunkframes' frames (default: 'NCCHUNKFRAMES')
+# compressed by zlib with level 'complevel' (default: 'NCCOMPLEVEL').
+# Attributes of 'AttributeType' 'integer' are stored as 'i4', otherwise as 'NCDTYPE'.
+def ncvariablefromattribute(ds, r2c, a, i = 0, framed = False, complevel = None, chunkframes = None):
+
+	# Dimensions and chunks.
+	if (r2c.grid.Projection.lower() == 'rotlatlong'):
+		dims = ('rlat', 'rlon')
+	else:
+		dims = ('lat', 'lon')
+	chunks = (r2c.grid.yCount, r2c.grid.xCount)
+	if (framed):
+		dims = ('time', ) + dims
+		chunks = (NCCHUNKFRAMES if (chunkframes is None) else chunkframes, ) + chunks
+
+	# Create the variable.
+	if (str(a.AttributeType).lower() == 'integer'):
+		dtype = 'i4'
+	else:
+		dtype = NCDTYPE
+	v = ds.createVariable(ncvariablename(a, i), dtype, dims, zlib = True, complevel = (NCCOMPLEVEL if (complevel is None) else complevel), chunksizes = chunks)
+	if (not a.AttributeName is None):
+		v.long_name = a.AttributeName.strip('"')
+		v.ensim_AttributeName = a.AttributeName
+	if (not a.AttributeType is None):
+		v.ensim_AttributeType = a.AttributeType
+	if (not a.AttributeUnits is None):
+		v.units = a.AttributeUnits.strip('"')
+		v.ensim_AttributeUnits = a.AttributeUnits
+	v.grid_mapping = 'crs'
+	return v
+
+# Save the attributes of an 'r2c' object to a netCDF-CF format file (see 'ncfilecreate').
+# If the first attribute has 'FrameTimes', the attributes are saved as multi-frame variables (time, y, x) with 'FrameTimes' as the time coordinate;
+# otherwise, the attributes are saved as single-frame variables (y, x).
+# Variables are compressed and chunked (see 'ncvariablefromattribute' for 'complevel' and 'chunkframes').
+def ncfilefromr2c(r2c, fpathncout, complevel = None, chunkframes = None):
+
+	# Check for 'RUNNETCDF'.
+	ncchecklibrary('ncfilefromr2c')
+
+	# Create the file.
+	framed = (len(r2c.attr) > 0 and not r2c.attr[0].FrameTimes is None)
+	ds = ncfilecreate(r2c, fpathncout, framed)
+	try:
+		if (framed):
+			ds.variables['time'][:] = ncsecondsfromtimes(r2c.attr[0].FrameTimes)
+
+		# Save the attributes.
+		for i, a in enumerate(r2c.attr):
+			v = ncvariablefromattribute(ds, r2c, a, i, framed, complevel, chunkframes)
+			d = a.AttributeData
+			if (isinstance(d, pd.DataFrame)):
+				d = np.stack(d['Values'].to_list())
+			if (framed):
+				v[:] = np.transpose(d, (0, 2, 1))
+			else:
+				v[:] = np.transpose(d)
+	finally:
+		ds.close()
+
+# Writer of multi-frame attributes to a netCDF-CF format file (time-series) that keeps the file open.
+# Creates the file and the variable of the first attribute (see 'ncfilecreate' and 'ncvariablefromattribute' for 'complevel' and 'chunkframes').
+# Frames are written by 'writeframe' (or 'writeframes' for multiple frames) and counted by the 'FrameCount' of the first attribute (as by 'r2cframewriter').
+# Use as a context manager (e.g., 'with ncframewriter(r2c, fpath) as w:') to close the file if an exception occurs.
+class ncframewriter(object):
+	def __init__(self, r2c, fpathncout, complevel = None, chunkframes = None):
+		ncchecklibrary('ncframewriter')
+		self.r2c = r2c
+		self.FilePath = fpathncout
+		self.ds = ncfilecreate(r2c, fpathncout, framed = True)
+		self.var = ncvariablefromattribute(self.ds, r2c, r2c.attr[0], 0, True, complevel, chunkframes)
+	def __enter__(self):
+		return self
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+	def writeframe(self, data, frametime):
+
+		# Write the frame (use the data of the first attribute if 'data' is 'None').
+		if (data is None):
+			data = self.r2c.attr[0].AttributeData
+		self.writeframes(np.asarray(data)[np.newaxis], [frametime])
+	def writeframes(self, data, frametimes):
+
+		# Write the frames.
+		i = self.r2c.attr[0].FrameCount
+		n = len(data)
+		self.ds.variables['time'][i:(i + n)] = ncsecondsfromtimes(frametimes)
+		self.var[i:(i + n)] = np.transpose(data, (0, 2, 1))
+		self.r2c.attr[0].FrameCount += n
+	def flush(self):
+		self.ds.sync()
+	def close(self):
+		if (not self.ds is None):
+			self.ds.close()
+			self.ds = None
+
+# Read grid, meta information, and attributes from an existing netCDF-CF format file (e.g., created by 'ncfilefromr2c').
+# The grid is read from the 'ensim_' global attributes if they exist, otherwise from the coordinates and grid mapping of the file.
+# Data are read as in 'r2cfromr2c' (see for 'asarray', 'start', 'stop', 'xybox', 'latlonbox', and 'attributes'),
+# but only the frames and cells requested are read from file (netCDF variables are sliced before data are read).
+# 'attributes' are matched to the 'long_name' of the variables (or the variable names).
+def r2cfromnc(r2c, fpathncin, asarray = False, start = None, stop = None, xybox = None, latlonbox = None, attributes = None):
+
+	# Check for 'RUNNETCDF'.
+	ncchecklibrary('r2cfromnc')
+
+	# Read the file.
+	with netCDF4.Dataset(fpathncin, 'r') as ds:
+
+		# Coordinates.
+		if ('rlat' in ds.variables):
+			(ydim, xdim) = ('rlat', 'rlon')
+		else:
+			(ydim, xdim) = ('lat', 'lon')
+		y = ds.variables[ydim][:]
+		x = ds.variables[xdim][:]
+
+		# Grid specification.
+		g = ds.__dict__
+		r2c.grid.Projection = g.get('ensim_Projection', 'ROTLATLONG' if (ydim == 'rlat') else 'LATLONG')
+		r2c.grid.Ellipsoid = g.get('ensim_Ellipsoid', 'SPHERE')
+		r2c.grid.xCount = x.size
+		r2c.grid.yCount = y.size
+		r2c.grid.xDelta = float(g.get('ensim_xDelta', (x[1] - x[0]) if (x.size > 1) else 0.0))
+		r2c.grid.yDelta = float(g.get('ensim_yDelta', (y[1] - y[0]) if (y.size > 1) else 0.0))
+		r2c.grid.xOrigin = float(g.get('ensim_xOrigin', x[0] - r2c.grid.xDelta/2.0))
+		r2c.grid.yOrigin = float(g.get('ensim_yOrigin', y[0] - r2c.grid.yDelta/2.0))
+		for k in ['CentreLatitude', 'CentreLongitude', 'RotationLatitude', 'RotationLongitude']:
+			if ('ensim_' + k in g):
+				setattr(r2c.grid, k, float(g['ensim_' + k]))
+		if ('crs' in ds.variables and ds.variables['crs'].grid_mapping_name == 'rotated_latitude_longitude'):
+			r2c.grid.GridNorthPoleLatitude = float(ds.variables['crs'].grid_north_pole_latitude)
+			r2c.grid.GridNorthPoleLongitude = float(ds.variables['crs'].grid_north_pole_longitude)
+			r2c.grid.NorthPoleGridLongitude = float(getattr(ds.variables['crs'], 'north_pole_grid_longitude', 0.0))
+
+		# Meta information.
+		if (any([k.startswith('ensim_meta_') for k in g])):
+			r2c.meta = r2cmeta()
+			for k in g:
+				if (k.startswith('ensim_meta_')):
+					setattr(r2c.meta, k[len('ensim_meta_'):], g[k])
+
+		# Cells inside the box.
+		box = r2cboxfromr2c(r2c, xybox = xybox, latlonbox = latlonbox)
+		if (box is None):
+			(x0, x1, y0, y1) = (0, r2c.grid.xCount, 0, r2c.grid.yCount)
+		else:
+			(x0, x1, y0, y1) = box
+
+		# Frames from 'start' to before 'stop'.
+		framed = ('time' in ds.variables)
+		if (framed):
+			t = ds.variables['time']
+			if (getattr(t, 'units', '') == NCTIMEUNITS):
+				frame_times = np.datetime64('1970-01-01T00:00:00', 's') + t[:].astype(np.int64).astype('timedelta64[s]')
+			else:
+				frame_times = np.array(netCDF4.num2date(t[:], t.units, getattr(t, 'calendar', 'standard'), only_use_cftime_datetimes = False, only_use_python_datetimes = True), dtype = 'datetime64[s]')
+			i0 = 0
+			i1 = frame_times.size
+			if (not start is None):
+				i0 = int(np.searchsorted(frame_times, r2cdatetime64(start)))
+			if (not stop is None):
+				i1 = max(i0, int(np.searchsorted(frame_times, r2cdatetime64(stop))))
+
+		# Variables of attributes.
+		variables = [v for v in ds.variables.values() if (getattr(v, 'grid_mapping', None) == 'crs')]
+		if (not attributes is None):
+			names = [n.strip('"').lower() for n in attributes]
+			variables = [v for v in variables if (getattr(v, 'long_name', v.name).lower() in names or v.name.lower() in names)]
+
+		# Read the data.
+		for v in variables:
+			a = r2cattribute(AttributeName = getattr(v, 'ensim_AttributeName', getattr(v, 'long_name', v.name)), AttributeType = getattr(v, 'ensim_AttributeType', None), AttributeUnits = getattr(v, 'ensim_AttributeUnits', getattr(v, 'units', None)))
+			if (framed and 'time' in v.dimensions):
+				a.AttributeData = np.transpose(np.ma.getdata(v[i0:i1, y0:y1, x0:x1]), (0, 2, 1)).astype(R2CDTYPE)
+				a.FrameTimes = frame_times[i0:i1]
+				a.FrameCount = i1 - i0
+				if (not asarray):
+					a.AttributeData = r2cframesasdataframe(a)
+			else:
+				a.AttributeData = np.transpose(np.ma.getdata(v[y0:y1, x0:x1])).astype(R2CDTYPE)
+			r2c.attr.append(a)
 
-		# Print footer.
-		r2cfid.write(':EndFrame\n')
+	# Update the grid specification to the extent of the box.
+	r2cgridfrombox(r2c, box)
 
 # Open and print the header to file using information provided via 'tb0'.
 # Overwrites any existing file with the same file information.
@@ -295,7 +1339,7 @@ def tb0filecreateheader(tb0, fpathtb0out):
 
 	# Write the header.
 	# Writing the header overwrites any existing file.
-	with open(fpathtb0out, 'w') as tb0fid:
+	with fileopen(fpathtb0out, 'w') as tb0fid:
 
 		# Write the file type.
 		tb0fid.write('########################################\n')
@@ -316,8 +1360,8 @@ def tb0filecreateheader(tb0, fpathtb0out):
 		if (not tb0.meta is None):
 			tb0fid.write('#\n')
 			tb0fid.write(':StartTime ' + strftime('%Y/%m/%d %H:%M:%S', tb0.meta.StartTime.timetuple()) + '\n')
-			tb0fid.write(':DeltaT ' + str(tb0.meta.DeltaT) + '\n')
-			tb0fid.write(':RoutingDeltaT ' + str(tb0.meta.RoutingDeltaT) + '\n')
+			tb0fid.write(':DeltaT ' + tb0deltattostring(tb0.meta.DeltaT) + '\n')
+			tb0fid.write(':RoutingDeltaT ' + tb0deltattostring(tb0.meta.RoutingDeltaT) + '\n')
 			tb0fid.write('#\n')
 			tb0fid.write(':FillFlag ' + tb0.meta.FillFlag + '\n')
 		tb0fid.write('#\n')
@@ -380,16 +1424,81 @@ def tb0filecreateheader(tb0, fpathtb0out):
 # Appends records to an existing file.
 # 'r2cfilecreateheader' should be called in advance of this routine to properly create the file.
 # File operation re-opens and appends to the file to reduce memory usage.
-def tb0fileappendcolumndata(tb0, fpathtb0out):
+# Values are formatted by 'fmt' (default: 'str' of each value, see 'tb0textfromarray').
+def tb0fileappendcolumndata(tb0, fpathtb0out, fmt = '%s'):
+
+	# Collect the first 'RecordCount' values of the columns as a (records, columns) array.
+	# Values are kept as objects (e.g., numpy scalars of arrays) so that the default format prints each value as 'str' of the value.
+	data = np.empty((tb0.RecordCount, len(tb0.cols)), dtype = object)
+	for i, a in enumerate(tb0.cols):
+		data[:, i] = list(a.ColumnData[:tb0.RecordCount])
 
 	# Will append the data to an existing file.
-	# Determine formatting by the type of variable (%g).
-	with open(fpathtb0out, 'a') as tb0fid:
-		for n in range(tb0.RecordCount):
-			line = ''
-			for i, a in enumerate(tb0.cols):
-				line += ' ' + str(a.ColumnData[n])
-			tb0fid.write(line + '\n')
+	with fileopen(fpathtb0out, 'a', R2CBUFFERSIZE) as tb0fid:
+		tb0filewriterecords(tb0fid, data, fmt)
+
+# Return the text of records of data (records, columns) as printed to 'tb0' format files.
+# Each record is printed on a line, with each value preceded by a space and formatted by 'fmt' (e.g., '%g', '%.3f').
+# The default format ('%s') prints values as 'str' (of the Python type of the value).
+# All values are formatted together by a single string operation.
+def tb0textfromarray(data, fmt = '%s'):
+
+	# Format the data.
+	# Values of object arrays are formatted as the objects (e.g., values of lists); other arrays are converted to Python values.
+	# Values of arrays of less than double precision (e.g., 'float32') are formatted as numpy scalars, for which 'str' gives the shortest text of the value in that precision.
+	data = np.asarray(data)
+	if (data.ndim == 1):
+		data = data[np.newaxis]
+	(nr, nc) = np.shape(data)
+	if (nr == 0):
+		return ''
+	if (data.dtype.kind == 'f' and data.dtype.itemsize < 8):
+		values = tuple(data.ravel())
+	else:
+		values = tuple(data.ravel().tolist())
+	return (((' ' + fmt)*nc + '\n')*nr) % values
+
+# Write records of data (records, columns) to an open 'tb0' format file.
+# Values are formatted by 'fmt' (see 'tb0textfromarray').
+# Records are formatted in blocks of 'TB0RECORDCHUNK' records, which are written to the file together.
+def tb0filewriterecords(tb0fid, data, fmt = '%s'):
+
+	# Write the records.
+	for i in range(0, len(data), TB0RECORDCHUNK):
+		tb0fid.write(tb0textfromarray(data[i:(i + TB0RECORDCHUNK)], fmt))
+
+# Writer of records to a 'tb0' format file (time-series) that keeps the file open.
+# Creates the file and writes the header (see 'tb0filecreateheader'); 'RecordCount' of the 'tb0' object is set to the number of records written.
+# Records are written by 'appendrecords', which accepts blocks of data (records, columns) or a single record (columns),
+# to the buffer of the open file ('buffering', default: 'R2CBUFFERSIZE') with values formatted by 'fmt' (see 'tb0textfromarray').
+# Use as a context manager (e.g., 'with tb0recordwriter(tb0, fpath) as w:') to close the file if an exception occurs.
+class tb0recordwriter(object):
+	def __init__(self, tb0, fpathtb0out, fmt = '%s', buffering = None):
+		self.tb0 = tb0
+		self.FilePath = fpathtb0out
+		self.fmt = fmt
+		tb0filecreateheader(tb0, fpathtb0out)
+		tb0.RecordCount = 0
+		self.context = fileopen(fpathtb0out, 'a', R2CBUFFERSIZE if (buffering is None) else buffering)
+		self.f = self.context.__enter__()
+	def __enter__(self):
+		return self
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+	def appendrecords(self, block):
+
+		# Write the records.
+		block = np.asarray(block)
+		if (block.ndim == 1):
+			block = block[np.newaxis]
+		tb0filewriterecords(self.f, block, self.fmt)
+		self.tb0.RecordCount += len(block)
+	def flush(self):
+		self.f.flush()
+	def close(self):
+		if (not self.f is None):
+			self.context.__exit__(None, None, None)
+			self.f = None
 
 # Derive the 'r2c'/EnSim compatible grid specification from an existing standard format (fst) file.
 # Supports 'LATLONG' and 'ROTLATLONG' projections.
@@ -448,70 +1557,220 @@ def r2cgridfromfst(fstmatchgrid, r2c):
 		print('ERROR: The fst grid type ' + fstmatchgrid['grref'] + ' is not supported. The script cannot continue.')
 		exit()
 
-# Derive the 'r2c'/EnSim compatible grid specification from an existing 'r2c' format file.
-# Supports 'LATLONG' and 'ROTLATLONG' projections.
-# Reads the projection from file.
-def r2cgridfromr2c(r2c, fpathr2cin):
+# Parse the header of an existing 'r2c' format file from an open file object.
+# Each line of the header is tokenized once and dispatched to the grid, meta, or attribute information of the 'r2c' object.
+# Sections are only assigned if the corresponding 'readgrid', 'readmeta', and 'readattr' flags are 'True'.
+# Attributes are appended to the existing list of attributes in the 'r2c' object.
+# Returns when the ':EndHeader' line is read, leaving the file positioned at the start of the data.
+def r2cparseheader(r2c, f, readgrid = True, readmeta = True, readattr = True):
 
-	# Set r2c attributes to match the grid defined by fpathr2cin.
-	# Reads the projection from file.
-	with open(fpathr2cin, 'r') as f:
-		for l in f:
+	# Reset the meta information (if applicable).
+	if (readmeta):
+		r2c.meta = r2cmeta()
 
-			# Continue if not an attribute identified with leading ':'.
-			if (l.find(':') != 0):
-				continue
+	# Read the header.
+	while True:
 
-			# Identify and save attributes related to projection and grid specification.
-			m = l.strip().lower().split()
+		# Read line and break if no more lines exist in the file.
+		# Decode the line if the file is read in binary mode.
+		l = f.readline()
+		if not l:
+			break
+		if (isinstance(l, bytes)):
+			l = l.decode('latin-1')
 
-			# Standard EnSim attributes (LATLONG, ROTLATLONG).
-			if (m[0] == ':projection'):
+		# Continue if not an attribute identified with leading ':'.
+		if (l.find(':') != 0):
+			continue
+
+		# Tokenize the line.
+		# The original case of the values is preserved for attribute names and properties.
+		m = l.strip().split()
+		k = m[0].lower()
+
+		# ':EndHeader'.
+		if (k == ':endheader'):
+
+			# Exit if at the end of the header.
+			return
+
+		# Standard EnSim attributes (LATLONG, ROTLATLONG).
+		if (readgrid):
+			if (k == ':projection'):
 				r2c.grid.Projection = m[1].upper()
-			elif (m[0] == ':ellipsoid'):
+				continue
+			elif (k == ':ellipsoid'):
 				r2c.grid.Ellipsoid = m[1].upper()
-			elif (m[0] == ':centrelatitude'):
+				continue
+			elif (k == ':centrelatitude'):
 				r2c.grid.CentreLatitude = float(m[1])
-			elif (m[0] == ':centrelongitude'):
+				continue
+			elif (k == ':centrelongitude'):
 				r2c.grid.CentreLongitude = float(m[1])
-			elif (m[0] == ':rotationlatitude'):
+				continue
+			elif (k == ':rotationlatitude'):
 				r2c.grid.RotationLatitude = float(m[1])
-			elif (m[0] == ':rotationlongitude'):
+				continue
+			elif (k == ':rotationlongitude'):
 				r2c.grid.RotationLongitude = float(m[1])
-			elif (m[0] == ':xorigin'):
+				continue
+			elif (k == ':xorigin'):
 				r2c.grid.xOrigin = float(m[1])
-			elif (m[0] == ':yorigin'):
+				continue
+			elif (k == ':yorigin'):
 				r2c.grid.yOrigin = float(m[1])
-			elif (m[0] == ':xcount'):
+				continue
+			elif (k == ':xcount'):
 				r2c.grid.xCount = int(m[1])
-			elif (m[0] == ':ycount'):
+				continue
+			elif (k == ':ycount'):
 				r2c.grid.yCount = int(m[1])
-			elif (m[0] == ':xdelta'):
+				continue
+			elif (k == ':xdelta'):
 				r2c.grid.xDelta = float(m[1])
-			elif (m[0] == ':ydelta'):
+				continue
+			elif (k == ':ydelta'):
 				r2c.grid.yDelta = float(m[1])
+				continue
 
 			# Compliancy terms to avoid rederivation for netCDF projection (not part of EnSim standard).
 			# Note: These omit the half-delta offset.
-			elif (m[0] == ':gridnorthpolelatitude'):
+			elif (k == ':gridnorthpolelatitude'):
 				r2c.grid.GridNorthPoleLatitude = float(m[1])
-			elif (m[0] == ':gridnorthpolelongitude'):
+				continue
+			elif (k == ':gridnorthpolelongitude'):
 				r2c.grid.GridNorthPoleLongitude = float(m[1])
-			elif (m[0] == ':northpolegridlongitude'):
+				continue
+			elif (k == ':northpolegridlongitude'):
 				r2c.grid.NorthPoleGridLongitude = float(m[1])
+				continue
 
-			# ':EndHeader'.
-			elif (m[0] == ':endheader'):
+		# Drainage database meta information.
+		if (readmeta):
+			if (k == ':nominalgridsize_al'):
+				r2c.meta.NominalGridSize_AL = float(m[1])
+				continue
+			elif (k == ':contourinterval'):
+				r2c.meta.ContourInterval = float(m[1])
+				continue
+			elif (k == ':imperviousarea'):
+				r2c.meta.ImperviousArea = float(m[1])
+				continue
+			elif (k == ':classcount'):
+				r2c.meta.ClassCount = int(m[1])
+				continue
+			elif (k == ':numriverclasses'):
+				r2c.meta.NumRiverClasses = int(m[1])
+				continue
+			elif (k == ':elevconversion'):
+				r2c.meta.ElevConversion = float(m[1])
+				continue
+			elif (k == ':totalnumofgrids'):
+				r2c.meta.TotalNumOfGrids = int(m[1])
+				continue
+			elif (k == ':numgridsinbasin'):
+				r2c.meta.NumGridsInBasin = int(m[1])
+				continue
+			elif (k == ':debuggridno'):
+				r2c.meta.DebugGridNo = int(m[1])
+				continue
 
-				# Exit if at the end of the header.
-				return
+		# Check for 'AttributeName', which defines a new attribute.
+		# Attribute properties should always follow 'AttributeName', so assign them to the last activated attribute.
+		# Multi-frame 'r2c' files, which should contain a single attribute, may not include an attribute ID.
+		if (readattr):
+			if (k == ':attributename'):
+				r2c.attr.append(r2cattribute())
+				if (len(m) > 1):
+					if (m[1].isdigit() and len(m) > 2):
+						r2c.attr[-1].AttributeName = ' '.join(m[2:])
+					else:
+						r2c.attr[-1].AttributeName = ' '.join(m[1:])
+			elif (k == ':attributetype'):
+				if (len(m) > 1):
+					if (m[1].isdigit() and len(m) > 2):
+						r2c.attr[-1].AttributeType = m[2]
+					else:
+						r2c.attr[-1].AttributeType = m[1]
+			elif (k == ':attributeunits'):
+				if (len(m) > 1):
+					if (m[1].isdigit() and len(m) > 2):
+						r2c.attr[-1].AttributeUnits = m[2]
+					else:
+						r2c.attr[-1].AttributeUnits = m[1]
+
+# Read grid, meta information, and attributes from an existing 'r2c' format file in a single pass.
+# The file is opened once and the header is tokenized once.
+# Sections are only read if the corresponding 'readgrid', 'readmeta', and 'readattr' flags are 'True'.
+# Data are only read if 'readattr' is 'True', in which case the grid specification must be read or already exist in the 'r2c' object.
+# Multi-frame data are returned as a 'DataFrame' unless 'asarray' is 'True' (see 'r2cattributedatafromfile').
+# Optionally, read only the frames in the time window from 'start' to before 'stop' (see 'r2cdatetime64').
+# Optionally, read only the cells inside 'xybox' or 'latlonbox' (see 'r2cboxfromr2c'), in which case the grid is updated to the extent of the box.
+# Optionally, read only the single-frame attributes listed by name in 'attributes' (see 'r2cattributedatafromfile').
+# If 'cache' is 'True' (default: 'R2CCACHE'), data are loaded from the cache files of the file if they exist and match the file (see 'r2cattributedatafromcache').
+# Otherwise, data are read from the file and, if the entire file was read, saved to the cache files (see 'r2ccachesave').
+# If 'processes' is greater than '1' (default: 'R2CPROCESSES'), large multi-frame files are read in parallel (see 'r2cattributedatafromr2cparallel').
+# Supports 'LATLONG' and 'ROTLATLONG' projections.
+def r2cfromr2c(r2c, fpathr2cin, readgrid = True, readmeta = True, readattr = True, asarray = False, start = None, stop = None, xybox = None, latlonbox = None, attributes = None, cache = None, processes = None):
+
+	# Read the file.
+	if (cache is None):
+		cache = R2CCACHE
+	if (processes is None):
+		processes = R2CPROCESSES
+	with fileopen(fpathr2cin, 'rb', R2CBUFFERSIZE) as f:
+
+		# Read the header.
+		# Save the index of the first attribute read from file.
+		first = len(r2c.attr)
+		r2cparseheader(r2c, f, readgrid = readgrid, readmeta = readmeta, readattr = readattr)
+
+		# Read the attributes from the file.
+		if (readattr):
+			box = r2cboxfromr2c(r2c, xybox = xybox, latlonbox = latlonbox)
+
+			# Load the data from the cache files.
+			if (cache):
+				fpathcache = r2ccachepath(fpathr2cin)
+				(key, header) = r2ccachekey(fpathr2cin, f)
+				if (r2cattributedatafromcache(r2c, fpathcache, key, first, asarray = asarray, start = start, stop = stop, box = box, attributes = attributes)):
+					return
+
+			# Data are read as an array if the cache files are saved.
+			save_cache = (cache and start is None and stop is None and box is None and attributes is None)
+			if (save_cache):
+				asarray_read = True
+			else:
+				asarray_read = asarray
+
+			# Read the data in parallel.
+			# Otherwise, use the frame index to seek to the first frame in the time window.
+			if (not (processes > 1 and r2cattributedatafromr2cparallel(r2c, fpathr2cin, first, processes, asarray = asarray_read, start = start, stop = stop, box = box))):
+				index = None
+				if (not start is None):
+					index = r2cframeindexfromr2c(fpathr2cin)
+				r2cattributedatafromfile(r2c, f, first, asarray = asarray_read, start = start, stop = stop, box = box, index = index, attributes = attributes)
+
+			# Save the cache files if the entire file was read.
+			if (save_cache):
+				r2ccachesave(r2c, fpathcache, key, header, first)
+				if (r2c.attr[first:] and not r2c.attr[first].FrameTimes is None and not asarray):
+					r2c.attr[first].AttributeData = r2cframesasdataframe(r2c.attr[first])
+
+# Derive the 'r2c'/EnSim compatible grid specification from an existing 'r2c' format file.
+# Supports 'LATLONG' and 'ROTLATLONG' projections.
+# Reads the projection from file.
+def r2cgridfromr2c(r2c, fpathr2cin):
+
+	# Set r2c attributes to match the grid defined by fpathr2cin.
+	r2cfromr2c(r2c, fpathr2cin, readgrid = True, readmeta = False, readattr = False)
 
 # Derive the EnSim/Green Kenue projection from an existing 'tb0' format file.
 # Supports 'LATLONG' projection only.
 def tb0projectionfromtb0(tb0, fpathtb0in):
 
 	# Set tb0 attributes to match the projection defined in fpathtb0in.
-	with open(fpathtb0in, 'r') as f:
+	with fileopen(fpathtb0in, 'r') as f:
 		for l in f:
 
 			# Continue if not an attribute identified with leading ':'.
@@ -539,39 +1798,7 @@ def tb0projectionfromtb0(tb0, fpathtb0in):
 def r2cmetafromr2c(r2c, fpathr2cin):
 
 	# Set r2c attributes baesd on the attributes in fpathr2cin.
-	# Reads the information from file.
-	r2c.meta = r2cmeta()
-	with open(fpathr2cin, 'r') as f:
-		for l in f:
-
-			# Continue if not an attribute identified with leading ':'.
-			if (l.find(':') != 0):
-				continue
-
-			# Identify and save attributes related to meta information.
-			m = l.strip().lower().split()
-			if(m[0] == ':nominalgridsize_al'):
-				r2c.meta.NominalGridSize_AL = float(m[1])
-			elif(m[0] == ':contourinterval'):
-				r2c.meta.ContourInterval = float(m[1])
-			elif(m[0] == ':imperviousarea'):
-				r2c.meta.ImperviousArea = float(m[1])
-			elif(m[0] == ':classcount'):
-				r2c.meta.ClassCount = int(m[1])
-			elif(m[0] == ':numriverclasses'):
-				r2c.meta.NumRiverClasses = int(m[1])
-			elif(m[0] == ':elevconversion'):
-				r2c.meta.ElevConversion = float(m[1])
-			elif(m[0] == ':totalnumofgrids'):
-				r2c.meta.TotalNumOfGrids = int(m[1])
-			elif(m[0] == ':numgridsinbasin'):
-				r2c.meta.NumGridsInBasin = int(m[1])
-			elif(m[0] == ':debuggridno'):
-				r2c.meta.DebugGridNo = int(m[1])
-			elif (m[0] == ':endheader'):
-
-				# Exit if at the end of the header.
-				return
+	r2cfromr2c(r2c, fpathr2cin, readgrid = False, readmeta = True, readattr = False)
 
 # Derive the standard file (fst)/RPN format grid specification from an existing 'r2c' format file.
 # Supports 'LATLONG' and 'ROTLATLONG' projections.
@@ -615,7 +1842,7 @@ def tb0metafromtb0(tb0, fpathtb0in):
 	# Set tb0 attributes based on the attributes in fpathtb0in.
 	# Reads the information from file.
 	tb0.meta = tb0meta()
-	with open(fpathtb0in, 'r') as f:
+	with fileopen(fpathtb0in, 'r') as f:
 		for l in f:
 
 			# Continue if not an attribute identified with leading ':'.
@@ -623,19 +1850,14 @@ def tb0metafromtb0(tb0, fpathtb0in):
 				continue
 
 			# Identify and save attributes related to meta information.
+			# Fractional seconds of 'StartTime' (e.g., '00:00:00.000') are discarded.
 			m = l.strip().lower().split()
 			if(m[0] == ':starttime'):
-				tb0.meta.StartTime = datetime.strptime(' '.join(m[1:]).strip('"'), '%Y/%m/%d %H:%M:%S')
+				tb0.meta.StartTime = datetime.strptime(' '.join(m[1:]).strip('"').split('.')[0], '%Y/%m/%d %H:%M:%S')
 			elif(m[0] == ':deltat'):
-				if (not m[1].find(':') == 0):
-					tb0.meta.DeltaT = int(m[1])
-				else:
-					tb0.meta.DeltaT = datetime.strptime(m[1], '%H:%M:%S')
+				tb0.meta.DeltaT = tb0deltatfromstring(m[1])
 			elif(m[0] == ':routingdeltat'):
-				if (not m[1].find(':') == 0):
-					tb0.meta.RoutingDeltaT = int(m[1])
-				else:
-					tb0.meta.RoutingDeltaT = datetime.strptime(m[1], '%H:%M:%S')
+				tb0.meta.RoutingDeltaT = tb0deltatfromstring(m[1])
 			elif(m[0] == ':fillflag'):
 				tb0.meta.FillFlag = m[1]
 			elif (m[0] == ':endheader'):
@@ -643,33 +1865,423 @@ def tb0metafromtb0(tb0, fpathtb0in):
 				# Exit if at the end of the header.
 				return
 
-# Return a vector of point data read from standard file (fst) format.
-# Check for special 'UU', 'VV', 'UV', or 'WD' attributes to for special wind-component interpolation.
-# Use regular 'ez' interpolation for all other fields.
-# Optionally, apply transform as prescribed by provided arguments.
-# Calls 'exit()' if an error occurs while extracting the field.
-def latlonvalfromfst(
-	lat, lon, fstfid, fstnomvar, fstetiket = ' ', fstip1 = -1, fstip2 = -1, fstip3 = -1,
-	intpopt = rmn.EZ_INTERP_NEAREST,
-	constmul = 1.0, constadd = 0.0, constrmax = float('inf'), constrmin = float('-inf')):
+# Convert the value of ':DeltaT' or ':RoutingDeltaT' in 'tb0' format files.
+# Values in the form 'HH:MM:SS' are returned as 'timedelta'; other values are returned as 'int' (or 'float' if not an integer) hours.
+def tb0deltatfromstring(s):
+
+	# Convert the value.
+	if (':' in s):
+		(h, m, sec) = (s.split(':') + ['0', '0'])[:3]
+		return timedelta(hours = int(h), minutes = int(m), seconds = float(sec))
+	try:
+		return int(s)
+	except ValueError:
+		return float(s)
+
+# Return the value of ':DeltaT' or ':RoutingDeltaT' as printed to 'tb0' format files (see 'tb0deltatfromstring').
+def tb0deltattostring(deltat):
+
+	# Convert the value.
+	if (isinstance(deltat, timedelta)):
+		s = int(deltat.total_seconds())
+		return '%02d:%02d:%02d' % (s//3600, (s % 3600)//60, s % 60)
+	return str(deltat)
+
+# Return the time-step ('DeltaT') of a 'tb0' object as 'timedelta64' (seconds).
+# 'DeltaT' can be a 'timedelta' or a number of hours (see 'tb0deltatfromstring').
+def tb0deltat64(tb0):
+
+	# Convert the time-step.
+	if (isinstance(tb0.meta.DeltaT, timedelta)):
+		return np.timedelta64(int(tb0.meta.DeltaT.total_seconds()), 's')
+	return np.timedelta64(int(round(float(tb0.meta.DeltaT)*3600.0)), 's')
+
+# Return the time-stamps of the records of a 'tb0' object as 'datetime64' (seconds).
+# The time-stamps are derived from 'StartTime' and 'DeltaT' of the meta information (see 'tb0metafromtb0'); the data are not required.
+# The number of records is 'count' if provided, otherwise 'RecordCount'.
+# The array is built when first requested and kept in 'TimeIndex' of the 'tb0' object, where it is reused while the meta information and number of records are unchanged.
+# Calls 'exit()' if 'StartTime' or 'DeltaT' is not defined.
+def tb0timeindex(tb0, count = None):
+
+	# Check the meta information.
+	if (tb0.meta is None or tb0.meta.StartTime is None or not tb0.meta.DeltaT):
+		print('ERROR: \'StartTime\' and \'DeltaT\' are required to derive the time-stamps of the records. The script cannot continue.')
+		exit()
+	if (count is None):
+		count = tb0.RecordCount
+
+	# Reuse the existing index.
+	key = (tb0.meta.StartTime, tb0.meta.DeltaT, count)
+	if (not tb0.TimeIndex is None and tb0.TimeIndexKey == key):
+		return tb0.TimeIndex
+
+	# Build the index.
+	tb0.TimeIndex = r2cdatetime64(tb0.meta.StartTime) + np.arange(count)*tb0deltat64(tb0)
+	tb0.TimeIndexKey = key
+	return tb0.TimeIndex
+
+# Return the 'slice' of the records of a 'tb0' object from 'start' to before 'stop' (see 'r2cdatetime64' for the accepted types).
+# The records are found by binary search of the time-stamps (see 'tb0timeindex').
+# The 'slice' selects views (no data are copied) of 'Data', the 'ColumnData' of the columns, and the time-stamps (e.g., 'tb0.Data[s]').
+def tb0slice(tb0, start = None, stop = None):
+
+	# Find the records.
+	index = tb0timeindex(tb0)
+	i0 = 0
+	i1 = index.size
+	if (not start is None):
+		i0 = int(np.searchsorted(index, r2cdatetime64(start)))
+	if (not stop is None):
+		i1 = max(i0, int(np.searchsorted(index, r2cdatetime64(stop))))
+	return slice(i0, i1)
+
+# Return the grid of a record read from a standard file (fst) (e.g., by 'rmn.fstlir'), as returned by 'rmn.readGrid'.
+# Grids are kept in 'FSTGRIDCACHE' for the rest of the process, indexed by the grid descriptors of the record ('grtyp', 'ig1'-'ig4', 'ni', 'nj'),
+# so that the grid is only read once for all records and files on the same grid (e.g., all fields and hours of an archive).
+# Hits and misses are counted in 'FSTCACHESTATS'.
+def fstgridfromrecord(fstfid, fstrec):
+
+	# Check the cache.
+	key = (fstrec['grtyp'], fstrec['ig1'], fstrec['ig2'], fstrec['ig3'], fstrec['ig4'], fstrec['ni'], fstrec['nj'])
+	grid = FSTGRIDCACHE.get(key)
+	if (not grid is None):
+		FSTCACHESTATS['GridHits'] += 1
+		return grid
+
+	# Read the grid.
+	FSTCACHESTATS['GridMisses'] += 1
+	grid = rmn.readGrid(fstfid, fstrec)
+	FSTGRIDCACHE[key] = grid
+	return grid
+
+# Define the ezscint interpolation set from grid 'fstvargrid' to grid 'fstmatchgrid' (see 'rmn.ezdefset').
+# The set is only defined if it is not already the active set, which is tracked in 'FSTEZSTATE'; hits and misses are counted in 'FSTCACHESTATS'.
+def fstezdefset(fstmatchgrid, fstvargrid):
+
+	# Check the active set.
+	key = (fstmatchgrid['id'], fstvargrid['id'])
+	if (FSTEZSTATE['Set'] == key):
+		FSTCACHESTATS['SetHits'] += 1
+		return
+
+	# Define the set.
+	FSTCACHESTATS['SetMisses'] += 1
+	rmn.ezdefset(fstmatchgrid, fstvargrid)
+	FSTEZSTATE['Set'] = key
+
+# Set the ezscint interpolation degree (e.g., 'rmn.EZ_INTERP_NEAREST', 'rmn.EZ_INTERP_LINEAR').
+# The option is only set if it differs from the active degree, which is tracked in 'FSTEZSTATE'.
+def fstezsetinterp(intpopt):
+
+	# Set the option.
+	if (FSTEZSTATE['InterpDegree'] != intpopt):
+		rmn.ezsetopt(rmn.EZ_OPT_INTERP_DEGREE, intpopt)
+		FSTEZSTATE['InterpDegree'] = intpopt
+
+# Return a copy of the hit and miss counters of the grid and interpolation set caches (see 'FSTCACHESTATS').
+def fstcachestats():
+
+	# Copy the counters.
+	return dict(FSTCACHESTATS)
+
+# Clear the grid, interpolation set, and interpolation weight caches and reset the counters.
+# The grids are released (see 'rmn.gdrls'); call if grids are released or ezscint options are changed elsewhere.
+def fstcacheclear():
+
+	# Release the grids.
+	for grid in FSTGRIDCACHE.values():
+		try:
+			rmn.gdrls(grid['id'])
+		except:
+			pass
+	FSTGRIDCACHE.clear()
+	FSTWEIGHTSCACHE.clear()
+
+	# Reset the state and counters.
+	FSTEZSTATE['Set'] = None
+	FSTEZSTATE['InterpDegree'] = None
+	for k in FSTCACHESTATS:
+		FSTCACHESTATS[k] = 0
+
+# Return the name of the interpolation degree supported by interpolation weights ('nearest' or 'linear') for the ezscint option 'intpopt'
+# (e.g., 'rmn.EZ_INTERP_NEAREST', 'rmn.EZ_INTERP_LINEAR'; the names are also accepted), or 'None' if weights do not support the degree.
+def fstweightsdegree(intpopt):
+
+	# Return the name.
+	if (intpopt in ['nearest', 'linear']):
+		return intpopt
+	elif (intpopt == rmn.EZ_INTERP_NEAREST):
+		return 'nearest'
+	elif (intpopt == rmn.EZ_INTERP_LINEAR):
+		return 'linear'
+	return None
+
+# Return the key of the interpolation weights from the grid of the record 'fstrec' to the grid 'fstmatchgrid' with interpolation degree 'degree'.
+# The key is the SHA-1 hash of the definition of 'fstmatchgrid' (excluding the grid id), the grid descriptors of the record ('grtyp', 'ig1'-'ig4', 'ni', 'nj'),
+# and the degree, so that it can be derived without reading the grid of the record.
+def fstweightskey(fstmatchgrid, fstrec, degree):
+
+	# Hash the definition of the target grid.
+	h = hashlib.sha1()
+	for k in sorted(fstmatchgrid):
+		if (k in ['id', 'subgridid', 'subgrid']):
+			continue
+		v = fstmatchgrid[k]
+		if (isinstance(v, np.ndarray)):
+			h.update(('%s=%s%s;' % (k, v.dtype.str, v.shape)).encode())
+			h.update(np.ascontiguousarray(v).tobytes())
+		else:
+			if (isinstance(v, np.generic)):
+				v = v.item()
+			h.update(('%s=%r;' % (k, v)).encode())
+
+	# Add the grid descriptors of the record and the degree.
+	h.update(('%s;%s;%d;%d;%d;%d;%d;%d' % (degree, fstrec['grtyp'], fstrec['ig1'], fstrec['ig2'], fstrec['ig3'], fstrec['ig4'], fstrec['ni'], fstrec['nj'])).encode())
+	return h.hexdigest()
+
+# Compute the interpolation weights from grid 'fstvargrid' to grid 'fstmatchgrid' with interpolation degree 'degree' ('nearest' or 'linear').
+# The points of 'fstmatchgrid' are located in 'fstvargrid' (see 'rmn.gdll' and 'rmn.gdxyfll') and the weights derived from the positions (see 'fstweightsfrompositions').
+# Returns 'None' if any point is outside 'fstvargrid'.
+def fstweightsfromgrids(fstmatchgrid, fstvargrid, degree):
+
+	# Check for 'RUNRPNPY'.
+	if (not RUNRPNPY):
+		print('ERROR: rpnpy is not loaded. Function cannot continue: %s' % 'fstweightsfromgrids')
+		exit()
+
+	# Locate the points of the target grid in the source grid.
+	# Positions returned by 'rmn.gdxyfll' start at 1.
+	lalo = rmn.gdll(fstmatchgrid['id'])
+	xy = rmn.gdxyfll(fstvargrid['id'], lalo['lat'], lalo['lon'])
+	x = np.asarray(xy['x'], dtype = np.float64).ravel() - 1.0
+	y = np.asarray(xy['y'], dtype = np.float64).ravel() - 1.0
+	return fstweightsfrompositions(x, y, fstvargrid['ni'], fstvargrid['nj'], degree, np.asarray(lalo['lat']).shape)
+
+# Compute the interpolation weights of the points at positions 'x' and 'y' (starting at 0) in a source grid of 'ni' by 'nj' cells
+# with interpolation degree 'degree' ('nearest' or 'linear'); 'shape' is the shape of the target grid of the points.
+# 'nearest' takes the nearest source cell and 'linear' the bilinear weights of the four surrounding source cells.
+# Returns 'None' if any point is outside the source grid (e.g., between the last and first columns of global grids that wrap around),
+# where ezscint extrapolates or wraps around the grid rather than taking the values of the nearest edge. Does not require rpnpy.
+def fstweightsfrompositions(x, y, ni, nj, degree, shape):
+
+	# Check the positions.
+	x = np.asarray(x, dtype = np.float64).ravel()
+	y = np.asarray(y, dtype = np.float64).ravel()
+	if (not (np.all((x >= 0.0) & (x <= ni - 1)) and np.all((y >= 0.0) & (y <= nj - 1)))):
+		return None
+
+	# Source cells and weights of each point.
+	if (degree == 'nearest'):
+		i = np.clip(np.floor(x + 0.5), 0, ni - 1).astype(np.int64)
+		j = np.clip(np.floor(y + 0.5), 0, nj - 1).astype(np.int64)
+		cells = (i + j*ni)[:, np.newaxis]
+		weights = np.ones(cells.shape)
+	elif (degree == 'linear'):
+		i0 = np.clip(np.floor(x), 0, max(ni - 2, 0)).astype(np.int64)
+		j0 = np.clip(np.floor(y), 0, max(nj - 2, 0)).astype(np.int64)
+		i1 = np.minimum(i0 + 1, ni - 1)
+		j1 = np.minimum(j0 + 1, nj - 1)
+		fx = np.clip(x - i0, 0.0, 1.0)
+		fy = np.clip(y - j0, 0.0, 1.0)
+		cells = np.stack([i0 + j0*ni, i1 + j0*ni, i0 + j1*ni, i1 + j1*ni], axis = 1)
+		weights = np.stack([(1.0 - fx)*(1.0 - fy), fx*(1.0 - fy), (1.0 - fx)*fy, fx*fy], axis = 1)
+	else:
+		print('ERROR: Interpolation weights do not support the interpolation degree %s. The script cannot continue.' % degree)
+		exit()
+
+	# Keep only the source cells used by the points.
+	(used, columns) = np.unique(cells, return_inverse = True)
+	w = fstweights()
+	w.InterpDegree = degree
+	w.TargetShape = tuple(shape)
+	w.SourceShape = (ni, nj)
+	w.SourceI = used % ni
+	w.SourceJ = used//ni
+	w.Columns = columns.reshape(cells.shape)
+	w.Weights = weights
+	return w
+
+# Save interpolation weights (see 'fstweights') to a '.npz' file.
+# The file is written to a temporary file and renamed to replace an existing file atomically.
+def fstweightsfile(w, fpathweights):
+
+	# Create the directory.
+	d = path.dirname(fpathweights)
+	if (d != '' and not path.exists(d)):
+		os.makedirs(d)
+
+	# Save the file.
+	with open(fpathweights + '.tmp', 'wb') as f:
+		np.savez(
+			f, Key = w.Key, InterpDegree = w.InterpDegree, TargetShape = w.TargetShape, SourceShape = w.SourceShape,
+			SourceI = w.SourceI, SourceJ = w.SourceJ, Columns = w.Columns, Weights = w.Weights)
+	os.replace(fpathweights + '.tmp', fpathweights)
+
+# Load interpolation weights saved by 'fstweightsfile'.
+# Returns 'None' if the file does not exist or if 'key' is provided and does not match the key of the weights.
+def fstweightsfromfile(fpathweights, key = None):
+
+	# Load the file.
+	if (not path.exists(fpathweights)):
+		return None
+	with np.load(fpathweights) as c:
+		if (not key is None and str(c['Key']) != key):
+			return None
+		w = fstweights()
+		w.Key = str(c['Key'])
+		w.InterpDegree = str(c['InterpDegree'])
+		w.TargetShape = tuple(int(n) for n in c['TargetShape'])
+		w.SourceShape = tuple(int(n) for n in c['SourceShape'])
+		w.SourceI = c['SourceI']
+		w.SourceJ = c['SourceJ']
+		w.Columns = c['Columns']
+		w.Weights = c['Weights']
+	return w
+
+# Apply interpolation weights (see 'fstweights') to the field 'field' of the source grid; returns the field of the target grid ('float32', as 'rmn.ezsint').
+# Only the source cells used by the weights are read from 'field'. If scipy is loaded, the weights are applied as a sparse matrix (built once).
+# Does not require rpnpy.
+def fstweightsapply(w, field):
+
+	# Check the shape of the field.
+	field = np.asarray(field)
+	if (field.shape != tuple(w.SourceShape)):
+		print('ERROR: The shape of the field %s does not match the source grid %s of the interpolation weights. The script cannot continue.' % (field.shape, tuple(w.SourceShape)))
+		exit()
+
+	# Take the source cells used by the weights.
+	values = field[w.SourceI, w.SourceJ].astype(np.float64)
+
+	# Apply the weights.
+	if (RUNSCIPY):
+		if (w.Matrix is None):
+			(n, k) = w.Columns.shape
+			w.Matrix = scipy.sparse.csr_matrix((w.Weights.ravel(), (np.repeat(np.arange(n), k), w.Columns.ravel())), shape = (n, w.SourceI.size))
+		result = w.Matrix.dot(values)
+	else:
+		result = np.sum(values[w.Columns]*w.Weights, axis = 1)
+	return result.reshape(w.TargetShape).astype(np.float32)
+
+# Return the interpolation weights from the grid of the record 'fstrec' to grid 'fstmatchgrid' for the ezscint option 'intpopt' (see 'fstweightsdegree').
+# Weights are kept in 'FSTWEIGHTSCACHE' for the rest of the process and, if 'weightsdir' is not 'None' (default: 'FSTWEIGHTSDIR'),
+# loaded from or saved to '.npz' files in 'weightsdir' named by the key of the weights (see 'fstweightskey'). Loaded weights do not require rpnpy.
+# Weights that are computed are compared to the interpolation of the record by ezscint (see 'rmn.ezsint'), and are only used
+# if the largest difference does not exceed 'FSTWEIGHTSTOLERANCE' relative to the largest absolute value of the field (at least 1).
+# Agreement is only checked for the first record of each key; weights that are accepted are used for the later records of the grid without comparison.
+# Returns 'None' if weights do not support 'intpopt', if any point of 'fstmatchgrid' is outside the grid of the record, or if the weights do not agree with ezscint,
+# in which case ezscint should be used; rejected weights are kept in the cache as 'None'.
+# Weights taken from the cache are counted as hits and weights loaded or computed as misses in 'FSTCACHESTATS'; records for which the weights are rejected are counted separately.
+def fstweightsfromrecord(fstmatchgrid, fstfid, fstrec, intpopt, weightsdir = None):
+
+	# Check the degree.
+	degree = fstweightsdegree(intpopt)
+	if (degree is None):
+		return None
+	if (weightsdir is None):
+		weightsdir = FSTWEIGHTSDIR
+
+	# Check the cache.
+	key = fstweightskey(fstmatchgrid, fstrec, degree)
+	if (key in FSTWEIGHTSCACHE):
+		if (FSTWEIGHTSCACHE[key] is None):
+			FSTCACHESTATS['WeightsRejected'] += 1
+		else:
+			FSTCACHESTATS['WeightsHits'] += 1
+		return FSTWEIGHTSCACHE[key]
+	FSTCACHESTATS['WeightsMisses'] += 1
+
+	# Load the weights from file.
+	w = None
+	if (not weightsdir is None):
+		fpathweights = path.join(weightsdir, 'fstweights.' + key + '.npz')
+		w = fstweightsfromfile(fpathweights, key)
+
+	# Compute the weights and compare to ezscint.
+	if (w is None):
+		fstvargrid = fstgridfromrecord(fstfid, fstrec)
+		w = fstweightsfromgrids(fstmatchgrid, fstvargrid, degree)
+		if (w is None):
+			print('WARNING: Interpolation weights (%s) cannot be used because points of the target grid are outside the grid of the record. ezscint is used instead.' % degree)
+			FSTCACHESTATS['WeightsRejected'] += 1
+			FSTWEIGHTSCACHE[key] = None
+			return None
+		w.Key = key
+		fstezsetinterp(intpopt)
+		fstezdefset(fstmatchgrid, fstvargrid)
+		ref = np.asarray(rmn.ezsint(fstmatchgrid, fstvargrid, fstrec['d']), dtype = np.float64)
+		diff = np.max(np.abs(fstweightsapply(w, fstrec['d']) - ref), initial = 0.0)
+		tolerance = FSTWEIGHTSTOLERANCE*max(1.0, np.max(np.abs(ref), initial = 0.0))
+		if (not (diff <= tolerance)):
+			print('WARNING: Interpolation weights (%s) do not agree with ezscint (largest difference: %g). ezscint is used instead.' % (degree, diff))
+			FSTCACHESTATS['WeightsRejected'] += 1
+			w = None
+		elif (not weightsdir is None):
+			fstweightsfile(w, fpathweights)
+
+	# Save to the cache.
+	FSTWEIGHTSCACHE[key] = w
+	return w
+
+# Return the field of the record 'fstrec' interpolated to 'fstmatchgrid' with the ezscint option 'intpopt' (scalar interpolation).
+# If 'weights' is 'True' (default: 'FSTWEIGHTS'), nearest and linear interpolation use precomputed interpolation weights (see 'fstweightsfromrecord');
+# otherwise, or if the weights are not available, the field is interpolated by ezscint (see 'rmn.ezsint').
+def r2cfieldfromrecord(fstmatchgrid, fstfid, fstrec, intpopt = rmn.EZ_INTERP_NEAREST, weights = None, weightsdir = None):
+
+	# Apply the weights.
+	if (weights is None):
+		weights = FSTWEIGHTS
+	if (weights):
+		w = fstweightsfromrecord(fstmatchgrid, fstfid, fstrec, intpopt, weightsdir = weightsdir)
+		if (not w is None):
+			return fstweightsapply(w, fstrec['d'])
+
+	# Interpolate using ezscint.
+	fstezsetinterp(intpopt)
+	fstvargrid = fstgridfromrecord(fstfid, fstrec)
+	fstezdefset(fstmatchgrid, fstvargrid)
+	return rmn.ezsint(fstmatchgrid, fstvargrid, fstrec['d'])
+
+# Return the family of a variable name of a standard file (fst) record.
+# 'UU', 'VV', 'UV', and 'WD' belong to the wind family ('UV'), which is derived from the same 'UU' and 'VV' records;
+# other variables are their own family. The '_DEACC' suffix is removed (see 'fstconversionplan').
+def fstnomvarfamily(fstnomvar):
+
+	# Return the family.
+	fstnomvar = fstnomvar.upper().replace('_DEACC', '')
+	if (fstnomvar in ['UU', 'VV', 'UV', 'WD']):
+		return 'UV'
+	return fstnomvar
+
+# Apply the transform of a conversion field to a field: min(max(constmul*field + constadd, constrmin), constrmax).
+def fstfieldtransform(field, constmul = 1.0, constadd = 0.0, constrmax = float('inf'), constrmin = float('-inf')):
+
+	# Apply transforms.
+	field = constmul*field + constadd
+	return np.clip(field, constrmin, constrmax)
+
+# Return a dictionary of vectors of point data read from standard file (fst) format for the variables 'fstnomvars' (keys in lowercase).
+# The variables must belong to the same family (see 'fstnomvarfamily'); the records of the family are read and interpolated once for all of the variables.
+# Wind components ('UU', 'VV') and wind speed and direction ('UV', 'WD') are interpolated from the 'UU' and 'VV' records as vectors; other variables by scalar interpolation.
+# Transforms are not applied (see 'fstfieldtransform').
+# Calls 'exit()' if an error occurs while extracting the fields.
+def latlonvalsfromfst(lat, lon, fstfid, fstnomvars, fstetiket = ' ', fstip1 = -1, fstip2 = -1, fstip3 = -1, intpopt = rmn.EZ_INTERP_NEAREST):
 
 	# Check for 'RUNRPNPY'.
 	if (not RUNRPNPY):
 		print('ERROR: rpnpy is not loaded. Function cannot continue: ' % 'tb0fromfst')
 		exit()
 
-	# Grab the field.
-	# Returns 'None' if no field is found.
+	# Grab the fields.
 	# Use 'istat' to control return from special cases.
 	istat = 0
-	field = None
-	fstvargrid = None
+	fields = {}
+	fstnomvars = [n.lower() for n in fstnomvars]
 
 	# Set interpolation method.
-	rmn.ezsetopt(rmn.EZ_OPT_INTERP_DEGREE, intpopt)
+	fstezsetinterp(intpopt)
 
-	# Extract the field and interpolate.
-	if (fstnomvar.lower() == 'uu' or fstnomvar.lower() == 'vv' or fstnomvar.lower() == 'uv' or fstnomvar.lower() == 'wd'):
+	# Extract the fields and interpolate.
+	if (fstnomvarfamily(fstnomvars[0]) == 'UV'):
 
 		# Special case: Wind components and wind speed and direction (grouped together).
 		uu = rmn.fstlir(fstfid, nomvar = 'UU', etiket = fstetiket, ip1 = fstip1, ip2 = fstip2, ip3 = fstip3)
@@ -677,72 +2289,72 @@ def latlonvalfromfst(
 		if (uu is None or vv is None):
 			istat = -1
 		else:
-			fstvargrid = rmn.readGrid(fstfid, uu)
+			fstvargrid = fstgridfromrecord(fstfid, uu)
 			xy = rmn.gdxyfll(fstvargrid, lat = lat, lon = lon)
-			if (fstnomvar.lower() == 'uu' or fstnomvar.lower() == 'vv'):
+			if ('uu' in fstnomvars or 'vv' in fstnomvars):
 				uuvv = rmn.gdxyvval(fstvargrid, xy['x'], xy['y'], uu['d'], vv['d'])
-				if (fstnomvar.lower() == 'uu'):
-					field = uuvv[0]
-				else:
-					field = uuvv[1]
-			else:
+				fields['uu'] = uuvv[0]
+				fields['vv'] = uuvv[1]
+			if ('uv' in fstnomvars or 'wd' in fstnomvars):
 				from gdxywdval import gdxywdval
 				spdwd = gdxywdval(fstvargrid, xy['x'], xy['y'], uu['d'], vv['d'])
-				if (fstnomvar.lower() == 'uv'):
-					field = spdwd[0]
-				else:
-					field = spdwd[1]
+				fields['uv'] = spdwd[0]
+				fields['wd'] = spdwd[1]
 	else:
 
 		# Normal scalar interpolation.
-		fstvar = rmn.fstlir(fstfid, nomvar = fstnomvar, etiket = fstetiket, ip1 = fstip1, ip2 = fstip2, ip3 = fstip3)
+		fstvar = rmn.fstlir(fstfid, nomvar = fstnomvars[0].upper(), etiket = fstetiket, ip1 = fstip1, ip2 = fstip2, ip3 = fstip3)
 		if (fstvar is None):
 			istat = -1
 		else:
-			fstvargrid = rmn.readGrid(fstfid, fstvar)
+			fstvargrid = fstgridfromrecord(fstfid, fstvar)
 			xy = rmn.gdxyfll(fstvargrid, lat = lat, lon = lon)
-			field = rmn.gdxysval(fstvargrid, xy['x'], xy['y'], fstvar['d'])
+			fields[fstnomvars[0]] = rmn.gdxysval(fstvargrid, xy['x'], xy['y'], fstvar['d'])
 
 	# Check status.
-	if (istat != 0 or field is None):
-		print('ERROR: Unable to fetch field: %s. Attribute not appended. The script cannot continue.' % fstnomvar)
+	if (istat != 0 or any([fields.get(n) is None for n in fstnomvars])):
+		print('ERROR: Unable to fetch field: %s. Attribute not appended. The script cannot continue.' % ', '.join(fstnomvars))
 		exit()
+	return fields
 
-	# Apply transforms.
-	field = constmul*field + constadd
-	field = np.clip(field, constrmin, constrmax)
-	return field
-
-# Return an array of gridded data read from standard file (fst) format.
+# Return a vector of point data read from standard file (fst) format.
 # Check for special 'UU', 'VV', 'UV', or 'WD' attributes to for special wind-component interpolation.
 # Use regular 'ez' interpolation for all other fields.
 # Optionally, apply transform as prescribed by provided arguments.
-# Optionally, preserve and add the extracted transformed field to existing data in the 'r2c' attribute if 'accfield' is 'True'.
 # Calls 'exit()' if an error occurs while extracting the field.
-def r2cattributefromfst(
-	r2cattribute, fstmatchgrid, fstfid, fstnomvar, fstetiket = ' ', fstip1 = -1, fstip2 = -1, fstip3 = -1,
+def latlonvalfromfst(
+	lat, lon, fstfid, fstnomvar, fstetiket = ' ', fstip1 = -1, fstip2 = -1, fstip3 = -1,
 	intpopt = rmn.EZ_INTERP_NEAREST,
-	constmul = 1.0, constadd = 0.0, constrmax = float('inf'), constrmin = float('-inf'), accfield = False):
+	constmul = 1.0, constadd = 0.0, constrmax = float('inf'), constrmin = float('-inf')):
+
+	# Grab the field and apply transforms.
+	field = latlonvalsfromfst(lat, lon, fstfid, [fstnomvar], fstetiket = fstetiket, fstip1 = fstip1, fstip2 = fstip2, fstip3 = fstip3, intpopt = intpopt)[fstnomvar.lower()]
+	return fstfieldtransform(field, constmul, constadd, constrmax, constrmin)
+
+# Return a dictionary of arrays of gridded data read from standard file (fst) format for the variables 'fstnomvars' (keys in lowercase).
+# The variables must belong to the same family (see 'fstnomvarfamily'); the records of the family are read and interpolated once for all of the variables.
+# Wind components ('UU', 'VV') and wind speed and direction ('UV', 'WD') are interpolated from the 'UU' and 'VV' records as vectors; other variables by scalar interpolation.
+# Scalar interpolation uses precomputed interpolation weights if 'weights' is 'True' (default: 'FSTWEIGHTS'; see 'r2cfieldfromrecord').
+# Transforms are not applied (see 'fstfieldtransform').
+# Calls 'exit()' if an error occurs while extracting the fields.
+def r2cfieldsfromfst(fstmatchgrid, fstfid, fstnomvars, fstetiket = ' ', fstip1 = -1, fstip2 = -1, fstip3 = -1, intpopt = rmn.EZ_INTERP_NEAREST, weights = None, weightsdir = None):
 
 	# Check for 'RUNRPNPY'.
 	if (not RUNRPNPY):
 		print('ERROR: rpnpy is not loaded. Function cannot continue: ' % 'r2cattributefromfst')
 		exit()
 
-	# Grab the field.
-	# Returns 'None' if no field is found.
+	# Grab the fields.
 	# Use 'istat' to control return from special cases.
 	istat = 0
-	if (accfield and r2cattribute.AttributeData is None) or not accfield:
-		r2cattribute.AttributeData = np.zeros((fstmatchgrid['ni'], fstmatchgrid['nj']))
-	field = None
-	fstvargrid = None
+	fields = {}
+	fstnomvars = [n.lower() for n in fstnomvars]
 
 	# Set interpolation method.
-	rmn.ezsetopt(rmn.EZ_OPT_INTERP_DEGREE, intpopt)
+	fstezsetinterp(intpopt)
 
-	# Extract the field and interpolate.
-	if (fstnomvar.lower() == 'uu' or fstnomvar.lower() == 'vv' or fstnomvar.lower() == 'uv' or fstnomvar.lower() == 'wd'):
+	# Extract the fields and interpolate.
+	if (fstnomvarfamily(fstnomvars[0]) == 'UV'):
 
 		# Special case: Wind components and wind speed and direction (grouped together).
 		uu = rmn.fstlir(fstfid, nomvar = 'UU', etiket = fstetiket, ip1 = fstip1, ip2 = fstip2, ip3 = fstip3)
@@ -750,165 +2362,1104 @@ def r2cattributefromfst(
 		if (uu is None or vv is None):
 			istat = -1
 		else:
-			fstvargrid = rmn.readGrid(fstfid, uu)
-			rmn.ezdefset(fstmatchgrid, fstvargrid)
-			if (fstnomvar.lower() == 'uu' or fstnomvar.lower() == 'vv'):
+			fstvargrid = fstgridfromrecord(fstfid, uu)
+			fstezdefset(fstmatchgrid, fstvargrid)
+			if ('uu' in fstnomvars or 'vv' in fstnomvars):
 				uuvv = rmn.ezuvint(fstmatchgrid, fstvargrid, uu['d'], vv['d'])
-				if (fstnomvar.lower() == 'uu'):
-					field = uuvv[0]
-				else:
-					field = uuvv[1]
-			else:
+				fields['uu'] = uuvv[0]
+				fields['vv'] = uuvv[1]
+			if ('uv' in fstnomvars or 'wd' in fstnomvars):
 				from ezwdint import ezwdint
 				spdwd = ezwdint(fstmatchgrid, fstvargrid, uu['d'], vv['d'])
-				if (fstnomvar.lower() == 'uv'):
-					field = spdwd[0]
-				else:
-					field = spdwd[1]
+				fields['uv'] = spdwd[0]
+				fields['wd'] = spdwd[1]
 	else:
 
 		# Normal scalar interpolation.
-		fstvar = rmn.fstlir(fstfid, nomvar = fstnomvar, etiket = fstetiket, ip1 = fstip1, ip2 = fstip2, ip3 = fstip3)
+		fstvar = rmn.fstlir(fstfid, nomvar = fstnomvars[0].upper(), etiket = fstetiket, ip1 = fstip1, ip2 = fstip2, ip3 = fstip3)
 		if (fstvar is None):
 			istat = -1
 		else:
-			fstvargrid = rmn.readGrid(fstfid, fstvar)
-			rmn.ezdefset(fstmatchgrid, fstvargrid)
-			field = rmn.ezsint(fstmatchgrid, fstvargrid, fstvar['d'])
+			fields[fstnomvars[0]] = r2cfieldfromrecord(fstmatchgrid, fstfid, fstvar, intpopt, weights = weights, weightsdir = weightsdir)
 
 	# Check status.
 	if (istat != 0):
-		print('ERROR: Unable to fetch field: %s. Attribute not appended. The script cannot continue.' % fstnomvar)
+		print('ERROR: Unable to fetch field: %s. Attribute not appended. The script cannot continue.' % ', '.join(fstnomvars))
 		exit()
+	return fields
+
+# Assign a field interpolated to 'fstmatchgrid' (e.g., by 'r2cfieldsfromfst') to an 'r2c' attribute.
+# Optionally, apply transform as prescribed by provided arguments (see 'fstfieldtransform').
+# Optionally, preserve and add the transformed field to existing data in the 'r2c' attribute if 'accfield' is 'True'.
+def r2cattributefromfield(
+	r2cattribute, fstmatchgrid, field,
+	constmul = 1.0, constadd = 0.0, constrmax = float('inf'), constrmin = float('-inf'), accfield = False):
+
+	# Reset the data.
+	if (accfield and r2cattribute.AttributeData is None) or not accfield:
+		r2cattribute.AttributeData = np.zeros((fstmatchgrid['ni'], fstmatchgrid['nj']))
 
 	# Apply transforms.
-	field = constmul*field + constadd
-	field = np.clip(field, constrmin, constrmax)
-	r2cattribute.AttributeData += field
+	r2cattribute.AttributeData += fstfieldtransform(field, constmul, constadd, constrmax, constrmin)
+
+# Return an array of gridded data read from standard file (fst) format.
+# Check for special 'UU', 'VV', 'UV', or 'WD' attributes to for special wind-component interpolation.
+# Use regular 'ez' interpolation for all other fields.
+# Optionally, apply transform as prescribed by provided arguments.
+# Optionally, preserve and add the extracted transformed field to existing data in the 'r2c' attribute if 'accfield' is 'True'.
+# Calls 'exit()' if an error occurs while extracting the field.
+def r2cattributefromfst(
+	r2cattribute, fstmatchgrid, fstfid, fstnomvar, fstetiket = ' ', fstip1 = -1, fstip2 = -1, fstip3 = -1,
+	intpopt = rmn.EZ_INTERP_NEAREST,
+	constmul = 1.0, constadd = 0.0, constrmax = float('inf'), constrmin = float('-inf'), accfield = False):
+
+	# Grab the field and apply transforms.
+	field = r2cfieldsfromfst(fstmatchgrid, fstfid, [fstnomvar], fstetiket = fstetiket, fstip1 = fstip1, fstip2 = fstip2, fstip3 = fstip3, intpopt = intpopt)[fstnomvar.lower()]
+	r2cattributefromfield(r2cattribute, fstmatchgrid, field, constmul = constmul, constadd = constadd, constrmax = constrmax, constrmin = constrmin, accfield = accfield)
+
+# Return the key of a standard file (fst) record for batch extraction (see 'fstrecordsfromfst').
+# Keys are tuples of ('fstnomvar', 'fstetiket', 'fstip1', 'fstip2', 'fstip3'); a blank 'fstetiket' or an 'ip' of -1 matches any value (as with 'rmn.fstlir').
+def fstrecordkey(fstnomvar, fstetiket = ' ', fstip1 = -1, fstip2 = -1, fstip3 = -1):
+
+	# Return the key.
+	return (fstnomvar.upper().strip(), fstetiket.strip(), fstip1, fstip2, fstip3)
+
+# Return 'True' if the parameters of a record (e.g., as returned by 'rmn.fstprm') match the key 'fstkey' (see 'fstrecordkey').
+def fstrecordmatches(fstprm, fstkey):
+
+	# Compare the fields of the key.
+	fstnomvar, fstetiket, fstip1, fstip2, fstip3 = fstkey
+	if (fstprm['nomvar'].strip() != fstnomvar):
+		return False
+	if (fstetiket != '' and fstprm['etiket'].strip() != fstetiket):
+		return False
+	for ip, fstip in [ ('ip1', fstip1), ('ip2', fstip2), ('ip3', fstip3) ]:
+		if (fstip != -1 and fstprm[ip] != fstip):
+			return False
+	return True
+
+# Return a dictionary of records read from standard file (fst) format for the list of keys 'fstkeys' (see 'fstrecordkey'), indexed by key.
+# The keys are resolved in one pass of the inventory of the file (see 'rmn.fstinl' and 'rmn.fstprm'), taking the first matching record of each key,
+# and the records are read and decoded in file order (see 'rmn.fstluk'). The records contain the decoded array ('d') and the grid descriptors.
+# Keys not found in the inventory are searched individually (see 'rmn.fstinf'), in case 'ip1' is encoded differently in the file.
+# Calls 'exit()' if any record is missing, after listing all of the missing records.
+def fstrecordsfromfst(fstfid, fstkeys):
+
+	# Check for 'RUNRPNPY'.
+	if (not RUNRPNPY):
+		print('ERROR: rpnpy is not loaded. Function cannot continue: %s' % 'fstrecordsfromfst')
+		exit()
+
+	# Remove duplicate keys (preserving order).
+	fstkeys = list(dict.fromkeys(fstkeys))
+
+	# Resolve the keys from the inventory.
+	# 'handles' preserves the order of the inventory (i.e., file order).
+	handles = {}
+	pending = list(fstkeys)
+	for h in rmn.fstinl(fstfid):
+		if (not pending):
+			break
+		fstprm = rmn.fstprm(h)
+		matched = [fstkey for fstkey in pending if fstrecordmatches(fstprm, fstkey)]
+		if (matched):
+			handles[h] = matched
+			pending = [fstkey for fstkey in pending if not fstkey in matched]
+
+	# Search keys not found in the inventory individually.
+	missing = []
+	for fstkey in pending:
+		fstnomvar, fstetiket, fstip1, fstip2, fstip3 = fstkey
+		fstinf = rmn.fstinf(fstfid, nomvar = fstnomvar, etiket = fstetiket or ' ', ip1 = fstip1, ip2 = fstip2, ip3 = fstip3)
+		if (fstinf is None):
+			missing.append(fstkey)
+		else:
+			handles.setdefault(fstinf['key'], []).append(fstkey)
+
+	# Report all missing records at once.
+	if (missing):
+		print('ERROR: Unable to fetch %d record(s). The script cannot continue.' % len(missing))
+		for fstnomvar, fstetiket, fstip1, fstip2, fstip3 in missing:
+			print("  nomvar = '%s', etiket = '%s', ip1 = %d, ip2 = %d, ip3 = %d" % (fstnomvar, fstetiket, fstip1, fstip2, fstip3))
+		exit()
+
+	# Read the records.
+	# Keys that resolve to the same record share the record.
+	fstrecords = {}
+	for h in handles:
+		fstrec = rmn.fstluk(h)
+		for fstkey in handles[h]:
+			fstrecords[fstkey] = fstrec
+	return fstrecords
+
+# Return a dictionary of arrays interpolated to 'fstmatchgrid' from records read from standard file (fst) format (e.g., by 'fstrecordsfromfst'), indexed by key.
+# The grid of each record is read once (see 'fstgridfromrecord'). Only scalar interpolation is used (see 'r2cfieldsfromfst' for wind components),
+# using precomputed interpolation weights if 'weights' is 'True' (default: 'FSTWEIGHTS'; see 'r2cfieldfromrecord').
+# Transforms are not applied (see 'r2cattributefromfield').
+def r2cfieldsfromrecords(fstmatchgrid, fstfid, fstrecords, intpopt = rmn.EZ_INTERP_NEAREST, weights = None, weightsdir = None):
+
+	# Interpolate the fields.
+	# Keys that share a record share the field.
+	fields = {}
+	interpolated = {}
+	for fstkey in fstrecords:
+		fstrec = fstrecords[fstkey]
+		if (not id(fstrec) in interpolated):
+			interpolated[id(fstrec)] = r2cfieldfromrecord(fstmatchgrid, fstfid, fstrec, intpopt, weights = weights, weightsdir = weightsdir)
+		fields[fstkey] = interpolated[id(fstrec)]
+	return fields
+
+# Return a dictionary of arrays of gridded data read from standard file (fst) format for the list of keys 'fstkeys' (see 'fstrecordkey'), indexed by key.
+# The records are read in one pass (see 'fstrecordsfromfst') and interpolated to 'fstmatchgrid' (see 'r2cfieldsfromrecords').
+# Assign the fields to 'r2c' attributes using 'r2cattributefromfield'.
+# Calls 'exit()' if any record is missing, after listing all of the missing records.
+def r2cfieldsfromkeys(fstmatchgrid, fstfid, fstkeys, intpopt = rmn.EZ_INTERP_NEAREST, weights = None, weightsdir = None):
+
+	# Read and interpolate the records.
+	return r2cfieldsfromrecords(fstmatchgrid, fstfid, fstrecordsfromfst(fstfid, fstkeys), intpopt = intpopt, weights = weights, weightsdir = weightsdir)
+
+# Group a list of conversion fields ('r2cconversionfieldfromfst' or 'conversionfieldfromfst') by the records they are derived from.
+# Fields are grouped by source system ('fpathsystem', which gives the file and 'ip2' of each time-step), variable family (see 'fstnomvarfamily'),
+# de-accumulation ('_DEACC'), 'fstetiket', 'fstip1', and 'intpopt', so that the records of each group are read and interpolated once per time-step
+# (e.g., by 'r2cfieldsfromfst') and the transform of each field applied to the shared result (e.g., by 'r2cattributefromfield').
+# Returns a list of groups in order of the first field of each group; each group is a list of the indices of its fields in order.
+def fstconversionplan(fields):
+
+	# Group the fields.
+	groups = {}
+	for i, c in enumerate(fields):
+		key = (getattr(c, 'fpathsystem', None), fstnomvarfamily(c.fstnomvar), '_DEACC' in c.fstnomvar.upper(), c.fstetiket, c.fstip1, c.intpopt)
+		groups.setdefault(key, []).append(i)
+	return list(groups.values())
+
+# Return the variable names (lowercase, without '_DEACC') of a group of conversion fields (see 'fstconversionplan'), each listed once.
+def fstnomvarsfromplan(fields, group):
+
+	# List the variables.
+	fstnomvars = []
+	for i in group:
+		n = fields[i].fstnomvar.lower().replace('_deacc', '')
+		if (not n in fstnomvars):
+			fstnomvars.append(n)
+	return fstnomvars
 
 # Populate attributes from an existing 'r2c' format file.
 # Reads the attributes from file.
 # 'r2cgridfromr2c' should be called in advance of this routine to read the grid specification of the file.
-def r2cattributesfromr2c(r2c, fpathr2cin):
-
-	# Attribute count.
-	a = 0
-
-	# Set r2c attributes to match the grid defined by fpathr2cin.
-	# Reads the projection from file.
-	with open(fpathr2cin, 'r') as f:
+# Multi-frame data are returned as a 'DataFrame' unless 'asarray' is 'True' (see 'r2cattributedatafromfile').
+# Optionally, read only the frames from 'start' to before 'stop' and the cells inside 'xybox' or 'latlonbox' (see 'r2cfromr2c').
+# Optionally, read only the single-frame attributes listed by name in 'attributes' (see 'r2cattributedatafromfile').
+def r2cattributesfromr2c(r2c, fpathr2cin, asarray = False, start = None, stop = None, xybox = None, latlonbox = None, attributes = None):
+
+	# Read attribute information from the header and the data from the file.
+	r2cfromr2c(r2c, fpathr2cin, readgrid = False, readmeta = False, readattr = True, asarray = asarray, start = start, stop = stop, xybox = xybox, latlonbox = latlonbox, attributes = attributes)
+
+# Convert a list of time-stamps in standard format for EnSim/GK ("yyyy/MM/dd HH:mm:ss") to a 'datetime64' array.
+# Time-stamps are converted in bulk, falling back to parsing each time-stamp if the list contains non-padded dates.
+def r2cdatetime64fromstrings(frame_marks):
+
+	# Convert the list.
+	try:
+		return np.array([m.replace('/', '-') for m in frame_marks], dtype = 'datetime64[s]')
+	except ValueError:
+		return np.array([datetime.strptime(m, '%Y/%m/%d %H:%M:%S') for m in frame_marks], dtype = 'datetime64[s]')
+
+# Return a 'DataFrame' view of the data of a multi-frame attribute.
+# The 'DataFrame' is indexed by 'Datetime' and contains the frame of each record in the 'Values' column.
+# Frames in the 'DataFrame' are views of the frames in the (frames, xCount, yCount) array in 'AttributeData' (no data are copied).
+# Returns 'AttributeData' if it is already a 'DataFrame'.
+def r2cframesasdataframe(r2cattribute):
+
+	# Return the existing 'DataFrame'.
+	if (isinstance(r2cattribute.AttributeData, pd.DataFrame)):
+		return r2cattribute.AttributeData
+
+	# Create the 'DataFrame'.
+	# Assign the frames individually to preserve the 2D arrays in the object column.
+	frame_values = np.empty(r2cattribute.FrameCount, dtype = object)
+	for i in range(r2cattribute.FrameCount):
+		frame_values[i] = r2cattribute.AttributeData[i]
+	return pd.DataFrame({ 'Values': frame_values }, index = pd.DatetimeIndex(r2cattribute.FrameTimes, name = 'Datetime'))
+
+# Convert a block of numbers in ASCII text (bytes) to a 1D array of type 'dtype'.
+# Numbers can be separated by any whitespace and written in any format readable by 'float' (e.g., '%g', '1.0E+00').
+# Comments that start with the character 'comments' (default: '#') are ignored.
+# Blocks with the same number of values on every line are converted by the C parser of 'np.loadtxt'; other blocks are split and converted as a list.
+# If the block contains malformed numbers, prints the line and line number and calls 'exit()'.
+# The line number is counted from the start of file 'f' if provided, where the block starts at byte 'offset'; otherwise it is counted from the start of the block.
+def asciiarrayfrombytes(b, dtype = np.float64, f = None, offset = 0, comments = '#'):
+
+	# Return an empty array if the block contains no data.
+	if (not b.strip()):
+		return np.zeros(0, dtype = dtype)
+
+	# Convert the block as a table.
+	# The warning 'np.loadtxt' issues for blocks that only contain comments is suppressed.
+	try:
+		with warnings.catch_warnings():
+			warnings.simplefilter('ignore', UserWarning)
+			return np.loadtxt(io.BytesIO(b), dtype = dtype, comments = comments, ndmin = 2).ravel()
+	except ValueError:
+		pass
+
+	# Convert the block as a list.
+	c = comments.encode()
+	lines = b.split(b'\n')
+	try:
+		return np.array(b''.join([l.split(c)[0] + b' ' for l in lines]).split(), dtype = dtype)
+	except ValueError:
+		pass
+
+	# Find the line that contains the malformed number.
+	line = 1
+	if (not f is None):
+		p = f.tell()
+		f.seek(0)
+		line += f.read(offset).count(b'\n')
+		f.seek(p)
+	for i, l in enumerate(lines):
+		try:
+			np.array(l.split(c)[0].split(), dtype = dtype)
+		except ValueError:
+			print('ERROR: Malformed numeric data at line %d: %s. The script cannot continue.' % (line + i, l.strip().decode('latin-1')))
+			exit()
+
+# Return the box (x0, x1, y0, y1) of the cells of the grid of an 'r2c' object.
+# 'xybox' is given as cell indices (x0, x1, y0, y1), which are 0-based with 'x1' and 'y1' excluded (as for slicing 'AttributeData').
+# 'latlonbox' is given as (latmin, latmax, lonmin, lonmax) in degrees, in which case all cells that intersect the box are included.
+# 'ROTLATLONG' grids require rpnpy to convert 'latlonbox' to rotated coordinates.
+# The box is clipped to the extent of the grid.
+# Returns 'None' if neither box is provided.
+# Calls 'exit()' if the box does not intersect the grid.
+def r2cboxfromr2c(r2c, xybox = None, latlonbox = None):
+
+	# Convert the box.
+	if (not xybox is None):
+		(x0, x1, y0, y1) = [int(i) for i in xybox]
+	elif (not latlonbox is None):
+		(latmin, latmax, lonmin, lonmax) = latlonbox
+		if (r2c.grid.Projection == 'LATLONG'):
 
-		# Read attribute information from the header.
-		in_header = True
-		while True:
+			# The box extends east from 'lonmin' to 'lonmax' (across 180 degrees if 'lonmax' is less than 'lonmin').
+			lat = np.array([latmin, latmax])
+			lon0 = (lonmin - r2c.grid.xOrigin) % 360.0
+			width = lonmax - lonmin
+			if (width < 0.0):
+				width += 360.0
+			if (width >= 360.0):
+				(lon0, lon1) = (0.0, 360.0)
+			else:
+				lon1 = lon0 + width
+		elif (r2c.grid.Projection == 'ROTLATLONG'):
 
-			# Read line and break if no more lines exist in the file.
+			# Check for 'RUNRPNPY'.
+			if (not RUNRPNPY):
+				print('ERROR: rpnpy is not loaded. Function cannot continue: %s' % 'r2cboxfromr2c')
+				exit()
+
+			# Sample the edges of the box, which are curved in rotated coordinates.
+			t = np.linspace(0.0, 1.0, 65)
+			lat = np.concatenate((latmin + (latmax - latmin)*t, np.full(t.size, latmax), latmin + (latmax - latmin)*t, np.full(t.size, latmin)))
+			lon = np.concatenate((np.full(t.size, lonmin), lonmin + (lonmax - lonmin)*t, np.full(t.size, lonmax), lonmin + (lonmax - lonmin)*t))
+			(lat, lon) = rmn.egrid_ll2rll(xlat1 = r2c.grid.CentreLatitude, xlon1 = r2c.grid.CentreLongitude, xlat2 = r2c.grid.RotationLatitude, xlon2 = r2c.grid.RotationLongitude, lat = lat, lon = lon)
+			lat = np.asarray(lat)
+
+			# The box covers the longitudes outside of the largest gap between the sampled longitudes (relative to the origin of the grid).
+			lon = np.sort((np.asarray(lon) - r2c.grid.xOrigin) % 360.0)
+			gaps = np.diff(np.append(lon, lon[0] + 360.0))
+			k = int(np.argmax(gaps))
+			lon0 = lon[(k + 1) % lon.size]
+			lon1 = lon0 + 360.0 - gaps[k]
+		else:
+			print('ERROR: The projection ' + r2c.grid.Projection + ' is not supported. The script cannot continue.')
+			exit()
+
+		# Derive the indices of the cells.
+		# Longitudes are taken east of the origin of the grid in the range (0->360); a box that crosses the origin starts west of the grid if it does not intersect the grid east of the origin.
+		# Boxes that intersect the grid on both sides of the origin (e.g., across the seam of a global grid) cannot be selected as one box.
+		extent = r2c.grid.xCount*r2c.grid.xDelta
+		if (lon1 > 360.0):
+			if (lon0 >= extent):
+				lon0 -= 360.0
+				lon1 -= 360.0
+			elif (lon1 - 360.0 > 0.0):
+				print('ERROR: The box crosses the seam of the grid at longitude %g. Select the parts of the box on either side separately. The script cannot continue.' % (r2c.grid.xOrigin % 360.0))
+				exit()
+		x0 = int(np.floor(lon0/r2c.grid.xDelta))
+		x1 = int(np.ceil(lon1/r2c.grid.xDelta))
+		y0 = int(np.floor((np.min(lat) - r2c.grid.yOrigin)/r2c.grid.yDelta))
+		y1 = int(np.ceil((np.max(lat) - r2c.grid.yOrigin)/r2c.grid.yDelta))
+	else:
+		return None
+
+	# Clip the box to the grid.
+	x0 = max(x0, 0)
+	x1 = min(x1, r2c.grid.xCount)
+	y0 = max(y0, 0)
+	y1 = min(y1, r2c.grid.yCount)
+	if (x1 <= x0 or y1 <= y0):
+		print('ERROR: The box does not intersect the grid. The script cannot continue.')
+		exit()
+	return (x0, x1, y0, y1)
+
+# Read the data of a single attribute or frame from an open 'r2c' format file.
+# Returns the data as an (xCount, yCount) array of type 'R2CDTYPE'.
+# The lines of the block are read together and converted in bulk (see 'asciiarrayfrombytes').
+# If rows of the grid are wrapped across multiple lines, lines are read until the number of values in the grid is reached.
+# Calls 'exit()' if the file ends before the number of values in the grid is read.
+# Optionally, only the rows and columns inside 'box' (x0, x1, y0, y1) are converted and returned (see 'r2cboxfromr2c').
+# If 'skip' is 'True', the lines of the data are skipped without being converted and 'None' is returned.
+# Reading a 'box' or skipping is fastest if each row of the grid is written to its own line (as written by EnSim/GK and 'ensim_utils').
+# If rows are wrapped, the values of the block are counted to skip it, or the entire block is converted and cropped to the box.
+def r2cblockfromfile(r2c, f, box = None, skip = False):
+
+	# Skip the data.
+	# Rows are wrapped if the first line does not contain a row of the grid, in which case lines are skipped until the number of values in the grid is reached.
+	if (skip):
+		m = r2c.grid.yCount*r2c.grid.xCount - len(f.readline().split())
+		if (m == (r2c.grid.yCount - 1)*r2c.grid.xCount):
+			for j in range(r2c.grid.yCount - 1):
+				f.readline()
+		else:
+			while (m > 0):
+				l = f.readline()
+				if not l:
+					break
+				m -= len(l.split())
+		return None
+
+	# Read the data.
+	p = f.tell()
+	if (box is None):
+		return r2cblockfromlines(r2c, f, [f.readline() for j in range(r2c.grid.yCount)], p)
+
+	# Read the rows inside the box, converting only the columns inside the box.
+	# If a line does not contain a row of the grid (rows are wrapped), the entire block is converted and cropped to the box.
+	(x0, x1, y0, y1) = box
+	lines = []
+	rows = []
+	for j in range(r2c.grid.yCount):
+		l = f.readline()
+		lines.append(l)
+		t = l.split()
+		if (len(t) != r2c.grid.xCount):
+			return r2cblockfromlines(r2c, f, lines, p)[x0:x1, y0:y1]
+		if (j >= y0 and j < y1):
+			rows.append(t[x0:x1])
+	return np.array(rows, dtype = R2CDTYPE).transpose()
+
+# Convert the data of a single attribute or frame from lines already read from an open 'r2c' format file (see 'r2cblockfromfile').
+# 'offset' is the byte offset of the first line in the file (for error messages).
+# If the lines do not contain the number of values in the grid (rows are wrapped), lines are read until the number of values in the grid is reached.
+# Calls 'exit()' if the file ends before the number of values in the grid is read.
+def r2cblockfromlines(r2c, f, lines, offset):
+
+	# Convert the lines.
+	n = r2c.grid.yCount*r2c.grid.xCount
+	b = b''.join(lines)
+	v = asciiarrayfrombytes(b, dtype = R2CDTYPE, f = f, offset = offset)
+
+	# Read additional lines if rows are wrapped.
+	if (v.size < n):
+		m = n - v.size
+		p = offset + len(b)
+		b = []
+		while (m > 0):
 			l = f.readline()
 			if not l:
 				break
+			b.append(l)
+			m -= len(l.split())
+		v = np.concatenate((v, asciiarrayfrombytes(b''.join(b), dtype = R2CDTYPE, f = f, offset = p)))
 
-			# Continue if not an attribute identified with leading ':'.
-			if (l.find(':') != 0):
-				continue
-
-			# Check for 'AttributeName', which defines a new attribute.
-			# Use the attribute index to assign 'AttributeType' and 'AttributeUnits' (to accommodate bad attribute indexing).
-			# Attribute properties should always follow 'AttributeName', so assign them to the last activated attribute.
-			m = l.strip().split()
-			if (m[0].lower() == ':attributename'):
-				a += 1
-				r2c.attr.append(r2cattribute())
-
-				# Multi-frame 'r2c' files, which should contain a single attribute, may not include an attribute ID.
-				# Attribute properties should always follow 'AttributeName', so assign them to the last activated attribute (a - 1).
-				if (len(m) > 1):
-					if (m[1].isdigit() and len(m) > 2):
-						r2c.attr[a - 1].AttributeName = ' '.join(m[2:])
-					else:
-						r2c.attr[a - 1].AttributeName = ' '.join(m[1:])
-			elif (m[0].lower() == ':attributetype'):
-				if (len(m) > 1):
-					if (m[1].isdigit() and len(m) > 2):
-						r2c.attr[a - 1].AttributeType = m[2]
-					else:
-						r2c.attr[a - 1].AttributeType = m[1]
-			elif (m[0].lower() == ':attributeunits'):
-				if (len(m) > 1):
-					if (m[1].isdigit() and len(m) > 2):
-						r2c.attr[a - 1].AttributeUnits = m[2]
-					else:
-						r2c.attr[a - 1].AttributeUnits = m[1]
-			elif (m[0].lower() == ':endheader'):
-
-				# Break if at the end of the header.
+	# Check the number of values.
+	if (v.size != n):
+		print('ERROR: Expected %d values but read %d values from the file. The script cannot continue.' % (n, v.size))
+		exit()
+	return v.reshape(r2c.grid.yCount, r2c.grid.xCount).transpose()
+
+# Generator over the frames of an open multi-frame 'r2c' format file.
+# The file must be positioned at the start of the data or at a ':Frame' marker.
+# Yields the frame number, time-stamp (as a string in standard format for EnSim/GK: "yyyy/MM/dd HH:mm:ss"), and data of each frame.
+# If 'buffer' is provided, the data are copied to it and the same buffer is yielded for every frame.
+# Optionally, only frames from 'start' to before 'stop' are yielded; the data of other frames are skipped without being converted.
+# Frames are assumed to be in chronological order, so reading stops at the first frame at or after 'stop'.
+# Optionally, only the cells inside 'box' are read (see 'r2cblockfromfile').
+def r2cframesfromfile(r2c, f, buffer = None, start = None, stop = None, box = None):
+
+	# Convert the time window.
+	if (not start is None):
+		start = r2cdatetime64(start)
+	if (not stop is None):
+		stop = r2cdatetime64(stop)
+
+	# Read frames until the end of the file.
+	# Each record is bounded by ':Frame'/':EndFrame' line markers, where ':Frame' marker also contains time-stamp of the record.
+	while True:
+
+		# Read line and break if no more lines exist in the file.
+		# Decode the line if the file is read in binary mode.
+		l = f.readline()
+		if not l:
+			break
+		if (isinstance(l, bytes)):
+			l = l.decode('latin-1')
+
+		# Continue if not a ':Frame' marker (e.g., blank lines at the end of the file).
+		if (l[:6].lower() != ':frame'):
+			continue
+
+		# Parse the frame number and time-stamp from the ':Frame' marker.
+		m = l.split('"')
+		frame_number = int(m[0].split()[1])
+		frame_mark = m[1].split('.')[0]
+
+		# Check the time window.
+		if (not start is None or not stop is None):
+			t = r2cdatetime64fromstrings([frame_mark])[0]
+			if (not stop is None and t >= stop):
 				break
+			if (not start is None and t < start):
+				r2cblockfromfile(r2c, f, skip = True)
+				f.readline()
+				continue
 
-		# Determine the type of file (single- or multi-frame).
-		# Check for ':Frame' signature.
-		# Backspace after the check to read data from the file.
+		# Read the data.
+		frame_data = r2cblockfromfile(r2c, f, box = box)
+		if (not buffer is None):
+			buffer[:] = frame_data
+			frame_data = buffer
+
+		# Read the ':EndFrame' marker.
+		f.readline()
+
+		# Return the frame.
+		yield (frame_number, frame_mark, frame_data)
+
+# Return a map of the names of the attributes of the 'r2c' object to their index in the list of attributes, starting at index 'first'.
+# Names are mapped in lower case without enclosing quotes.
+def r2cattributemap(r2c, first = 0):
+
+	# Create the map.
+	attribute_map = {}
+	for i, a in enumerate(r2c.attr[first:]):
+		if (not a.AttributeName is None):
+			attribute_map[a.AttributeName.strip('"').lower()] = first + i
+	return attribute_map
+
+# Return the indices of the attributes listed by name in 'attributes' (see 'r2cattributemap').
+# Prints a warning for names not found in the list of attributes.
+def r2cattributeselection(r2c, attributes, first = 0):
+
+	# Find the attributes.
+	attribute_map = r2cattributemap(r2c, first)
+	selection = []
+	for n in attributes:
+		i = attribute_map.get(n.strip('"').lower())
+		if (i is None):
+			print('WARNING: The attribute %s was not found in the file.' % n)
+		elif (not i in selection):
+			selection.append(i)
+	return sorted(selection)
+
+# Generator over the attributes of an open single-frame 'r2c' format file.
+# The file must be positioned at the start of the data.
+# Yields the attributes of the 'r2c' object starting at index 'first', with the data read from file assigned to 'AttributeData'.
+# If 'buffer' is provided, the data are copied to it and the same buffer is assigned to every attribute.
+# Optionally, only the cells inside 'box' are read (see 'r2cblockfromfile').
+# Optionally, only the attributes listed by name in 'attributes' are yielded (see 'r2cattributemap').
+# The data of other attributes are skipped by counting lines without being converted, and reading stops after the last attribute listed.
+def r2cattributesfromfile(r2c, f, first = 0, buffer = None, box = None, attributes = None):
+
+	# Identify the attributes to read.
+	if (attributes is None):
+		selection = range(first, len(r2c.attr))
+	else:
+		selection = r2cattributeselection(r2c, attributes, first)
+
+	# Enumerate over the expected number of attributes.
+	# No markers exist between attributes.
+	i = first
+	for j in selection:
+
+		# Skip the attributes preceding the next attribute to read.
+		while (i < j):
+			r2cblockfromfile(r2c, f, skip = True)
+			i += 1
+
+		# Read the attribute.
+		a = r2c.attr[j]
+		i += 1
+		a.AttributeData = r2cblockfromfile(r2c, f, box = box)
+		if (not buffer is None):
+			buffer[:] = a.AttributeData
+			a.AttributeData = buffer
+		yield a
+
+# Read attribute data from an open 'r2c' format file.
+# The file must be positioned at the start of the data (e.g., by 'r2cparseheader').
+# Data are assigned to the attributes of the 'r2c' object starting at index 'first'.
+# Multi-frame data are read into a contiguous (frames, xCount, yCount) array and the time-stamps of the frames to 'FrameTimes'.
+# If 'asarray' is 'True' the array is assigned to 'AttributeData', otherwise the 'DataFrame' view of 'r2cframesasdataframe' is assigned.
+# Optionally, only frames from 'start' to before 'stop' are read (see 'r2cframesfromfile').
+# If the frame 'index' of the file is provided, the file is positioned at the first frame at or after 'start' before reading.
+# Optionally, only the cells inside 'box' are read, in which case the grid is updated to the extent of the box (see 'r2cblockfromfile').
+# Optionally, only the single-frame attributes listed by name in 'attributes' are read; other attributes are removed from the 'r2c' object.
+def r2cattributedatafromfile(r2c, f, first = 0, asarray = False, start = None, stop = None, box = None, index = None, attributes = None):
+
+	# Determine the type of file (single- or multi-frame).
+	# Check for ':Frame' signature.
+	# Backspace after the check to read data from the file.
+	is_framed = True
+	p = f.tell()
+	l = f.readline()
+	if (isinstance(l, bytes)):
+		l = l.decode('latin-1')
+	if (len(l) >= 6 and l.lower()[:6] == ':frame'):
 		is_framed = True
-		p = f.tell()
-		l = f.readline()
-		if (len(l) >= 6 and l.lower()[:6] == ':frame'):
-			is_framed = True
+	else:
+		is_framed = False
+	f.seek(p)
 
-			# Change the structure of 'AttributeData'.
-			r2c.attr[0].AttributeData = pd.DataFrame(columns = ['Datetime', 'Values'])
-			r2c.attr[0].AttributeData.set_index('Datetime', inplace = True)
-		else:
-			is_framed = False
-		f.seek(p)
+	# Dimensions of the data.
+	if (box is None):
+		(nx, ny) = (r2c.grid.xCount, r2c.grid.yCount)
+	else:
+		(nx, ny) = (box[1] - box[0], box[3] - box[2])
 
-		# Read attributes from the file.
-		if (is_framed):
+	# Read attributes from the file.
+	if (is_framed):
 
-			# Multi-frame file.
-			# Each record is bounded by ':Frame'/':EndFrame' line markers, where ':Frame' marker also contains time-stamp of the record.
-			while True:
+		# Seek to the first frame in the time window.
+		if (not index is None and not start is None):
+			i = int(np.searchsorted(index.FrameTimes, r2cdatetime64(start)))
+			if (i < index.FrameOffsets.size):
+				f.seek(index.FrameOffsets[i])
+			else:
+				f.seek(0, 2)
+
+		# Multi-frame file.
+		# The array is grown in chunks of 'R2CFRAMECHUNK' frames (or the current size of the array if larger).
+		# Time-stamps are collected from the markers and converted after all frames have been read.
+		frame_data = np.empty((R2CFRAMECHUNK, nx, ny), dtype = R2CDTYPE)
+		frame_marks = []
+		for (frame_number, frame_mark, d) in r2cframesfromfile(r2c, f, start = start, stop = stop, box = box):
+
+			# Save the time-stamp.
+			frame_marks.append(frame_mark)
+
+			# Grow the array if full.
+			n = len(frame_marks)
+			if (n > frame_data.shape[0]):
+				frame_data.resize((frame_data.shape[0] + max(R2CFRAMECHUNK, frame_data.shape[0]), nx, ny), refcheck = False)
+
+			# Assign the data.
+			frame_data[n - 1] = d
+
+		# Trim the array to the number of frames read.
+		frame_data.resize((len(frame_marks), nx, ny), refcheck = False)
+
+		# Assign the frames and time-stamps to the attribute.
+		r2c.attr[first].AttributeData = frame_data
+		r2c.attr[first].FrameTimes = r2cdatetime64fromstrings(frame_marks)
+		r2c.attr[first].FrameCount = len(frame_marks)
+		if (not asarray):
+			r2c.attr[first].AttributeData = r2cframesasdataframe(r2c.attr[first])
+	else:
 
-				# Read line and break if no more lines exist in the file.
-				l = f.readline()
-				if not l:
-					break
+		# Single-frame file.
+		# Remove the attributes that were not read.
+		selection = [a for a in r2cattributesfromfile(r2c, f, first, box = box, attributes = attributes)]
+		r2c.attr[first:] = selection
+
+	# Update the grid specification to the extent of the box.
+	r2cgridfrombox(r2c, box)
+
+# Update the grid specification of an 'r2c' object to the extent of 'box' (see 'r2cboxfromr2c').
+def r2cgridfrombox(r2c, box):
+
+	# Update the origin and number of cells.
+	if (not box is None):
+		r2c.grid.xOrigin += box[0]*r2c.grid.xDelta
+		r2c.grid.yOrigin += box[2]*r2c.grid.yDelta
+		r2c.grid.xCount = box[1] - box[0]
+		r2c.grid.yCount = box[3] - box[2]
+
+# Generator over the frames of an existing multi-frame 'r2c' format file.
+# Yields the frame number, time-stamp (as 'datetime'), and data (xCount, yCount) of each frame.
+# Frames are read one at a time into the same buffer, which is yielded for every frame; copy the data to keep the frame.
+# Memory use is limited to a single frame regardless of the number of frames in the file.
+# Optionally, only frames from 'start' to before 'stop' and the cells inside 'xybox' or 'latlonbox' are yielded (see 'r2cfromr2c').
+def r2citerframesfromr2c(fpathr2cin, start = None, stop = None, xybox = None, latlonbox = None):
+
+	# Read the file.
+	with fileopen(fpathr2cin, 'rb', R2CBUFFERSIZE) as f:
+
+		# Read the grid specification from the header.
+		r2c = r2cfile()
+		r2cparseheader(r2c, f, readgrid = True, readmeta = False, readattr = False)
+
+		# Seek to the first frame in the time window.
+		if (not start is None):
+			index = r2cframeindexfromr2c(fpathr2cin)
+			i = int(np.searchsorted(index.FrameTimes, r2cdatetime64(start)))
+			if (i >= index.FrameOffsets.size):
+				return
+			f.seek(index.FrameOffsets[i])
 
-				# Parse the time-stamp from the ':Frame' marker.
-				frame_mark = datetime.strptime(l.strip().lower().split('"')[1].split('.')[0], '%Y/%m/%d %H:%M:%S')
+		# Read the frames.
+		box = r2cboxfromr2c(r2c, xybox = xybox, latlonbox = latlonbox)
+		if (box is None):
+			buffer = np.empty((r2c.grid.xCount, r2c.grid.yCount), dtype = R2CDTYPE)
+		else:
+			buffer = np.empty((box[1] - box[0], box[3] - box[2]), dtype = R2CDTYPE)
+		for (frame_number, frame_mark, d) in r2cframesfromfile(r2c, f, buffer, start = start, stop = stop, box = box):
+			yield (frame_number, datetime.strptime(frame_mark, '%Y/%m/%d %H:%M:%S'), d)
+
+# Generator over the attributes of an existing single-frame 'r2c' format file.
+# Yields each attribute ('r2cattribute') with its data (xCount, yCount) assigned to 'AttributeData'.
+# Attributes are read one at a time into the same buffer, which is assigned to every attribute; copy the data to keep the attribute.
+# Memory use is limited to a single attribute regardless of the number of attributes in the file.
+# Optionally, only the cells inside 'xybox' or 'latlonbox' and the attributes listed by name in 'attributes' are read (see 'r2cfromr2c').
+def r2citerattributesfromr2c(fpathr2cin, xybox = None, latlonbox = None, attributes = None):
+
+	# Read the file.
+	with fileopen(fpathr2cin, 'rb', R2CBUFFERSIZE) as f:
+
+		# Read the grid specification and attributes from the header.
+		r2c = r2cfile()
+		r2cparseheader(r2c, f, readgrid = True, readmeta = False, readattr = True)
+
+		# Read the attributes.
+		box = r2cboxfromr2c(r2c, xybox = xybox, latlonbox = latlonbox)
+		if (box is None):
+			buffer = np.empty((r2c.grid.xCount, r2c.grid.yCount), dtype = R2CDTYPE)
+		else:
+			buffer = np.empty((box[1] - box[0], box[3] - box[2]), dtype = R2CDTYPE)
+		for a in r2cattributesfromfile(r2c, f, buffer = buffer, box = box, attributes = attributes):
+			yield a
+
+# Convert a time-stamp to 'datetime64'.
+# Accepts 'datetime' objects (time zone information is discarded), strings in standard format for EnSim/GK, and 'datetime64'.
+def r2cdatetime64(frametime):
+
+	# Convert the time-stamp.
+	if (isinstance(frametime, str)):
+		return r2cdatetime64fromstrings([frametime.split('.')[0]])[0]
+	elif (isinstance(frametime, datetime)):
+		return np.datetime64(frametime.replace(tzinfo = None), 's')
+	else:
+		return np.datetime64(frametime, 's')
+
+# Scan a multi-frame 'r2c' format file for the byte offsets and time-stamps of the ':Frame' markers.
+# The file is read in blocks of 'R2CSCANBLOCKSIZE' bytes and only the ':Frame' lines are parsed (data are not converted).
+def r2cframeindexscan(fpathr2cin):
+
+	# Create the index.
+	index = r2cframeindex()
+	index.FilePath = path.abspath(fpathr2cin)
+	st = os.stat(fpathr2cin)
+	index.FileSize = st.st_size
+	index.FileMTime = st.st_mtime_ns
+
+	# Scan the file.
+	# ':Frame' markers are matched at the start of a line (':EndFrame' markers do not match).
+	# Markers are matched following a newline, which is faster than matching at the start of every line; a newline is added to the start of each block.
+	# The incomplete last line of each block is carried to the next block.
+	frame_pattern = re.compile(b'\n:frame[^\n]*', re.IGNORECASE)
+	frame_offsets = []
+	frame_numbers = []
+	frame_marks = []
+	with fileopen(fpathr2cin, 'rb', R2CBUFFERSIZE) as f:
+		base = 0
+		carry = b''
+		while True:
+			b = f.read(R2CSCANBLOCKSIZE)
+			if (not b):
+				b = carry
+				carry = b''
+				if (not b):
+					break
+			else:
+				b = carry + b
+				n = b.rfind(b'\n') + 1
+				carry = b[n:]
+				b = b[:n]
+			for m in frame_pattern.finditer(b'\n' + b):
+				l = m.group(0)[1:].decode()
+				frame_offsets.append(base + m.start())
+				frame_numbers.append(int(l.split()[1]))
+				frame_marks.append(l.split('"')[1].split('.')[0])
+			base += len(b)
+
+	# Assign the frames to the index.
+	index.FrameOffsets = np.array(frame_offsets, dtype = np.int64)
+	index.FrameNumbers = np.array(frame_numbers, dtype = np.int64)
+	index.FrameTimes = r2cdatetime64fromstrings(frame_marks)
+	return index
+
+# Return the frame index of a multi-frame 'r2c' format file.
+# Indices are reused from 'R2CFRAMEINDEXCACHE' or from the index file saved beside the file ('.frameidx.npz'), if either exists.
+# An index is only reused if the size and modification time of the file match those of the index; otherwise the file is scanned again.
+# If 'persist' is 'True', a newly scanned index is saved to the index file beside the file.
+def r2cframeindexfromr2c(fpathr2cin, persist = False):
+
+	# Check the cache.
+	st = os.stat(fpathr2cin)
+	fpathidx = fpathr2cin + '.frameidx.npz'
+	index = R2CFRAMEINDEXCACHE.get(path.abspath(fpathr2cin))
+	if (not index is None and index.FileSize == st.st_size and index.FileMTime == st.st_mtime_ns):
+		return index
+
+	# Check for an existing index file.
+	index = None
+	if (path.exists(fpathidx)):
+		with np.load(fpathidx) as idx:
+			if (int(idx['FileSize']) == st.st_size and int(idx['FileMTime']) == st.st_mtime_ns):
+				index = r2cframeindex()
+				index.FilePath = path.abspath(fpathr2cin)
+				index.FileSize = int(idx['FileSize'])
+				index.FileMTime = int(idx['FileMTime'])
+				index.FrameOffsets = idx['FrameOffsets']
+				index.FrameNumbers = idx['FrameNumbers']
+				index.FrameTimes = idx['FrameTimes'].astype('datetime64[s]')
+
+	# Scan the file.
+	if (index is None):
+		index = r2cframeindexscan(fpathr2cin)
+
+		# Save the index file.
+		# The index is written to a temporary file and renamed to replace existing files atomically.
+		if (persist):
+			with open(fpathidx + '.tmp', 'wb') as f:
+				np.savez(f, FileSize = index.FileSize, FileMTime = index.FileMTime, FrameOffsets = index.FrameOffsets, FrameNumbers = index.FrameNumbers, FrameTimes = index.FrameTimes.astype(np.int64))
+			os.replace(fpathidx + '.tmp', fpathidx)
+
+	# Save the index to the cache.
+	R2CFRAMEINDEXCACHE[index.FilePath] = index
+	return index
+
+# Return the position (0-based) of a frame in the frame index of a multi-frame 'r2c' format file.
+# 'frame' is the 1-based position of the frame in the file; otherwise, the frame is found by 'frametime' (see 'r2cdatetime64').
+# Calls 'exit()' if the frame does not exist in the file.
+def r2cframeposition(index, frame = None, frametime = None):
+
+	# Find the frame.
+	if (not frame is None):
+		i = int(frame) - 1
+		if (i < 0 or i >= index.FrameOffsets.size):
+			i = -1
+	else:
+		t = r2cdatetime64(frametime)
+		i = int(np.searchsorted(index.FrameTimes, t))
+		if (i >= index.FrameTimes.size or index.FrameTimes[i] != t):
+			i = -1
 
-				# Read the data and increment the frame count.
-				frame_data = np.fromfile(f, count = r2c.grid.yCount*r2c.grid.xCount, sep = ' ').reshape(r2c.grid.yCount, r2c.grid.xCount).transpose()
+	# Check status.
+	if (i < 0):
+		print('ERROR: The frame does not exist in the file: %s. The script cannot continue.' % index.FilePath)
+		exit()
+	return i
 
-				# Read the ':EndFrame' marker.
-				f.readline()
+# Return the data of a single frame from a multi-frame 'r2c' format file as an (xCount, yCount) array.
+# The frame is located using the frame index of the file and read directly from its byte offset (see 'r2cframeposition' for 'frame' and 'frametime').
+# 'r2cgridfromr2c' should be called in advance of this routine to read the grid specification of the file.
+def r2cframefromr2c(r2c, fpathr2cin, frame = None, frametime = None, persist = False):
+
+	# Locate the frame.
+	index = r2cframeindexfromr2c(fpathr2cin, persist = persist)
+	i = r2cframeposition(index, frame = frame, frametime = frametime)
+
+	# Read the frame.
+	with fileopen(fpathr2cin, 'rb', R2CBUFFERSIZE) as f:
+
+		# Skip the ':Frame' marker.
+		f.seek(index.FrameOffsets[i])
+		f.readline()
+
+		# Read the data.
+		return r2cblockfromfile(r2c, f)
+
+# Read the frames of a multi-frame 'r2c' format file from the byte offset 'p0' to before 'p1' into shared memory (used by 'r2cattributedatafromr2cparallel').
+# The range must start at a ':Frame' marker and end at a ':Frame' marker or the end of the file.
+# Marker lines (leading ':') are skipped as comments and the data of all frames are converted together (see 'asciiarrayfrombytes').
+# The (frames, xCount, yCount) data inside 'box' are copied to the frames starting at 'i' of the array of shape 'shape' in the shared memory block 'shm_name'.
+# Returns the number of values read, or '-1' if the data could not be converted (in which case the error is printed).
+def r2cframesfromrange(fpathr2cin, p0, p1, nx, ny, box, shm_name, shape, i):
+
+	# Read and convert the range.
+	# The error for malformed numbers is printed by the process.
+	with open(fpathr2cin, 'rb') as f:
+		f.seek(p0)
+		try:
+			v = asciiarrayfrombytes(f.read(p1 - p0), dtype = R2CDTYPE, f = f, offset = p0, comments = ':')
+		except SystemExit:
+			return -1
+	n = int(v.size/(nx*ny))
+	if (v.size != n*nx*ny):
+		return v.size
+	d = v.reshape(n, ny, nx).transpose(0, 2, 1)
+	if (not box is None):
+		d = d[:, box[0]:box[1], box[2]:box[3]]
+
+	# Copy the data to the shared array.
+	shm = shared_memory.SharedMemory(name = shm_name)
+	try:
+		frame_data = np.ndarray(shape, dtype = R2CDTYPE, buffer = shm.buf)
+		frame_data[i:(i + n)] = d
+		del frame_data
+	finally:
+		shm.close()
+	return v.size
+
+# Read the data of a multi-frame 'r2c' format file in parallel using 'processes' processes.
+# Returns 'False' without reading data if the file is smaller than 'R2CPARALLELMINSIZE', is compressed, or is not a multi-frame file; otherwise, returns 'True'.
+# The frame index of the file is split into ranges of frames, which are read by a pool of processes into a shared array in frame order (see 'r2cframesfromrange').
+# Data are assigned to the attribute of the 'r2c' object at index 'first', as by 'r2cattributedatafromfile' (see for 'asarray', 'start', 'stop', and 'box').
+# Calls 'exit()' if the data of a range do not match the number of frames and the grid.
+def r2cattributedatafromr2cparallel(r2c, fpathr2cin, first = 0, processes = 1, asarray = False, start = None, stop = None, box = None):
+
+	# Check the size and compression of the file.
+	size = os.stat(fpathr2cin).st_size
+	if (size < R2CPARALLELMINSIZE or not filecompression(fpathr2cin) is None):
+		return False
+
+	# Check for frames.
+	index = r2cframeindexfromr2c(fpathr2cin)
+	if (index.FrameOffsets.size == 0):
+		return False
+
+	# Select the frames from 'start' to before 'stop'.
+	i0 = 0
+	i1 = index.FrameOffsets.size
+	if (not start is None):
+		i0 = int(np.searchsorted(index.FrameTimes, r2cdatetime64(start)))
+	if (not stop is None):
+		i1 = max(i0, int(np.searchsorted(index.FrameTimes, r2cdatetime64(stop))))
+	offsets = np.append(index.FrameOffsets, size)
+
+	# Dimensions of the data.
+	(nx, ny) = (r2c.grid.xCount, r2c.grid.yCount)
+	if (box is None):
+		shape = (i1 - i0, nx, ny)
+	else:
+		shape = (i1 - i0, box[1] - box[0], box[3] - box[2])
+
+	# Split the frames into ranges (several per process to balance the load).
+	n = max(1, min(i1 - i0, processes*4))
+	ranges = np.linspace(i0, i1, n + 1).astype(int)
+
+	# Read the ranges into shared memory.
+	shm = shared_memory.SharedMemory(create = True, size = max(1, int(np.prod(shape))*np.dtype(R2CDTYPE).itemsize))
+	try:
+		with multiprocessing.Pool(processes) as pool:
+			tasks = []
+			for j in range(n):
+				if (ranges[j + 1] > ranges[j]):
+					tasks.append((ranges[j + 1] - ranges[j], pool.apply_async(r2cframesfromrange, (fpathr2cin, int(offsets[ranges[j]]), int(offsets[ranges[j + 1]]), nx, ny, box, shm.name, shape, ranges[j] - i0))))
+			for (k, task) in tasks:
+				m = task.get()
+				if (m < 0):
+					exit()
+				elif (m != k*nx*ny):
+					print('ERROR: Expected %d values but read %d values from the file: %s. The script cannot continue.' % (k*nx*ny, m, fpathr2cin))
+					exit()
+
+		# Copy the data from shared memory.
+		frame_data = np.ndarray(shape, dtype = R2CDTYPE, buffer = shm.buf).copy()
+	finally:
+		shm.close()
+		shm.unlink()
+
+	# Assign the frames and time-stamps to the attribute.
+	r2c.attr[first].AttributeData = frame_data
+	r2c.attr[first].FrameTimes = index.FrameTimes[i0:i1]
+	r2c.attr[first].FrameCount = i1 - i0
+	if (not asarray):
+		r2c.attr[first].AttributeData = r2cframesasdataframe(r2c.attr[first])
+
+	# Update the grid specification to the extent of the box.
+	r2cgridfrombox(r2c, box)
+	return True
+
+# Return the base path of the cache files of an 'r2c' format file.
+# The cache of a file consists of a '.npz' file with the header, attribute meta information, and the data of single-frame files,
+# and, for multi-frame files, a '.npy' file with the (frames, xCount, yCount) array of the data, which is memory-mapped (copy-on-write) when loaded.
+# If 'R2CCACHEDIR' is 'None', the files are saved beside the file ('.r2ccache'); otherwise, the files are saved to 'R2CCACHEDIR',
+# where the names include a hash of the absolute path of the file to distinguish files with the same name.
+def r2ccachepath(fpathr2cin):
+
+	# Return the path.
+	if (R2CCACHEDIR is None):
+		return fpathr2cin + '.r2ccache'
+	else:
+		h = hashlib.sha1(path.abspath(fpathr2cin).encode()).hexdigest()[:16]
+		return path.join(R2CCACHEDIR, path.basename(fpathr2cin) + '.' + h + '.r2ccache')
+
+# Return the key that identifies the version of an 'r2c' format file in its cache files, and the header of the file (bytes).
+# The key consists of the size and modification time (nanoseconds) of the file, the SHA-1 hash of the header, and the type of the data ('R2CDTYPE').
+# The open file 'f' must be positioned at the end of the header (e.g., by 'r2cparseheader'), which is where it is left.
+def r2ccachekey(fpathr2cin, f):
+
+	# Read the header.
+	p = f.tell()
+	f.seek(0)
+	header = f.read(p)
+	f.seek(p)
+
+	# Return the key.
+	st = os.stat(fpathr2cin)
+	return ((st.st_size, st.st_mtime_ns, hashlib.sha1(header).hexdigest(), np.dtype(R2CDTYPE).str), header)
+
+# Load attribute data from the cache files of an 'r2c' format file (see 'r2ccachepath').
+# Returns 'False' if the cache files do not exist or do not match 'key' (see 'r2ccachekey'); otherwise, returns 'True'.
+# Data are assigned to the attributes of the 'r2c' object starting at index 'first', as 'r2cattributedatafromfile' assigns data read from the file.
+# Multi-frame data are memory-mapped from the '.npy' file and only copied to memory when accessed (or if 'asarray' is 'False').
+# The memory map is copy-on-write, so that the data can be modified in place (as data read from the file) without changing the cache files.
+# The modification time of the cache files is updated when the files are loaded (see 'r2ccacheevict').
+def r2cattributedatafromcache(r2c, fpathcache, key, first = 0, asarray = False, start = None, stop = None, box = None, attributes = None):
+
+	# Check the cache files.
+	if (not path.exists(fpathcache + '.npz')):
+		return False
+	with np.load(fpathcache + '.npz') as c:
+		if (int(c['FileSize']) != key[0] or int(c['FileMTime']) != key[1] or str(c['HeaderHash']) != key[2]):
+			return False
+		if (not 'DataType' in c.files or str(c['DataType']) != key[3]):
+			return False
+		if (int(c['AttributeCount']) != len(r2c.attr) - first):
+			return False
+		if (bool(c['Framed']) and not path.exists(fpathcache + '.npy')):
+			return False
+
+		# Cells inside the box.
+		if (box is None):
+			(x0, x1, y0, y1) = (0, r2c.grid.xCount, 0, r2c.grid.yCount)
+		else:
+			(x0, x1, y0, y1) = box
 
-				# Append the record to the data frame.
-				r2c.attr[0].AttributeData.loc[frame_mark] = [frame_data]
+		# Load the data.
+		if (bool(c['Framed'])):
 
-				# Increment the frame count.
-				r2c.attr[0].FrameCount += 1
+			# Multi-frame file.
+			# Select the frames from 'start' to before 'stop'.
+			frame_times = c['FrameTimes'].astype('datetime64[s]')
+			i0 = 0
+			i1 = frame_times.size
+			if (not start is None):
+				i0 = int(np.searchsorted(frame_times, r2cdatetime64(start)))
+			if (not stop is None):
+				i1 = max(i0, int(np.searchsorted(frame_times, r2cdatetime64(stop))))
+			frame_data = np.load(fpathcache + '.npy', mmap_mode = 'c')
+			r2c.attr[first].AttributeData = frame_data[i0:i1, x0:x1, y0:y1]
+			r2c.attr[first].FrameTimes = frame_times[i0:i1]
+			r2c.attr[first].FrameCount = i1 - i0
+			if (not asarray):
+				r2c.attr[first].AttributeData = r2cframesasdataframe(r2c.attr[first])
 		else:
 
 			# Single-frame file.
-			# No markers exist between frames.
-			# Enumerate over the expected number of attributes.
-			for i, a in enumerate(r2c.attr):
-				a.AttributeData = np.fromfile(f, count = r2c.grid.yCount*r2c.grid.xCount, sep = ' ').reshape(r2c.grid.yCount, r2c.grid.xCount).transpose()
+			# Remove the attributes that were not selected.
+			if (attributes is None):
+				selection = range(first, len(r2c.attr))
+			else:
+				selection = r2cattributeselection(r2c, attributes, first)
+			for i in selection:
+				r2c.attr[i].AttributeData = c['Attribute%d' % (i - first)][x0:x1, y0:y1]
+			r2c.attr[first:] = [r2c.attr[i] for i in selection]
+
+	# Update the grid specification to the extent of the box.
+	r2cgridfrombox(r2c, box)
+
+	# Update the modification time of the cache files.
+	os.utime(fpathcache + '.npz')
+	if (path.exists(fpathcache + '.npy')):
+		os.utime(fpathcache + '.npy')
+	return True
+
+# Save the attribute data of an 'r2c' object read from an 'r2c' format file to the cache files of the file (see 'r2ccachepath').
+# 'key' and 'header' identify the version of the file (see 'r2ccachekey').
+# Saves the attributes of the 'r2c' object starting at index 'first', which must contain the data of the entire file as arrays.
+# The files are written to temporary files and renamed to replace existing files atomically.
+# Cache files in 'R2CCACHEDIR' are removed afterwards if their size exceeds 'R2CCACHEMAXSIZE' (see 'r2ccacheevict').
+def r2ccachesave(r2c, fpathcache, key, header, first = 0):
+
+	# Create the cache directory.
+	if (not R2CCACHEDIR is None and not path.exists(R2CCACHEDIR)):
+		os.makedirs(R2CCACHEDIR)
+
+	# Header and attribute meta information.
+	attr = r2c.attr[first:]
+	c = {}
+	c['FileSize'] = key[0]
+	c['FileMTime'] = key[1]
+	c['HeaderHash'] = key[2]
+	c['DataType'] = key[3]
+	c['Header'] = np.frombuffer(header, dtype = np.uint8)
+	c['AttributeCount'] = len(attr)
+	c['AttributeName'] = np.array([str(a.AttributeName) for a in attr])
+	c['AttributeType'] = np.array([str(a.AttributeType) for a in attr])
+	c['AttributeUnits'] = np.array([str(a.AttributeUnits) for a in attr])
+	c['Framed'] = (len(attr) > 0 and not attr[0].FrameTimes is None)
+
+	# Data.
+	# The '.npy' file is saved first so that it exists if the '.npz' file exists.
+	if (c['Framed']):
+		c['FrameTimes'] = attr[0].FrameTimes.astype(np.int64)
+		with open(fpathcache + '.npy.tmp', 'wb') as f:
+			np.save(f, attr[0].AttributeData)
+		os.replace(fpathcache + '.npy.tmp', fpathcache + '.npy')
+	else:
+		for i, a in enumerate(attr):
+			c['Attribute%d' % i] = a.AttributeData
+	with open(fpathcache + '.npz.tmp', 'wb') as f:
+		np.savez(f, **c)
+	os.replace(fpathcache + '.npz.tmp', fpathcache + '.npz')
+
+	# Remove old cache files.
+	r2ccacheevict()
+
+# Remove cache files from 'R2CCACHEDIR' until their total size does not exceed 'R2CCACHEMAXSIZE'.
+# Files are removed in order of modification time, which is updated when the files are loaded, starting with the least recently used.
+# The '.npz' and '.npy' files of the same cache are removed together.
+def r2ccacheevict():
+
+	# Check if a limit exists.
+	if (R2CCACHEDIR is None or R2CCACHEMAXSIZE is None or not path.exists(R2CCACHEDIR)):
+		return
+
+	# Group the files by cache.
+	caches = {}
+	for n in os.listdir(R2CCACHEDIR):
+		if (n.endswith('.r2ccache.npz') or n.endswith('.r2ccache.npy')):
+			st = os.stat(path.join(R2CCACHEDIR, n))
+			(t, size, files) = caches.get(n[:-4], (0, 0, []))
+			caches[n[:-4]] = (max(t, st.st_mtime_ns), size + st.st_size, files + [path.join(R2CCACHEDIR, n)])
+
+	# Remove the least recently used caches.
+	total = sum([c[1] for c in caches.values()])
+	for (t, size, files) in sorted(caches.values()):
+		if (total <= R2CCACHEMAXSIZE):
+			break
+		for fpath in files:
+			os.remove(fpath)
+		total -= size
 
 # Populate columns from an existing 'tb0' format file.
 # Reads the columns and data from file.
+# The header is read once and the data are converted in bulk to a (records, columns) array, which is assigned to 'Data' of the 'tb0' object.
+# The 'ColumnData' of each column is a view of its column in 'Data' (no data are copied).
 def tb0columnsfromtb0(tb0, fpathtb0in):
 
-	# Column count.
-	a = 0
-
 	# Set tb0 attributes from the columns defined in fpathtb0in.
-	with open(fpathtb0in, 'r') as f:
+	with fileopen(fpathtb0in, 'rb', R2CBUFFERSIZE) as f:
 
-		# First, scan the number of columns in the file.
-		n = 0
+		# Read the column meta information from the header.
+		column_meta = {}
 		while True:
 
 			# Read line and break if no more lines exist in the file.
-			l = f.readline()
+			l = f.readline().decode('latin-1')
 			if not l:
 				break
 
@@ -916,96 +3467,49 @@ def tb0columnsfromtb0(tb0, fpathtb0in):
 			if (l.find(':') != 0):
 				continue
 
-			# Read the number of columns from applicable attributes.
-			# Print a warning if the number of columns is not consistent.
-			m = shlex.split(l.strip())
-			if (m[0].lower() == ':columnname' or m[0].lower() == 'columntype' or m[0].lower() == 'columnunits' or m[0].lower() == 'columnlocationx' or m[0].lower() == 'columnlocationy'):
-				if (n == 0):
-
-					# Update the number of columns to the number of columns in this attribute.
-					n = len(m) - 1
-				else:
-					if (not (len(m) - 1) == n):
-
-						# Print a warning if the number of columns in this attribute does not match the number of columns derived from other attributes.
-						print('WARNING: The number of columns (%d) in the %s attribute is different from the number of columns (%d) derived from other attributes.' % (len(m) - 1), m[0], n)
-					if ((len(m) - 1) < n):
-
-						# Print a warning if the number of columns in this attribute is less than the number of columns derived from other attributes.
-						# Adjust the number of columns to be the lesser number.
-						print('WARNING: The number of columns (%d) derived from other attributes is adjusted to the lesser number of columns (%d) in the %s attribute.' % n, (len(m) - 1), m[0])
-						n = len(m) - 1
+			# Save the values of applicable attributes.
+			# Only lines with quoted values (e.g., names with spaces) are split by 'shlex'.
+			m = l.split()
+			if (m[0].lower() in [':columnname', ':columntype', ':columnunits', ':columnlocationx', ':columnlocationy']):
+				if ('"' in l or '\'' in l):
+					m = shlex.split(l.strip())
+				column_meta[m[0].lower()] = m[1:]
 			elif (m[0].lower() == ':endheader'):
 
 				# Break if at the end of the header.
 				break
 
 		# Stop with an error if no columns were found in the file.
+		# Print a warning and use the lesser number of columns if the number of columns is not consistent.
+		n = min([len(m) for m in column_meta.values()]) if (column_meta) else 0
 		if (n == 0):
 			print('ERROR: No columns were found in the file.')
 			quit()
-		else:
-			tb0.cols = []
-			for i in range(n):
-				tb0.cols.append(tb0column())
-				tb0.cols[i].ColumnData = []
-
-		# Read the column meta information from the header.
-		f.seek(0, 0)
-		while True:
-
-			# Read line and break if no more lines exist in the file.
-			l = f.readline()
-			if not l:
-				break
-
-			# Continue if not an attribute identified with leading ':'.
-			if (l.find(':') != 0):
-				continue
-
-			# Assign the column meta information.
-			# Columns were already added to the list from the scan.
-			m = shlex.split(l.strip())
-			if (m[0].lower() == ':columnname'):
-				for i in range(n):
-					tb0.cols[i].ColumnName = m[i + 1]
-			elif (m[0].lower() == ':columntype'):
-				for i in range(n):
-					tb0.cols[i].ColumnType = m[i + 1]
-			elif (m[0].lower() == ':columnunits'):
-				for i in range(n):
-					tb0.cols[i].ColumnUnits = m[i + 1]
-			elif (m[0].lower() == ':columnlocationx'):
-				for i in range(n):
-					tb0.cols[i].ColumnLocationX = float(m[i + 1])
-			elif (m[0].lower() == ':columnlocationy'):
-				for i in range(n):
-					tb0.cols[i].ColumnLocationY = float(m[i + 1])
-			elif (m[0].lower() == ':endheader'):
-
-				# Break if at the end of the header.
-				break
+		for (k, m) in column_meta.items():
+			if (len(m) != n):
+				print('WARNING: The number of columns (%d) in the %s attribute is different from the number of columns (%d) derived from other attributes. The lesser number of columns is used.' % (len(m), k, n))
 
 		# Read column data from the file.
-		while True:
-
-			# Read line and break if no more lines exist in the file.
-			p = f.tell()
-			l = f.readline()
-			if not l:
-				break
-
-			# Skip if a comment line with leading '#'.
-			if (l.find('#') == 0):
-				continue
-			f.seek(p)
-
-			# Read line and break if no more lines exist in the file.
-			v = np.fromfile(f, count = n, sep = ' ')
-			if (np.size(v) < n):
-				break
-
-			# Assign data to the appropriate column.
-			for i in range(n):
-				tb0.cols[i].ColumnData.append(v[i])
-			tb0.RecordCount += 1
+		# The data are converted in bulk, skipping comment lines with leading '#' (see 'asciiarrayfrombytes').
+		# An incomplete record at the end of the file is discarded.
+		p = f.tell()
+		v = asciiarrayfrombytes(f.read(), f = f, offset = p)
+		RecordCount = int(v.size/n)
+		tb0.Data = v[:(RecordCount*n)].reshape(RecordCount, n)
+
+	# Create the columns.
+	tb0.cols = []
+	for i in range(n):
+		tb0.cols.append(tb0column())
+		if (':columnname' in column_meta):
+			tb0.cols[i].ColumnName = column_meta[':columnname'][i]
+		if (':columntype' in column_meta):
+			tb0.cols[i].ColumnType = column_meta[':columntype'][i]
+		if (':columnunits' in column_meta):
+			tb0.cols[i].ColumnUnits = column_meta[':columnunits'][i]
+		if (':columnlocationx' in column_meta):
+			tb0.cols[i].ColumnLocationX = float(column_meta[':columnlocationx'][i])
+		if (':columnlocationy' in column_meta):
+			tb0.cols[i].ColumnLocationY = float(column_meta[':columnlocationy'][i])
+		tb0.cols[i].ColumnData = tb0.Data[:, i]
+	tb0.RecordCount = RecordCount
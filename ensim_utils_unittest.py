@@ -0,0 +1,1327 @@
+#!/usr/bin/python
+
+import bz2
+import contextlib
+import gzip
+import io
+import lzma
+import os
+from os import path
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import ensim_utils as eu
+
+# Tests of the reading and writing routines of 'ensim_utils' that do not require rpnpy.
+# Run from the directory of the file: python -m unittest ensim_utils_unittest
+# Tests of netCDF format files are skipped if the netCDF4 library is not loaded, and of 'zstd' compressed files if the zstandard library is not loaded.
+
+NX = 7
+NY = 5
+NFRAMES = 30
+
+# Return an 'r2c' object with a 'LATLONG' grid of NX by NY cells and no attributes.
+def makegrid():
+
+	# Create the object.
+	r2c = eu.r2cfile()
+	r2c.grid.Projection = 'LATLONG'
+	r2c.grid.Ellipsoid = 'SPHERE'
+	r2c.grid.xOrigin = -100.0
+	r2c.grid.yOrigin = 45.0
+	r2c.grid.xCount = NX
+	r2c.grid.yCount = NY
+	r2c.grid.xDelta = 0.5
+	r2c.grid.yDelta = 0.25
+	return r2c
+
+# Return the (NFRAMES, NX, NY) test frames and their hourly time-stamps.
+# Values are rounded to 4 decimals so that they are written to file without loss (see 'makemultiframe').
+def makeframes():
+
+	# Create the frames.
+	rng = np.random.default_rng(0)
+	frames = np.round(rng.random((NFRAMES, NX, NY))*100.0, 4)
+	times = [datetime(2002, 1, 1) + timedelta(hours = i) for i in range(NFRAMES)]
+	return (frames, times)
+
+# Return an 'r2c' object of a multi-frame attribute ready to write (see 'makegrid').
+def makemultiframe():
+
+	# Create the object.
+	r2c = makegrid()
+	r2c.attr.append(eu.r2cattribute(AttributeName = 'QO', AttributeUnits = 'm**3 s**-1'))
+	r2c.attr[0].AttributeDecimals = 4
+	return r2c
+
+# Write the test frames to a multi-frame 'r2c' format file.
+def makemultiframefile(fpath):
+
+	# Write the file.
+	(frames, times) = makeframes()
+	r2c = makemultiframe()
+	with eu.r2cframewriter(r2c, fpath) as w:
+		w.writeframes(frames, times)
+	return (frames, times)
+
+# Write single-frame test attributes to an 'r2c' format file.
+def makesingleframefile(fpath):
+
+	# Create the attributes.
+	rng = np.random.default_rng(1)
+	r2c = makegrid()
+	r2c.meta = eu.r2cmeta()
+	r2c.attr.append(eu.r2cattribute(AttributeName = 'Rank', AttributeType = 'integer', AttributeData = np.arange(NX*NY).reshape(NX, NY)))
+	r2c.attr.append(eu.r2cattribute(AttributeName = 'Elev', AttributeUnits = 'm', AttributeData = np.round(rng.random((NX, NY))*1000.0, 3)))
+	r2c.attr.append(eu.r2cattribute(AttributeName = 'GridArea', AttributeUnits = 'm**2', AttributeData = np.round(rng.random((NX, NY))*1.0e6, 1)))
+	for a in r2c.attr:
+		a.AttributeDecimals = 3
+
+	# Write the file.
+	eu.r2cfilecreateheader(r2c, fpath)
+	eu.r2cfileappendattributes(r2c, fpath, verbose = False)
+	return r2c
+
+# Copy an 'r2c' format file, wrapping the rows of the grid to lines of at most 'width' values.
+def makewrapfile(fpathin, fpathout, width = 3):
+
+	# Copy the file.
+	with open(fpathin, 'r') as fin, open(fpathout, 'w') as fout:
+		for l in fin:
+			t = l.split()
+			if (not t or l.startswith(':') or l.startswith('#')):
+				fout.write(l)
+			else:
+				for i in range(0, len(t), width):
+					fout.write(' '.join(t[i:(i + width)]) + '\n')
+
+# Write 'records' hourly records of 3 columns to a 'tb0' format file with time-step 'deltat' (see 'tb0deltatfromstring').
+def maketb0file(fpath, records, deltat):
+
+	# Create the object.
+	tb0 = eu.tb0file()
+	tb0.meta = eu.tb0meta()
+	tb0.meta.StartTime = datetime(2002, 1, 1, 6)
+	tb0.meta.DeltaT = deltat
+	tb0.meta.RoutingDeltaT = deltat
+	tb0.meta.FillFlag = '-1.0'
+	tb0.proj.Projection = 'LATLONG'
+	tb0.proj.Ellipsoid = 'SPHERE'
+	for i in range(3):
+		tb0.cols.append(eu.tb0column(ColumnName = 'S%d' % (i + 1), ColumnLocationX = -100.0 + i, ColumnLocationY = 45.0))
+
+	# Write the file.
+	data = np.arange(records*3, dtype = float).reshape(records, 3)
+	with eu.tb0recordwriter(tb0, fpath, fmt = '%g') as w:
+		w.appendrecords(data)
+	return data
+
+# Stand-in for the functions of 'rpnpy.librmn' used by 'ensim_utils', over a list of records held in memory.
+# Each record is a dictionary of the parameters of the record (as returned by 'rmn.fstprm') and the data ('d').
+# 'ip1' can be given in a second encoding ('ip1alt'), which is only matched by 'fstinf'. The calls to the functions are listed in 'calls'.
+class stubrmn(object):
+	EZ_INTERP_NEAREST = 0
+	EZ_INTERP_LINEAR = 1
+	EZ_OPT_INTERP_DEGREE = 'INTERP_DEGREE'
+	def __init__(self, records = None):
+		self.records = records or []
+		self.calls = []
+		self.grids = 0
+	def fstinl(self, fid):
+		self.calls.append(('fstinl', fid))
+		return list(range(len(self.records)))
+	def fstprm(self, h):
+		return self.records[h]
+	def fstinf(self, fid, nomvar = ' ', etiket = ' ', ip1 = -1, ip2 = -1, ip3 = -1):
+		self.calls.append(('fstinf', nomvar))
+		for (h, r) in enumerate(self.records):
+			if (r['nomvar'] == nomvar and r.get('ip1alt') == ip1 and ip2 in [-1, r['ip2']] and ip3 in [-1, r['ip3']] and etiket.strip() in ['', r['etiket'].strip()]):
+				return {'key': h}
+		return None
+	def fstluk(self, h):
+		self.calls.append(('fstluk', h))
+		return dict(self.records[h], key = h)
+	def readGrid(self, fid, rec):
+		self.calls.append(('readGrid', rec['ig1']))
+		self.grids += 1
+		return {'id': 100 + self.grids, 'ni': rec['ni'], 'nj': rec['nj']}
+	def gdrls(self, gid):
+		self.calls.append(('gdrls', gid))
+	def ezdefset(self, fstmatchgrid, fstvargrid):
+		self.calls.append(('ezdefset', fstmatchgrid['id'], fstvargrid['id']))
+	def ezsetopt(self, opt, val):
+		self.calls.append(('ezsetopt', val))
+	def ezsint(self, fstmatchgrid, fstvargrid, d):
+		self.calls.append(('ezsint', fstvargrid['id']))
+		return np.asarray(d, dtype = np.float32)
+
+# Return a record for 'stubrmn' with data of 'value' on a 4 by 3 grid with descriptor 'ig1'.
+def makerecord(nomvar, value, etiket = 'R1', ip1 = 0, ip2 = 0, ip3 = 0, ig1 = 1):
+	return {'nomvar': nomvar, 'etiket': etiket, 'ip1': ip1, 'ip2': ip2, 'ip3': ip3, 'grtyp': 'L', 'ig1': ig1, 'ig2': 2, 'ig3': 3, 'ig4': 4, 'ni': 4, 'nj': 3, 'd': np.full((4, 3), value, dtype = np.float32)}
+
+# Base class of tests that replace 'rmn' with 'stubrmn' and clear the caches of 'ensim_utils' before and after each test.
+class stubrmntestcase(unittest.TestCase):
+	def setUp(self):
+		self.settings = (eu.rmn, eu.RUNRPNPY)
+		eu.rmn = stubrmn()
+		eu.RUNRPNPY = True
+		eu.fstcacheclear()
+	def tearDown(self):
+		eu.fstcacheclear()
+		(eu.rmn, eu.RUNRPNPY) = self.settings
+
+# Base class of the tests; runs each test in a temporary directory.
+class testcase(unittest.TestCase):
+	def setUp(self):
+		self.cwd = os.getcwd()
+		self.tmp = tempfile.mkdtemp()
+		os.chdir(self.tmp)
+	def tearDown(self):
+		os.chdir(self.cwd)
+		shutil.rmtree(self.tmp)
+
+# File proxy that counts calls to 'flush'.
+class flushcounter(object):
+	def __init__(self, f):
+		self.f = f
+		self.count = 0
+	def write(self, b):
+		return self.f.write(b)
+	def flush(self):
+		self.count += 1
+		self.f.flush()
+
+# Multi-frame 'r2c' format files written by 'r2cframewriter'.
+class r2cframewriters(testcase):
+
+	# Frames written one at a time or in batches produce the same file.
+	def test_writeframes(self):
+		(frames, times) = makeframes()
+		with eu.r2cframewriter(makemultiframe(), 'a.r2c') as w:
+			for i in range(NFRAMES):
+				w.writeframe(frames[i], times[i])
+		with eu.r2cframewriter(makemultiframe(), 'b.r2c') as w:
+			w.writeframes(frames[:7], times[:7])
+			w.writeframes(frames[7:], times[7:])
+		with open('a.r2c', 'rb') as a, open('b.r2c', 'rb') as b:
+			self.assertEqual(a.read(), b.read())
+
+	# Batches larger than 'R2CFRAMECHUNK', frames of the attribute data ('None'), and formats of the attribute give the same file as single frames.
+	def test_chunks(self):
+		(frames, times) = makeframes()
+		chunk = eu.R2CFRAMECHUNK
+		try:
+			eu.R2CFRAMECHUNK = 4
+			for digits in [None, 3]:
+				r2c = makemultiframe()
+				r2c.attr[0].AttributeDigits = digits
+				r2c.attr[0].AttributeDecimals = None if (digits) else 4
+				with eu.r2cframewriter(r2c, 'a.r2c') as w:
+					for i in range(NFRAMES):
+						r2c.attr[0].AttributeData = frames[i]
+						w.writeframe(None, times[i])
+				r2c = makemultiframe()
+				r2c.attr[0].AttributeDigits = digits
+				r2c.attr[0].AttributeDecimals = None if (digits) else 4
+				with eu.r2cframewriter(r2c, 'b.r2c') as w:
+					w.writeframes(frames[:1], times[:1])
+					w.writeframes(frames[1:18], times[1:18])
+					w.writeframes(frames[18:18], times[18:18])
+					w.writeframes(list(frames[18:]), times[18:])
+				self.assertEqual(r2c.attr[0].FrameCount, NFRAMES)
+				with open('a.r2c', 'rb') as a, open('b.r2c', 'rb') as b:
+					self.assertEqual(a.read(), b.read())
+		finally:
+			eu.R2CFRAMECHUNK = chunk
+
+	# Writing resumes after the frames of a trimmed file with continuous frame numbers.
+	def test_resume(self):
+		(frames, times) = makemultiframefile('a.r2c')
+		with eu.r2cframewriter(makemultiframe(), 'b.r2c') as w:
+			w.writeframes(frames[:15], times[:15])
+		with open('b.r2c', 'a') as f:
+			f.write(':Frame 16 16 "2002/01/01 15:00:00.000"\n1.0 2.0\n')
+		for n in [None, 9]:
+			r2c = makemultiframe()
+			r2c.attr[0].FrameCount = eu.r2cfiletrimframes('b.r2c', n)
+			with eu.r2cframewriter(r2c, 'b.r2c', resume = True) as w:
+				i = r2c.attr[0].FrameCount
+				w.writeframe(frames[i], times[i])
+				w.writeframes(frames[(i + 1):], times[(i + 1):])
+			np.testing.assert_array_equal(eu.r2cframeindexscan('b.r2c').FrameNumbers, np.arange(1, NFRAMES + 1))
+			with open('a.r2c', 'rb') as a, open('b.r2c', 'rb') as b:
+				self.assertEqual(a.read(), b.read())
+			eu.r2cfiletrimframes('b.r2c', 15)
+
+	# Batches are only flushed when they cross a multiple of 'FlushFrames' (as single frames).
+	def test_flushframes(self):
+		(frames, times) = makeframes()
+		with eu.r2cframewriter(makemultiframe(), 'a.r2c', flushframes = 10) as w:
+			w.f = flushcounter(w.f)
+			for i in range(0, NFRAMES, 3):
+				w.writeframes(frames[i:(i + 3)], times[i:(i + 3)])
+			self.assertEqual(w.f.count, 3)
+			w.f = w.f.f
+
+# Formatting of 'r2c' format files and reading the files back.
+class r2cformat(testcase):
+
+	# Blocks formatted together give the same text as formatting each value separately.
+	def test_text(self):
+		rng = np.random.default_rng(2)
+		data = (rng.random((NX, NY)) - 0.5)*10.0**rng.integers(-8, 8, (NX, NY))
+		data[0, 0] = 0.0
+		for fmt in ['%g', '%.4g', '%.2f']:
+			expected = ''.join([' '.join([fmt % v for v in row]) + '\n' for row in data.T])
+			self.assertEqual(eu.r2ctextfromarray(data, fmt), expected)
+		self.assertEqual(eu.r2ctextfromarray(np.zeros((0, 3))), '\n\n\n')
+
+	# Attributes are printed with the significant digits or decimals of the attribute and read back at that precision.
+	def test_digits(self):
+		rng = np.random.default_rng(3)
+		r2c = makegrid()
+		r2c.attr.append(eu.r2cattribute(AttributeName = 'PR', AttributeData = rng.random((NX, NY))*1.0e-3))
+		r2c.attr.append(eu.r2cattribute(AttributeName = 'TT', AttributeData = rng.random((NX, NY))*300.0))
+		r2c.attr.append(eu.r2cattribute(AttributeName = 'ZZ', AttributeData = rng.random((NX, NY))))
+		r2c.attr[0].AttributeDigits = 4
+		r2c.attr[1].AttributeDecimals = 2
+		eu.r2cfilecreateheader(r2c, 'a.r2c')
+		eu.r2cfileappendattributes(r2c, 'a.r2c', verbose = False)
+		b = eu.r2cfile()
+		eu.r2cfromr2c(b, 'a.r2c')
+		for (a, x, fmt) in zip(r2c.attr, b.attr, ['%.4g', '%.2f', '%g']):
+			np.testing.assert_array_equal(x.AttributeData, np.vectorize(lambda v: float(fmt % v))(a.AttributeData))
+
+	# Single-frame attributes are read back in full, by name, and by box.
+	def test_singleframe(self):
+		r2c = makesingleframefile('a.r2c')
+		b = eu.r2cfile()
+		eu.r2cfromr2c(b, 'a.r2c')
+		self.assertEqual([a.AttributeName for a in b.attr], ['Rank', 'Elev', 'GridArea'])
+		for (a, x) in zip(r2c.attr, b.attr):
+			np.testing.assert_array_equal(x.AttributeData, a.AttributeData)
+		b = eu.r2cfile()
+		eu.r2cfromr2c(b, 'a.r2c', attributes = ['GridArea', 'Rank'], xybox = (1, 4, 2, 5))
+		self.assertEqual(sorted([a.AttributeName for a in b.attr]), ['GridArea', 'Rank'])
+		for x in b.attr:
+			a = [a for a in r2c.attr if (a.AttributeName == x.AttributeName)][0]
+			np.testing.assert_array_equal(x.AttributeData, a.AttributeData[1:4, 2:5])
+		self.assertEqual((b.grid.xCount, b.grid.yCount), (3, 3))
+
+	# Frames written by 'r2cfileappendmultiframe' and 'r2cframewriter' give the same file, which is read back in full and by time and box.
+	def test_multiframe(self):
+		(frames, times) = makemultiframefile('a.r2c')
+		r2c = makemultiframe()
+		eu.r2cfilecreateheader(r2c, 'b.r2c')
+		for i in range(NFRAMES):
+			r2c.attr[0].AttributeData = frames[i]
+			eu.r2cfileappendmultiframe(r2c, 'b.r2c', i + 1, times[i])
+		with open('a.r2c', 'rb') as a, open('b.r2c', 'rb') as b:
+			self.assertEqual(a.read(), b.read())
+		b = eu.r2cfile()
+		eu.r2cfromr2c(b, 'a.r2c', asarray = True)
+		self.assertEqual(b.attr[0].FrameCount, NFRAMES)
+		np.testing.assert_array_equal(b.attr[0].AttributeData, frames)
+		np.testing.assert_array_equal(b.attr[0].FrameTimes, np.array(times, dtype = 'datetime64[s]'))
+		b = eu.r2cfile()
+		eu.r2cfromr2c(b, 'a.r2c', asarray = True, start = times[3], stop = times[8], xybox = (2, 6, 0, 2))
+		np.testing.assert_array_equal(b.attr[0].AttributeData, frames[3:8, 2:6, 0:2])
+		np.testing.assert_array_equal(b.attr[0].FrameTimes, np.array(times[3:8], dtype = 'datetime64[s]'))
+
+# Boxes of cells selected by latitude and longitude.
+class r2clatlonbox(testcase):
+
+	# Return an 'r2c' object with a 'LATLONG' grid of 'xcount' cells of 1 degree from longitude 'xorigin'.
+	def grid(self, xorigin, xcount):
+		r2c = makegrid()
+		r2c.grid.xOrigin = xorigin
+		r2c.grid.xCount = xcount
+		r2c.grid.xDelta = 1.0
+		r2c.grid.yOrigin = -10.0
+		r2c.grid.yCount = 20
+		r2c.grid.yDelta = 1.0
+		return r2c
+
+	# Longitudes more than 180 degrees east of the origin select the eastern cells of the grid.
+	def test_global(self):
+		r2c = self.grid(-180.0, 360)
+		self.assertEqual(eu.r2cboxfromr2c(r2c, latlonbox = (-2.0, 3.0, 160.0, 175.0)), (340, 355, 8, 13))
+		self.assertEqual(eu.r2cboxfromr2c(r2c, latlonbox = (-2.0, 3.0, -10.0, 10.0)), (170, 190, 8, 13))
+		self.assertEqual(eu.r2cboxfromr2c(r2c, latlonbox = (-2.0, 3.0, 200.0, 210.0)), (20, 30, 8, 13))
+		self.assertEqual(eu.r2cboxfromr2c(r2c, latlonbox = (-2.0, 3.0, 0.0, 360.0)), (0, 360, 8, 13))
+		with self.assertRaises(SystemExit), contextlib.redirect_stdout(io.StringIO()):
+			eu.r2cboxfromr2c(r2c, latlonbox = (-2.0, 3.0, 170.0, -170.0))
+
+	# Grids wider than 180 degrees that are not global select boxes east of the origin and boxes that start west of the origin.
+	def test_wide(self):
+		r2c = self.grid(-100.0, 250)
+		self.assertEqual(eu.r2cboxfromr2c(r2c, latlonbox = (0.0, 1.0, 120.0, 140.0)), (220, 240, 10, 11))
+		self.assertEqual(eu.r2cboxfromr2c(r2c, latlonbox = (0.0, 1.0, -120.0, -90.0)), (0, 10, 10, 11))
+		self.assertEqual(eu.r2cboxfromr2c(r2c, latlonbox = (0.0, 1.0, 140.0, -110.0)), (240, 250, 10, 11))
+		with self.assertRaises(SystemExit), contextlib.redirect_stdout(io.StringIO()):
+			eu.r2cboxfromr2c(r2c, latlonbox = (0.0, 1.0, 160.0, 200.0))
+		with self.assertRaises(SystemExit), contextlib.redirect_stdout(io.StringIO()):
+			eu.r2cboxfromr2c(r2c, latlonbox = (0.0, 1.0, 140.0, -90.0))
+
+	# The box is read from file as the same cells selected by 'xybox'.
+	def test_read(self):
+		r2c = self.grid(-180.0, 360)
+		r2c.attr.append(eu.r2cattribute(AttributeName = 'X', AttributeData = np.add.outer(np.arange(360.0), np.arange(20.0)/100.0)))
+		eu.r2cfilecreateheader(r2c, 'a.r2c')
+		eu.r2cfileappendattributes(r2c, 'a.r2c', verbose = False)
+		b = eu.r2cfile()
+		eu.r2cfromr2c(b, 'a.r2c', latlonbox = (-2.0, 3.0, 160.0, 175.0))
+		np.testing.assert_array_equal(b.attr[0].AttributeData, r2c.attr[0].AttributeData[340:355, 8:13])
+		self.assertEqual(b.grid.xOrigin, 160.0)
+
+# Compressed files.
+class compressedfiles(testcase):
+
+	# Return the extensions of the compressions to test.
+	def extensions(self):
+		return ['.gz', '.bz2', '.xz'] + (['.zst'] if (eu.RUNZSTD) else [])
+
+	# Return the decompressed contents of a compressed file.
+	def decompress(self, fpath):
+		if (fpath.endswith('.gz')):
+			return gzip.open(fpath, 'rb').read()
+		elif (fpath.endswith('.bz2')):
+			return bz2.open(fpath, 'rb').read()
+		elif (fpath.endswith('.xz')):
+			return lzma.open(fpath, 'rb').read()
+		with open(fpath, 'rb') as f:
+			return eu.zstandard.ZstdDecompressor().stream_reader(f, read_across_frames = True).read()
+
+	# Files are complete at the end of each 'with' block and read back as the uncompressed file.
+	def test_singleframe(self):
+		r2c = makesingleframefile('a.r2c')
+		for ext in self.extensions():
+			with eu.fileopen('b.r2c' + ext, 'w') as f:
+				f.write(':FileType r2c ASCII EnSim 1.0\n')
+			self.assertEqual(self.decompress('b.r2c' + ext), b':FileType r2c ASCII EnSim 1.0\n')
+			eu.r2cfilecreateheader(r2c, 'b.r2c' + ext)
+			eu.r2cfileappendattributes(r2c, 'b.r2c' + ext, verbose = False)
+			self.assertEqual(eu.filecompression('b.r2c' + ext, 'w'), eu.FILECOMPRESSIONEXTENSIONS[ext])
+			with open('a.r2c', 'rb') as a:
+				self.assertEqual(self.decompress('b.r2c' + ext).split(b':EndHeader')[1], a.read().split(b':EndHeader')[1])
+			b = eu.r2cfile()
+			eu.r2cfromr2c(b, 'b.r2c' + ext, attributes = ['Elev'], xybox = (1, 4, 2, 5))
+			np.testing.assert_array_equal(b.attr[0].AttributeData, r2c.attr[1].AttributeData[1:4, 2:5])
+
+	# Frames appended separately and by 'r2cframewriter' are read back in full and by time and box.
+	def test_multiframe(self):
+		(frames, times) = makemultiframefile('a.r2c')
+		for ext in self.extensions():
+			r2c = makemultiframe()
+			eu.r2cfilecreateheader(r2c, 'b.r2c' + ext)
+			for i in range(NFRAMES):
+				r2c.attr[0].AttributeData = frames[i]
+				eu.r2cfileappendmultiframe(r2c, 'b.r2c' + ext, i + 1, times[i])
+			with eu.r2cframewriter(makemultiframe(), 'c.r2c' + ext) as w:
+				w.writeframes(frames[:10], times[:10])
+				w.writeframe(frames[10], times[10])
+				w.writeframes(frames[11:], times[11:])
+			with open('a.r2c', 'rb') as a:
+				a = a.read().split(b':EndHeader')[1]
+			for fpath in ['b.r2c' + ext, 'c.r2c' + ext]:
+				self.assertEqual(self.decompress(fpath).split(b':EndHeader')[1], a)
+				b = eu.r2cfile()
+				eu.r2cfromr2c(b, fpath, asarray = True)
+				np.testing.assert_array_equal(b.attr[0].AttributeData, frames)
+				b = eu.r2cfile()
+				eu.r2cfromr2c(b, fpath, asarray = True, start = times[20], stop = times[25], xybox = (0, 2, 3, 5))
+				np.testing.assert_array_equal(b.attr[0].AttributeData, frames[20:25, 0:2, 3:5])
+
+	# 'tb0' format files are written, appended, and read back.
+	def test_tb0(self):
+		data = maketb0file('a.tb0', 20, 1)
+		for ext in self.extensions():
+			data = maketb0file('b.tb0' + ext, 20, 1)
+			tb0 = eu.tb0file()
+			eu.tb0metafromtb0(tb0, 'b.tb0' + ext)
+			eu.tb0columnsfromtb0(tb0, 'b.tb0' + ext)
+			self.assertEqual(tb0.meta.StartTime, datetime(2002, 1, 1, 6))
+			np.testing.assert_array_equal(tb0.Data, data)
+			eu.tb0fileappendcolumndata(tb0, 'b.tb0' + ext, '%g')
+			eu.tb0columnsfromtb0(tb0, 'b.tb0' + ext)
+			np.testing.assert_array_equal(tb0.Data, np.concatenate((data, data)))
+
+	# Compressed files with other extensions are identified by the leading bytes of the file when read.
+	def test_magic(self):
+		(frames, times) = makemultiframefile('a.r2c')
+		self.assertIsNone(eu.filecompression('a.r2c'))
+		for ext in self.extensions():
+			with open('a.r2c', 'rb') as a, eu.fileopen('b.r2c' + ext, 'wb') as b:
+				b.write(a.read())
+			shutil.move('b.r2c' + ext, 'b.dat')
+			self.assertEqual(eu.filecompression('b.dat'), eu.FILECOMPRESSIONEXTENSIONS[ext])
+			self.assertIsNone(eu.filecompression('b.dat', 'w'))
+			b = eu.r2cfile()
+			eu.r2cfromr2c(b, 'b.dat', asarray = True, start = times[3])
+			np.testing.assert_array_equal(b.attr[0].AttributeData, frames[3:])
+
+# Iterating the frames and attributes of 'r2c' format files.
+class r2citerators(testcase):
+
+	# Frames are yielded as read by 'r2cfromr2c', in full and by time and box, into the same buffer.
+	def test_frames(self):
+		(frames, times) = makemultiframefile('a.r2c')
+		for kwargs in [{}, {'start': times[7]}, {'stop': times[3]}, {'start': times[7], 'stop': times[19], 'xybox': (1, 6, 2, 4)}, {'start': times[NFRAMES - 1] + timedelta(hours = 1)}]:
+			a = eu.r2cfile()
+			eu.r2cfromr2c(a, 'a.r2c', asarray = True, **kwargs)
+			numbers = []
+			frametimes = []
+			data = []
+			buffers = set()
+			for (n, t, d) in eu.r2citerframesfromr2c('a.r2c', **kwargs):
+				numbers.append(n)
+				frametimes.append(t)
+				data.append(d.copy())
+				buffers.add(id(d))
+			i0 = int(np.searchsorted(np.array(times, dtype = 'datetime64[s]'), np.datetime64(kwargs.get('start', times[0]), 's')))
+			self.assertEqual(numbers, list(range(i0 + 1, i0 + 1 + len(numbers))))
+			self.assertEqual(len(data), a.attr[0].FrameCount)
+			np.testing.assert_array_equal(np.array(frametimes, dtype = 'datetime64[s]'), a.attr[0].FrameTimes)
+			if (data):
+				self.assertTrue(isinstance(frametimes[0], datetime))
+				self.assertEqual(len(buffers), 1)
+				np.testing.assert_array_equal(np.stack(data), a.attr[0].AttributeData)
+
+	# Attributes are yielded as read by 'r2cfromr2c', in full and by name and box.
+	def test_attributes(self):
+		makesingleframefile('a.r2c')
+		for kwargs in [{}, {'attributes': ['GridArea', 'Rank']}, {'xybox': (2, 5, 0, 3)}]:
+			a = eu.r2cfile()
+			eu.r2cfromr2c(a, 'a.r2c', **kwargs)
+			b = [(x.AttributeName, x.AttributeData.copy()) for x in eu.r2citerattributesfromr2c('a.r2c', **kwargs)]
+			self.assertEqual([x[0] for x in b], [x.AttributeName for x in a.attr])
+			for (x, y) in zip(a.attr, b):
+				np.testing.assert_array_equal(y[1], x.AttributeData)
+
+# Converting blocks of numbers in ASCII text.
+class asciiarrays(testcase):
+
+	# Blocks with different numbers of values on each line, comments, and blank lines are converted as a list.
+	def test_ragged(self):
+		b = b'1 2 3\n4 5\n# comment 7 8\n\n6.5e1 # 9\n   \n-7\n'
+		np.testing.assert_array_equal(eu.asciiarrayfrombytes(b), [1.0, 2.0, 3.0, 4.0, 5.0, 65.0, -7.0])
+		np.testing.assert_array_equal(eu.asciiarrayfrombytes(b'1 2\n3 4\n', dtype = np.float32), np.arange(1, 5, dtype = np.float32))
+		self.assertEqual(eu.asciiarrayfrombytes(b'# comment\n').size, 0)
+		self.assertEqual(eu.asciiarrayfrombytes(b'\n  \n').size, 0)
+
+	# The line of a malformed number is counted from the start of the file.
+	def test_malformed(self):
+		makemultiframefile('a.r2c')
+		with open('a.r2c', 'r') as f:
+			lines = f.readlines()
+		i = [k for (k, l) in enumerate(lines) if (l.startswith(':Frame 20 '))][0] + 3
+		t = lines[i].split()
+		t[2] = '1.2.3'
+		lines[i] = ' '.join(t) + '\n'
+		with open('a.r2c', 'w') as f:
+			f.writelines(lines)
+		expected = 'ERROR: Malformed numeric data at line %d: %s.' % (i + 1, lines[i].strip())
+		for read in [lambda: eu.r2cfromr2c(eu.r2cfile(), 'a.r2c'), lambda: eu.r2cframefromr2c(r2c, 'a.r2c', frame = 20)]:
+			r2c = eu.r2cfile()
+			eu.r2cgridfromr2c(r2c, 'a.r2c')
+			out = io.StringIO()
+			with self.assertRaises(SystemExit), contextlib.redirect_stdout(out):
+				read()
+			self.assertIn(expected, out.getvalue())
+		with open('a.r2c', 'rb') as f:
+			b = f.read()
+		p = b.index(b':Frame 20 ')
+		with open('a.r2c', 'rb') as f:
+			out = io.StringIO()
+			with self.assertRaises(SystemExit), contextlib.redirect_stdout(out):
+				eu.asciiarrayfrombytes(b[p:], f = f, offset = p, comments = ':')
+			self.assertIn(expected, out.getvalue())
+			self.assertEqual(f.tell(), 0)
+
+# Multi-frame data as a 'DataFrame' (the default of 'r2cfromr2c').
+class r2cdataframes(testcase):
+
+	# The 'DataFrame' has the 'Datetime' index and 'Values' column of frames built a frame at a time, and the frames are views of one array.
+	def test_dataframe(self):
+		(frames, times) = makemultiframefile('a.r2c')
+		r2c = eu.r2cfile()
+		eu.r2cfromr2c(r2c, 'a.r2c')
+		df = r2c.attr[0].AttributeData
+		expected = pd.DataFrame(columns = ['Datetime', 'Values'])
+		expected.set_index('Datetime', inplace = True)
+		for i in range(NFRAMES):
+			expected.loc[times[i]] = [frames[i]]
+		self.assertIsInstance(df, pd.DataFrame)
+		self.assertEqual(df.shape, expected.shape)
+		self.assertEqual(df.index.name, 'Datetime')
+		self.assertEqual(list(df.columns), ['Values'])
+		self.assertEqual(list(df.index), list(expected.index))
+		self.assertEqual(r2c.attr[0].FrameCount, NFRAMES)
+		for i in range(NFRAMES):
+			self.assertEqual(df.loc[times[i], 'Values'].shape, (NX, NY))
+			np.testing.assert_array_equal(df.loc[times[i], 'Values'], expected.loc[times[i], 'Values'])
+		base = df['Values'].iloc[0].base
+		self.assertIsNotNone(base)
+		self.assertTrue(all([np.shares_memory(v, base) for v in df['Values']]))
+		self.assertIs(eu.r2cframesasdataframe(r2c.attr[0]), df)
+
+	# Frames selected by time and box keep the same structure.
+	def test_selection(self):
+		(frames, times) = makemultiframefile('a.r2c')
+		r2c = eu.r2cfile()
+		eu.r2cfromr2c(r2c, 'a.r2c', start = times[5], stop = times[9], xybox = (1, 3, 0, 4))
+		df = r2c.attr[0].AttributeData
+		self.assertEqual(list(df.index), [pd.Timestamp(t) for t in times[5:9]])
+		np.testing.assert_array_equal(np.stack(df['Values']), frames[5:9, 1:3, 0:4])
+
+# Files with rows of the grid wrapped across multiple lines.
+class r2cwrapped(testcase):
+
+	# Selected attributes and boxes of single-frame files match the same selection of the file with unwrapped rows.
+	def test_singleframe(self):
+		makesingleframefile('a.r2c')
+		makewrapfile('a.r2c', 'b.r2c')
+		for kwargs in [{}, {'attributes': ['GridArea']}, {'attributes': ['Elev', 'GridArea'], 'xybox': (1, 4, 2, 5)}, {'xybox': (0, NX, 1, 3)}]:
+			a = eu.r2cfile()
+			eu.r2cfromr2c(a, 'a.r2c', **kwargs)
+			b = eu.r2cfile()
+			eu.r2cfromr2c(b, 'b.r2c', **kwargs)
+			self.assertEqual([x.AttributeName for x in b.attr], [x.AttributeName for x in a.attr])
+			for (x, y) in zip(a.attr, b.attr):
+				np.testing.assert_array_equal(y.AttributeData, x.AttributeData)
+
+	# Time windows and boxes of multi-frame files match the same selection of the file with unwrapped rows.
+	def test_multiframe(self):
+		(frames, times) = makemultiframefile('a.r2c')
+		makewrapfile('a.r2c', 'b.r2c')
+		for kwargs in [{}, {'start': times[5], 'stop': times[9]}, {'start': times[5], 'xybox': (1, 4, 2, 5)}, {'xybox': (2, 3, 0, NY)}]:
+			b = eu.r2cfile()
+			eu.r2cfromr2c(b, 'b.r2c', asarray = True, **kwargs)
+			i0 = times.index(kwargs.get('start', times[0]))
+			i1 = times.index(kwargs['stop']) if ('stop' in kwargs) else NFRAMES
+			(x0, x1, y0, y1) = kwargs.get('xybox', (0, NX, 0, NY))
+			np.testing.assert_allclose(b.attr[0].AttributeData, frames[i0:i1, x0:x1, y0:y1])
+
+# Single-frame 'r2c' format files written by 'r2cfileappendattributes'.
+class r2cattributewriters(testcase):
+
+	# Attributes formatted in parallel are written to the same file as attributes formatted serially.
+	def test_processes(self):
+		r2c = makesingleframefile('a.r2c')
+		minvalues = eu.R2CFORMATPARALLELMINVALUES
+		blocksize = eu.R2CFORMATBLOCKSIZE
+		try:
+			eu.R2CFORMATPARALLELMINVALUES = 0
+			eu.R2CFORMATBLOCKSIZE = NY*2
+			eu.r2cfilecreateheader(r2c, 'b.r2c')
+			eu.r2cfileappendattributes(r2c, 'b.r2c', verbose = False, processes = 2)
+		finally:
+			eu.R2CFORMATPARALLELMINVALUES = minvalues
+			eu.R2CFORMATBLOCKSIZE = blocksize
+		with open('a.r2c', 'rb') as a, open('b.r2c', 'rb') as b:
+			self.assertEqual(a.read(), b.read())
+
+	# The formatting of attributes does not use the processes set to read files ('R2CPROCESSES').
+	def test_readprocesses(self):
+		processes = eu.R2CPROCESSES
+		minvalues = eu.R2CFORMATPARALLELMINVALUES
+		pool = eu.multiprocessing.Pool
+		try:
+			eu.R2CPROCESSES = 4
+			eu.R2CFORMATPARALLELMINVALUES = 0
+			eu.multiprocessing.Pool = None
+			makesingleframefile('a.r2c')
+		finally:
+			eu.R2CPROCESSES = processes
+			eu.R2CFORMATPARALLELMINVALUES = minvalues
+			eu.multiprocessing.Pool = pool
+
+# Frame index and parallel reading of multi-frame 'r2c' format files.
+class r2cframes(testcase):
+
+	# The index locates the ':Frame' markers; single frames are read by position and by time-stamp.
+	def test_frameindex(self):
+		(frames, times) = makemultiframefile('a.r2c')
+		index = eu.r2cframeindexfromr2c('a.r2c')
+		np.testing.assert_array_equal(index.FrameNumbers, np.arange(1, NFRAMES + 1))
+		np.testing.assert_array_equal(index.FrameTimes, np.array(times, dtype = 'datetime64[s]'))
+		with open('a.r2c', 'rb') as f:
+			b = f.read()
+		for p in index.FrameOffsets:
+			self.assertTrue(b[p:].startswith(b':Frame '))
+		r2c = eu.r2cfile()
+		eu.r2cgridfromr2c(r2c, 'a.r2c')
+		np.testing.assert_array_equal(eu.r2cframefromr2c(r2c, 'a.r2c', frame = 7), frames[6])
+		np.testing.assert_array_equal(eu.r2cframefromr2c(r2c, 'a.r2c', frametime = times[NFRAMES - 1]), frames[NFRAMES - 1])
+		with self.assertRaises(SystemExit), contextlib.redirect_stdout(io.StringIO()):
+			eu.r2cframefromr2c(r2c, 'a.r2c', frame = NFRAMES + 1)
+		with self.assertRaises(SystemExit), contextlib.redirect_stdout(io.StringIO()):
+			eu.r2cframefromr2c(r2c, 'a.r2c', frametime = times[0] - timedelta(minutes = 30))
+
+	# Saved indices are reused until the file changes.
+	def test_persist(self):
+		(frames, times) = makemultiframefile('a.r2c')
+		eu.r2cframeindexfromr2c('a.r2c', persist = True)
+		self.assertTrue(path.isfile('a.r2c.frameidx.npz'))
+		eu.R2CFRAMEINDEXCACHE.clear()
+		scan = eu.r2cframeindexscan
+		try:
+			eu.r2cframeindexscan = None
+			index = eu.r2cframeindexfromr2c('a.r2c')
+		finally:
+			eu.r2cframeindexscan = scan
+		self.assertEqual(index.FrameOffsets.size, NFRAMES)
+		eu.r2cfiletrimframes('a.r2c', 12)
+		index = eu.r2cframeindexfromr2c('a.r2c')
+		self.assertEqual(index.FrameOffsets.size, 12)
+
+	# Frames read in parallel match frames read serially, in full and by time and box.
+	def test_processes(self):
+		(frames, times) = makemultiframefile('a.r2c')
+		minsize = eu.R2CPARALLELMINSIZE
+		try:
+			eu.R2CPARALLELMINSIZE = 0
+			for kwargs in [{}, {'start': times[4], 'stop': times[25]}, {'start': times[29], 'xybox': (1, 4, 2, 5)}]:
+				r2c = eu.r2cfile()
+				eu.r2cgridfromr2c(r2c, 'a.r2c')
+				r2c.attr.append(eu.r2cattribute())
+				self.assertTrue(eu.r2cattributedatafromr2cparallel(r2c, 'a.r2c', processes = 3, asarray = True, box = eu.r2cboxfromr2c(r2c, xybox = kwargs.get('xybox')), start = kwargs.get('start'), stop = kwargs.get('stop')))
+				a = eu.r2cfile()
+				eu.r2cfromr2c(a, 'a.r2c', asarray = True, processes = 1, **kwargs)
+				b = eu.r2cfile()
+				eu.r2cfromr2c(b, 'a.r2c', asarray = True, processes = 3, **kwargs)
+				for x in [r2c, b]:
+					np.testing.assert_array_equal(x.attr[0].AttributeData, a.attr[0].AttributeData)
+					np.testing.assert_array_equal(x.attr[0].FrameTimes, a.attr[0].FrameTimes)
+					self.assertEqual((x.grid.xCount, x.grid.yCount), (a.grid.xCount, a.grid.yCount))
+			b = eu.r2cfile()
+			eu.r2cfromr2c(b, 'a.r2c', processes = 3)
+			self.assertEqual(list(b.attr[0].AttributeData.index), list(np.array(times, dtype = 'datetime64[ns]')))
+			np.testing.assert_array_equal(np.stack(b.attr[0].AttributeData['Values']), frames)
+		finally:
+			eu.R2CPARALLELMINSIZE = minsize
+
+	# Small files are read serially.
+	def test_minsize(self):
+		makemultiframefile('a.r2c')
+		r2c = eu.r2cfile()
+		eu.r2cgridfromr2c(r2c, 'a.r2c')
+		r2c.attr.append(eu.r2cattribute())
+		self.assertFalse(eu.r2cattributedatafromr2cparallel(r2c, 'a.r2c', processes = 3))
+
+# Cache files of 'r2c' format files.
+class r2ccache(testcase):
+	def setUp(self):
+		testcase.setUp(self)
+		self.reads = 0
+		self.settings = (eu.r2cattributedatafromfile, eu.R2CDTYPE, eu.R2CCACHEDIR, eu.R2CCACHEMAXSIZE)
+		read = eu.r2cattributedatafromfile
+		def counter(*args, **kwargs):
+			self.reads += 1
+			return read(*args, **kwargs)
+		eu.r2cattributedatafromfile = counter
+	def tearDown(self):
+		(eu.r2cattributedatafromfile, eu.R2CDTYPE, eu.R2CCACHEDIR, eu.R2CCACHEMAXSIZE) = self.settings
+		testcase.tearDown(self)
+
+	# Read the file using the cache; returns the first attribute.
+	def read(self, fpath, **kwargs):
+		r2c = eu.r2cfile()
+		eu.r2cfromr2c(r2c, fpath, cache = True, asarray = True, **kwargs)
+		return r2c.attr[0]
+
+	# Multi-frame data are loaded from the cache and can be modified without changing the cache.
+	def test_hit(self):
+		(frames, times) = makemultiframefile('a.r2c')
+		np.testing.assert_array_equal(self.read('a.r2c').AttributeData, frames)
+		self.assertTrue(path.isfile('a.r2c.r2ccache.npz') and path.isfile('a.r2c.r2ccache.npy'))
+		a = self.read('a.r2c')
+		self.assertEqual(self.reads, 1)
+		np.testing.assert_array_equal(a.AttributeData, frames)
+		np.testing.assert_array_equal(a.FrameTimes, np.array(times, dtype = 'datetime64[s]'))
+		a.AttributeData[0] = -1.0
+		np.testing.assert_array_equal(self.read('a.r2c').AttributeData, frames)
+		a = self.read('a.r2c', start = times[2], stop = times[5], xybox = (1, 3, 0, 2))
+		np.testing.assert_array_equal(a.AttributeData, frames[2:5, 1:3, 0:2])
+		self.assertEqual(self.reads, 1)
+
+	# Single-frame attributes are loaded from the cache by name and box.
+	def test_singleframe(self):
+		r2c = makesingleframefile('a.r2c')
+		self.read('a.r2c')
+		a = self.read('a.r2c', attributes = ['Elev'], xybox = (2, 5, 1, 3))
+		self.assertEqual(self.reads, 1)
+		self.assertEqual(a.AttributeName, 'Elev')
+		np.testing.assert_array_equal(a.AttributeData, r2c.attr[1].AttributeData[2:5, 1:3])
+
+	# The cache is not used if the file is modified or 'R2CDTYPE' is changed.
+	def test_invalidation(self):
+		(frames, times) = makemultiframefile('a.r2c')
+		self.read('a.r2c')
+		st = os.stat('a.r2c')
+		os.utime('a.r2c', ns = (st.st_atime_ns, st.st_mtime_ns + 1000000000))
+		self.read('a.r2c')
+		self.assertEqual(self.reads, 2)
+		makemultiframefile('a.r2c')
+		with open('a.r2c', 'a') as f:
+			f.write(':Frame 31 31 "2002/01/02 06:00:00.000"\n' + ('1.0 ' + '2.0 '*(NX - 1) + '\n')*NY + ':EndFrame\n')
+		a = self.read('a.r2c')
+		self.assertEqual(self.reads, 3)
+		self.assertEqual(a.FrameCount, NFRAMES + 1)
+		eu.R2CDTYPE = np.float32
+		a = self.read('a.r2c')
+		self.assertEqual(self.reads, 4)
+		self.assertEqual(a.AttributeData.dtype, np.float32)
+		self.read('a.r2c')
+		self.assertEqual(self.reads, 4)
+
+	# Cache files in 'R2CCACHEDIR' are removed, least recently used first, if their size exceeds 'R2CCACHEMAXSIZE'.
+	def test_evict(self):
+		makemultiframefile('a.r2c')
+		makemultiframefile('b.r2c')
+		eu.R2CCACHEDIR = 'cache'
+		eu.R2CCACHEMAXSIZE = None
+		self.read('a.r2c')
+		size = sum([os.stat(path.join('cache', n)).st_size for n in os.listdir('cache')])
+		eu.R2CCACHEMAXSIZE = size
+		st = os.stat(path.join('cache', os.listdir('cache')[0]))
+		for n in os.listdir('cache'):
+			os.utime(path.join('cache', n), ns = (st.st_atime_ns, st.st_mtime_ns - 1000000000))
+		self.read('b.r2c')
+		self.assertEqual(sorted([n.split('.')[0] for n in os.listdir('cache')]), ['b', 'b'])
+		self.assertFalse(path.exists('a.r2c.r2ccache.npz'))
+
+# Frame writer that raises an error (see 'r2cbackground').
+class failingwriter(object):
+	def writeframe(self, data, frametime):
+		raise ValueError('failed to write the frame')
+
+# Writing frames of 'r2c' format files on background threads.
+class r2cbackground(testcase):
+
+	# Frames are written in order to each file and copied when queued.
+	def test_order(self):
+		(frames, times) = makeframes()
+		makemultiframefile('a.r2c')
+		writers = [eu.r2cframewriter(makemultiframe(), 'b%d.r2c' % i) for i in range(4)]
+		data = np.zeros((NX, NY))
+		with eu.r2cbackgroundwriter(threads = 2, maxsize = 2) as b:
+			for i in range(NFRAMES):
+				for w in writers:
+					data[:] = frames[i]
+					b.writeframe(w, data, times[i])
+					data[:] = -1.0
+			self.assertEqual(sorted([b.assigned[id(w)] for w in writers]), [0, 0, 1, 1])
+		for w in writers:
+			w.close()
+		with open('a.r2c', 'rb') as f:
+			a = f.read().split(b':EndHeader')[1]
+		for i in range(4):
+			with open('b%d.r2c' % i, 'rb') as f:
+				self.assertEqual(f.read().split(b':EndHeader')[1], a)
+
+	# 'flush' waits for the queued frames to be written.
+	def test_flush(self):
+		(frames, times) = makeframes()
+		with eu.r2cframewriter(makemultiframe(), 'a.r2c') as w, eu.r2cbackgroundwriter(threads = 2) as b:
+			for i in range(NFRAMES):
+				b.writeframe(w, frames[i], times[i])
+			b.flush()
+			self.assertEqual(w.r2c.attr[0].FrameCount, NFRAMES)
+			w.flush()
+			self.assertEqual(eu.r2cframeindexscan('a.r2c').FrameOffsets.size, NFRAMES)
+
+	# The exception of a thread is raised again by 'writeframe', 'flush', and 'close'.
+	def test_error(self):
+		(frames, times) = makeframes()
+		b = eu.r2cbackgroundwriter()
+		b.writeframe(failingwriter(), frames[0], times[0])
+		b.queues[0].join()
+		with self.assertRaises(ValueError):
+			b.writeframe(failingwriter(), frames[1], times[1])
+		with self.assertRaises(ValueError):
+			b.flush()
+		with self.assertRaises(ValueError):
+			b.close()
+		b = eu.r2cbackgroundwriter(threads = 2)
+		for i in range(NFRAMES):
+			b.writeframe(failingwriter(), frames[i], times[i])
+		b.close(raiseerror = False)
+		self.assertIsInstance(b.error, ValueError)
+		with self.assertRaises(KeyError):
+			with eu.r2cbackgroundwriter() as b:
+				b.writeframe(failingwriter(), frames[0], times[0])
+				raise KeyError('conversion failed')
+
+# Resuming multi-frame 'r2c' format files.
+class r2cresume(testcase):
+
+	# A partial frame is removed by 'r2cfiletrimframes' and writing resumes to the same file as writing all of the frames.
+	def test_trim(self):
+		(frames, times) = makeframes()
+		makemultiframefile('a.r2c')
+		with eu.r2cframewriter(makemultiframe(), 'b.r2c') as w:
+			w.writeframes(frames[:12], times[:12])
+		with open('b.r2c', 'a') as f:
+			f.write(':Frame 13 13 "2002/01/01 12:00:00.000"\n1.0 2.0')
+		self.assertEqual(eu.r2cfiletrimframes('b.r2c'), 12)
+		self.assertEqual(eu.r2cfiletrimframes('b.r2c', 10), 10)
+		r2c = makemultiframe()
+		r2c.attr[0].FrameCount = 10
+		with eu.r2cframewriter(r2c, 'b.r2c', resume = True) as w:
+			w.writeframes(frames[10:], times[10:])
+		with open('a.r2c', 'rb') as a, open('b.r2c', 'rb') as b:
+			self.assertEqual(a.read(), b.read())
+
+	# Files with no complete frame are trimmed to the header; missing files and files with incomplete headers return -1.
+	def test_empty(self):
+		(frames, times) = makeframes()
+		makemultiframefile('a.r2c')
+		self.assertEqual(eu.r2cfiletrimframes('a.r2c', 0), 0)
+		with eu.r2cframewriter(makemultiframe(), 'b.r2c') as w:
+			pass
+		with open('a.r2c', 'rb') as a, open('b.r2c', 'rb') as b:
+			self.assertEqual(a.read(), b.read())
+		with open('b.r2c', 'a') as f:
+			f.write(':Frame 1 1 "2002/01/01 00:00:00.000"\n')
+		self.assertEqual(eu.r2cfiletrimframes('b.r2c'), 0)
+		with open('c.r2c', 'w') as f:
+			f.write(':FileType r2c ASCII EnSim 1.0\n')
+		self.assertEqual(eu.r2cfiletrimframes('c.r2c'), -1)
+		self.assertEqual(eu.r2cfiletrimframes('none.r2c'), -1)
+
+	# Checkpoint files are read back as strings; missing files return 'None'.
+	def test_checkpoint(self):
+		checkpoint = {'StartTime': datetime(2002, 1, 1).isoformat(), 'FrameCount': '12', 'OutputFiles': 'a.r2c b.seq'}
+		eu.checkpointfilecreate('checkpoint.txt', checkpoint)
+		self.assertEqual(eu.checkpointfromfile('checkpoint.txt'), checkpoint)
+		self.assertFalse(path.isfile('checkpoint.txt.tmp'))
+		self.assertIsNone(eu.checkpointfromfile('none.txt'))
+
+# Writing 'tb0' format files.
+class tb0writers(testcase):
+
+	# Return a 'tb0' object with float32, float64, integer, and list columns of 'records' records.
+	def columns(self, records):
+		rng = np.random.default_rng(4)
+		tb0 = eu.tb0file()
+		tb0.cols.append(eu.tb0column(ColumnName = 'F4'))
+		tb0.cols.append(eu.tb0column(ColumnName = 'F8'))
+		tb0.cols.append(eu.tb0column(ColumnName = 'I8', ColumnType = 'integer'))
+		tb0.cols.append(eu.tb0column(ColumnName = 'L'))
+		tb0.cols[0].ColumnData = np.append(np.array([0.1, 1.0e-7, 123456.7], dtype = np.float32), rng.random(records).astype(np.float32))
+		tb0.cols[1].ColumnData = np.append([0.1, 1.0/3.0, 1.0e20], rng.random(records))
+		tb0.cols[2].ColumnData = np.arange(records + 3)
+		tb0.cols[3].ColumnData = [0.1*i for i in range(records + 3)]
+		tb0.RecordCount = records + 3
+		return tb0
+
+	# Return the records of a 'tb0' format file (the text after the header).
+	def records(self, fpath):
+		with open(fpath, 'r') as f:
+			return f.read().split(':EndHeader\n')[1]
+
+	# The default format prints each value as 'str' of the value, as each value was printed individually (e.g., '0.1' for float32 values).
+	def test_str(self):
+		tb0 = self.columns(100)
+		eu.tb0filecreateheader(tb0, 'a.tb0')
+		eu.tb0fileappendcolumndata(tb0, 'a.tb0')
+		expected = ''
+		for n in range(tb0.RecordCount):
+			expected += ''.join([' ' + str(a.ColumnData[n]) for a in tb0.cols]) + '\n'
+		self.assertEqual(self.records('a.tb0'), expected)
+		self.assertTrue(self.records('a.tb0').startswith(' 0.1 0.1 0 0.0\n 1e-07 0.3333333333333333 1 0.1\n'))
+
+	# Records written by 'tb0recordwriter' in blocks and as single records give the same file as 'tb0fileappendcolumndata' (for columns of the same type).
+	def test_recordwriter(self):
+		tb0 = self.columns(100)
+		for fmt in ['%s', '%.3f', '%g']:
+			for cols in [[0], [1, 3], [2]]:
+				b = eu.tb0file()
+				b.cols = [tb0.cols[i] for i in cols]
+				eu.tb0filecreateheader(b, 'b.tb0')
+				b.RecordCount = tb0.RecordCount
+				eu.tb0fileappendcolumndata(b, 'b.tb0', fmt)
+				data = np.stack([tb0.cols[i].ColumnData for i in cols], axis = 1)
+				with eu.tb0recordwriter(b, 'c.tb0', fmt = fmt) as w:
+					w.appendrecords(data[:40])
+					w.appendrecords(data[40])
+					w.appendrecords(data[41:])
+				self.assertEqual(b.RecordCount, tb0.RecordCount)
+				self.assertEqual(self.records('c.tb0'), self.records('b.tb0'))
+
+# Reading the columns of 'tb0' format files.
+class tb0columns(testcase):
+
+	# Columns written by 'tb0recordwriter' and 'tb0fileappendcolumndata' are read back with their meta information.
+	def test_roundtrip(self):
+		data = maketb0file('a.tb0', 50, 1)
+		tb0 = eu.tb0file()
+		eu.tb0columnsfromtb0(tb0, 'a.tb0')
+		self.assertEqual(tb0.RecordCount, 50)
+		self.assertEqual([c.ColumnName for c in tb0.cols], ['S1', 'S2', 'S3'])
+		self.assertEqual([c.ColumnType for c in tb0.cols], ['float']*3)
+		self.assertEqual([c.ColumnUnits for c in tb0.cols], ['none']*3)
+		self.assertEqual([(c.ColumnLocationX, c.ColumnLocationY) for c in tb0.cols], [(-100.0, 45.0), (-99.0, 45.0), (-98.0, 45.0)])
+		np.testing.assert_array_equal(tb0.Data, data)
+		for (i, c) in enumerate(tb0.cols):
+			np.testing.assert_array_equal(c.ColumnData, data[:, i])
+			self.assertTrue(np.shares_memory(c.ColumnData, tb0.Data))
+		eu.tb0fileappendcolumndata(tb0, 'a.tb0', '%g')
+		eu.tb0columnsfromtb0(tb0, 'a.tb0')
+		self.assertEqual(tb0.RecordCount, 100)
+		np.testing.assert_array_equal(tb0.Data[50:], data)
+
+	# Quoted names and units, comments and blank lines, other header lines, and an incomplete last record.
+	def test_header(self):
+		with open('a.tb0', 'w') as f:
+			f.write('########################################\n:FileType tb0 ASCII EnSim 1.0\n#\n:Name Streamflow\n:StartTime 2002/01/01 00:00:00.000\n#\n')
+			f.write(':ColumnMetaData\n:ColumnName "Bow River" Elbow\n:ColumnType float integer\n:ColumnUnits "m**3 s**-1" m\n')
+			f.write(':ColumnLocationX -115.5 -114.25\n:ColumnLocationY 51.0 50.75\n:EndColumnMetaData\n#\n:EndHeader\n')
+			f.write(' 1.5 2\n# comment 8 9\n\n 3.5 4 # 10\n 5.5 6\n 7.5\n')
+		tb0 = eu.tb0file()
+		eu.tb0columnsfromtb0(tb0, 'a.tb0')
+		self.assertEqual([c.ColumnName for c in tb0.cols], ['Bow River', 'Elbow'])
+		self.assertEqual([c.ColumnType for c in tb0.cols], ['float', 'integer'])
+		self.assertEqual([c.ColumnUnits for c in tb0.cols], ['m**3 s**-1', 'm'])
+		self.assertEqual([c.ColumnLocationX for c in tb0.cols], [-115.5, -114.25])
+		self.assertEqual(tb0.RecordCount, 3)
+		np.testing.assert_array_equal(tb0.Data, [[1.5, 2.0], [3.5, 4.0], [5.5, 6.0]])
+
+	# The lesser number of columns is used if the attributes disagree; files without columns stop with an error.
+	def test_columns(self):
+		with open('a.tb0', 'w') as f:
+			f.write(':ColumnName A B C\n:ColumnType float float\n:EndHeader\n 1 2\n 3 4\n')
+		tb0 = eu.tb0file()
+		out = io.StringIO()
+		with contextlib.redirect_stdout(out):
+			eu.tb0columnsfromtb0(tb0, 'a.tb0')
+		self.assertIn('WARNING', out.getvalue())
+		self.assertEqual([c.ColumnName for c in tb0.cols], ['A', 'B'])
+		np.testing.assert_array_equal(tb0.Data, [[1.0, 2.0], [3.0, 4.0]])
+		with open('b.tb0', 'w') as f:
+			f.write(':EndHeader\n 1 2\n')
+		with self.assertRaises(SystemExit), contextlib.redirect_stdout(io.StringIO()):
+			eu.tb0columnsfromtb0(tb0, 'b.tb0')
+
+# Time-stamps and time slices of 'tb0' format files.
+class tb0time(testcase):
+
+	# Read the meta information and columns of a 'tb0' format file.
+	def read(self, fpath):
+		tb0 = eu.tb0file()
+		eu.tb0metafromtb0(tb0, fpath)
+		eu.tb0columnsfromtb0(tb0, fpath)
+		return tb0
+
+	# Time-stamps are derived from 'StartTime' and 'DeltaT' in hours or 'HH:MM:SS'.
+	def test_timeindex(self):
+		for (deltat, step) in [(1, timedelta(hours = 1)), (3, timedelta(hours = 3)), (timedelta(minutes = 30), timedelta(minutes = 30))]:
+			maketb0file('a.tb0', 48, deltat)
+			tb0 = self.read('a.tb0')
+			self.assertEqual(tb0.meta.DeltaT, deltat)
+			expected = np.array([datetime(2002, 1, 1, 6) + step*i for i in range(48)], dtype = 'datetime64[s]')
+			np.testing.assert_array_equal(eu.tb0timeindex(tb0), expected)
+
+	# The time-stamps do not require the data and are rebuilt if the meta information or number of records changes.
+	def test_meta(self):
+		maketb0file('a.tb0', 48, 1)
+		tb0 = eu.tb0file()
+		eu.tb0metafromtb0(tb0, 'a.tb0')
+		self.assertEqual(eu.tb0timeindex(tb0, 10)[-1], np.datetime64('2002-01-01T15:00:00'))
+		index = eu.tb0timeindex(tb0, 10)
+		self.assertIs(eu.tb0timeindex(tb0, 10), index)
+		tb0.meta.DeltaT = 2
+		self.assertEqual(eu.tb0timeindex(tb0, 10)[-1], np.datetime64('2002-01-02T00:00:00'))
+		self.assertEqual(eu.tb0timeindex(tb0, 12).size, 12)
+		tb0.meta.DeltaT = 0
+		with self.assertRaises(SystemExit), contextlib.redirect_stdout(io.StringIO()):
+			eu.tb0timeindex(tb0)
+
+	# Slices select the records from 'start' to before 'stop' as views of the data.
+	def test_slice(self):
+		data = maketb0file('a.tb0', 48, 1)
+		tb0 = self.read('a.tb0')
+		s = eu.tb0slice(tb0, datetime(2002, 1, 1, 10), np.datetime64('2002-01-02T00:00:00'))
+		self.assertEqual((s.start, s.stop), (4, 18))
+		np.testing.assert_array_equal(tb0.Data[s], data[4:18])
+		self.assertTrue(np.shares_memory(tb0.cols[1].ColumnData[s], tb0.Data))
+		s = eu.tb0slice(tb0, '2002/01/01 10:30:00')
+		self.assertEqual((s.start, s.stop), (5, 48))
+		s = eu.tb0slice(tb0, stop = datetime(2001, 1, 1))
+		self.assertEqual((s.start, s.stop), (0, 0))
+		s = eu.tb0slice(tb0, datetime(2003, 1, 1), datetime(2002, 1, 1))
+		self.assertEqual((s.start, s.stop), (48, 48))
+
+# MESH binary sequential ('seq') format files.
+class seqframes(testcase):
+
+	# Frames written by 'seqframewriter' read back by 'r2cattributefromseq' match the frames for the cells of 'Rank' (other cells are zero).
+	def test_roundtrip(self):
+		(frames, times) = makeframes()
+		rank = np.zeros((NX, NY), dtype = int)
+		rank[1:5, 1:4] = np.arange(1, 13).reshape(4, 3)
+		with eu.seqframewriter(makemultiframe(), 'qo.seq', rank) as w:
+			w.writeframe(frames[0], times[0])
+			w.writeframes(frames[1:], times[1:])
+		r2c = makegrid()
+		eu.r2cattributefromseq(r2c, 'qo.seq', rank)
+		self.assertEqual(r2c.attr[0].FrameCount, NFRAMES)
+		expected = np.where(rank > 0, frames, 0.0)
+		np.testing.assert_allclose(r2c.attr[0].AttributeData, expected, rtol = 1.0e-6)
+		(frame_numbers, values) = eu.seqframesfromseq('qo.seq', 12)
+		np.testing.assert_array_equal(frame_numbers, np.arange(1, NFRAMES + 1))
+
+	# A partial frame is removed by 'seqfiletrimframes' and writing resumes to the same file as writing all of the frames.
+	def test_trim(self):
+		(frames, times) = makeframes()
+		with eu.seqframewriter(makemultiframe(), 'a.seq') as w:
+			w.writeframes(frames, times)
+		with eu.seqframewriter(makemultiframe(), 'b.seq') as w:
+			w.writeframes(frames[:12], times[:12])
+		with open('b.seq', 'ab') as f:
+			f.write(b'\x04\x00\x00\x00\x0d\x00')
+		self.assertEqual(eu.seqfiletrimframes('b.seq', NX*NY), 12)
+		self.assertEqual(eu.seqfiletrimframes('b.seq', NX*NY, 10), 10)
+		self.assertEqual(eu.seqfiletrimframes('none.seq', NX*NY), -1)
+		r2c = makemultiframe()
+		r2c.attr[0].FrameCount = 10
+		with eu.seqframewriter(r2c, 'b.seq', resume = True) as w:
+			w.writeframes(frames[10:], times[10:])
+		with open('a.seq', 'rb') as a, open('b.seq', 'rb') as b:
+			self.assertEqual(a.read(), b.read())
+
+	# Batches are only flushed when they cross a multiple of 'FlushFrames' (as single frames).
+	def test_flushframes(self):
+		(frames, times) = makeframes()
+		with eu.seqframewriter(makemultiframe(), 'a.seq', flushframes = 10) as w:
+			w.f = flushcounter(w.f)
+			for i in range(0, NFRAMES, 3):
+				w.writeframes(frames[i:(i + 3)], times[i:(i + 3)])
+			self.assertEqual(w.f.count, 3)
+			w.f = w.f.f
+
+# Grid and interpolation set caches of standard file (fst) records (using 'stubrmn').
+class fstcaches(stubrmntestcase):
+
+	# Grids are read once for records with the same grid descriptors.
+	def test_grids(self):
+		a = eu.fstgridfromrecord(1, makerecord('TT', 1.0))
+		b = eu.fstgridfromrecord(2, makerecord('PR', 2.0, etiket = 'R2', ip2 = 6))
+		c = eu.fstgridfromrecord(1, makerecord('TT', 1.0, ig1 = 9))
+		self.assertIs(a, b)
+		self.assertIsNot(a, c)
+		self.assertEqual([x for x in eu.rmn.calls if (x[0] == 'readGrid')], [('readGrid', 1), ('readGrid', 9)])
+		stats = eu.fstcachestats()
+		self.assertEqual((stats['GridHits'], stats['GridMisses']), (1, 2))
+
+	# Interpolation sets and degrees are only set when they change.
+	def test_ezscint(self):
+		(m, a, b) = ({'id': 1}, {'id': 2}, {'id': 3})
+		for (x, y) in [(m, a), (m, a), (m, b), (m, b), (m, a)]:
+			eu.fstezdefset(x, y)
+		self.assertEqual([x for x in eu.rmn.calls if (x[0] == 'ezdefset')], [('ezdefset', 1, 2), ('ezdefset', 1, 3), ('ezdefset', 1, 2)])
+		stats = eu.fstcachestats()
+		self.assertEqual((stats['SetHits'], stats['SetMisses']), (2, 3))
+		for intpopt in [0, 0, 1, 1, 0]:
+			eu.fstezsetinterp(intpopt)
+		self.assertEqual([x for x in eu.rmn.calls if (x[0] == 'ezsetopt')], [('ezsetopt', 0), ('ezsetopt', 1), ('ezsetopt', 0)])
+
+	# The counters are copied; clearing the caches releases the grids and resets the state and counters.
+	def test_clear(self):
+		eu.fstgridfromrecord(1, makerecord('TT', 1.0))
+		eu.fstgridfromrecord(1, makerecord('TT', 1.0, ig1 = 9))
+		eu.fstezdefset({'id': 1}, {'id': 101})
+		eu.fstezsetinterp(1)
+		eu.FSTWEIGHTSCACHE['key'] = None
+		stats = eu.fstcachestats()
+		stats['GridMisses'] = 0
+		self.assertEqual(eu.fstcachestats()['GridMisses'], 2)
+		eu.fstcacheclear()
+		self.assertEqual(sorted([x for x in eu.rmn.calls if (x[0] == 'gdrls')]), [('gdrls', 101), ('gdrls', 102)])
+		self.assertEqual((eu.FSTGRIDCACHE, eu.FSTWEIGHTSCACHE), ({}, {}))
+		self.assertEqual(eu.FSTEZSTATE, {'Set': None, 'InterpDegree': None})
+		self.assertEqual(set(eu.fstcachestats().values()), {0})
+		eu.fstezdefset({'id': 1}, {'id': 101})
+		eu.fstezsetinterp(1)
+		self.assertEqual([x[0] for x in eu.rmn.calls[-2:]], ['ezdefset', 'ezsetopt'])
+
+# Reading records of standard files (fst) by key (using 'stubrmn').
+class fstrecords(stubrmntestcase):
+	def setUp(self):
+		stubrmntestcase.setUp(self)
+		eu.rmn.records = [
+			makerecord('QO1', 1.0, ip3 = 1),
+			makerecord('QO1', 2.0, ip3 = 2),
+			makerecord('ELEV', 3.0, etiket = 'GEOPHY'),
+			makerecord('ELEV', 4.0, etiket = 'CONSTANT'),
+			makerecord('VF', 5.0, ip1 = 1199),
+			makerecord('VF', 6.0, ip1 = 1198),
+			dict(makerecord('J1', 7.0, ip1 = 1195), ip1alt = 95300000)]
+
+	# Keys resolve to the first matching record; blank 'fstetiket' and 'ip' of -1 match any value.
+	def test_keys(self):
+		keys = [eu.fstrecordkey('QO1', fstip3 = 2), eu.fstrecordkey('qo1 '), eu.fstrecordkey('ELEV', fstetiket = 'CONSTANT'), eu.fstrecordkey('ELEV'), eu.fstrecordkey('VF', fstip1 = 1198), eu.fstrecordkey('J1', fstip1 = 95300000), eu.fstrecordkey('QO1')]
+		records = eu.fstrecordsfromfst(1, keys)
+		self.assertEqual(len(records), 6)
+		self.assertEqual([float(records[k]['d'][0, 0]) for k in keys], [2.0, 1.0, 4.0, 3.0, 6.0, 7.0, 1.0])
+		self.assertIs(records[keys[1]], records[keys[6]])
+		self.assertEqual([x for x in eu.rmn.calls if (x[0] == 'fstluk')], [('fstluk', 0), ('fstluk', 1), ('fstluk', 2), ('fstluk', 3), ('fstluk', 5), ('fstluk', 6)])
+		self.assertEqual([x for x in eu.rmn.calls if (x[0] == 'fstinf')], [('fstinf', 'J1')])
+
+	# Fields are interpolated once per record and grid.
+	def test_fields(self):
+		keys = [eu.fstrecordkey('QO1', fstip3 = 1), eu.fstrecordkey('QO1', fstip3 = 2), eu.fstrecordkey('ELEV', fstetiket = 'CONSTANT'), eu.fstrecordkey('QO1')]
+		fields = eu.r2cfieldsfromkeys({'id': 1}, 1, keys, intpopt = 0, weights = False)
+		self.assertEqual([float(fields[k][0, 0]) for k in keys], [1.0, 2.0, 4.0, 1.0])
+		self.assertEqual(len([x for x in eu.rmn.calls if (x[0] == 'ezsint')]), 3)
+		self.assertEqual(len([x for x in eu.rmn.calls if (x[0] == 'readGrid')]), 1)
+
+	# Missing records are all listed before 'exit()' is called.
+	def test_missing(self):
+		out = io.StringIO()
+		with self.assertRaises(SystemExit), contextlib.redirect_stdout(out):
+			eu.r2cfieldsfromkeys({'id': 1}, 1, [eu.fstrecordkey('QO1', fstip3 = 3), eu.fstrecordkey('ELEV'), eu.fstrecordkey('ELEV', fstetiket = 'OTHER')], weights = False)
+		self.assertIn('Unable to fetch 2 record(s)', out.getvalue())
+		self.assertIn("nomvar = 'QO1', etiket = '', ip1 = -1, ip2 = -1, ip3 = 3", out.getvalue())
+		self.assertIn("nomvar = 'ELEV', etiket = 'OTHER'", out.getvalue())
+		self.assertEqual([x for x in eu.rmn.calls if (x[0] in ['fstluk', 'ezsint'])], [])
+
+# Grouping of conversion fields by the records they are derived from.
+class fstplans(unittest.TestCase):
+
+	# Fields are grouped by family, '_DEACC', 'fstetiket', 'fstip1', and 'intpopt', in order of the first field of each group.
+	def test_groups(self):
+		fields = [
+			eu.r2cconversionfieldfromfst('a.r2c', 'TT', 'T', fstip1 = 12000),
+			eu.r2cconversionfieldfromfst('b.r2c', 'UU', 'U', fstip1 = 12000),
+			eu.r2cconversionfieldfromfst('c.r2c', 'PR_deacc', 'PR'),
+			eu.r2cconversionfieldfromfst('d.r2c', 'VV', 'V', fstip1 = 12000),
+			eu.r2cconversionfieldfromfst('e.r2c', 'UV', 'UV', fstip1 = 12000),
+			eu.r2cconversionfieldfromfst('f.r2c', 'PR', 'PR'),
+			eu.r2cconversionfieldfromfst('g.r2c', 'PR_DEACC', 'PR rate', constmul = 2.0),
+			eu.r2cconversionfieldfromfst('h.r2c', 'TT', 'T', fstip1 = 11950),
+			eu.r2cconversionfieldfromfst('i.r2c', 'TT', 'T', fstip1 = 12000, fstetiket = 'OTHER'),
+			eu.r2cconversionfieldfromfst('j.r2c', 'TT', 'T', fstip1 = 12000, intpopt = 1),
+			eu.r2cconversionfieldfromfst('k.r2c', 'TT', 'T', fstip1 = 12000, fpathsystem = 'rdps'),
+			eu.r2cconversionfieldfromfst('l.r2c', 'WD', 'WD', fstip1 = 12000)]
+		plan = eu.fstconversionplan(fields)
+		self.assertEqual(plan, [[0], [1, 3, 4, 11], [2, 6], [5], [7], [8], [9], [10]])
+		self.assertEqual(eu.fstnomvarsfromplan(fields, plan[1]), ['uu', 'vv', 'uv', 'wd'])
+		self.assertEqual(eu.fstnomvarsfromplan(fields, plan[2]), ['pr'])
+		self.assertEqual(eu.fstconversionplan([]), [])
+
+	# Fields without 'fpathsystem' (e.g., 'conversionfieldfromfst' of the extract_points scripts) are grouped in the same way.
+	def test_nosystem(self):
+		fields = [
+			eu.conversionfieldfromfst('a.csv', 'PR', 'PR'),
+			eu.conversionfieldfromfst('b.csv', 'TT', 'T', fstip1 = 12000),
+			eu.conversionfieldfromfst('c.csv', 'PR', 'PR mm', constmul = 1000.0),
+			eu.conversionfieldfromfst('d.csv', 'VV', 'V', fstip1 = 12000),
+			eu.conversionfieldfromfst('e.csv', 'UU', 'U', fstip1 = 12000)]
+		self.assertFalse(hasattr(fields[0], 'fpathsystem'))
+		plan = eu.fstconversionplan(fields)
+		self.assertEqual(plan, [[0, 2], [1], [3, 4]])
+		self.assertEqual(eu.fstnomvarsfromplan(fields, plan[2]), ['vv', 'uu'])
+
+# Interpolation weights of standard file (fst) records (the parts that do not require rpnpy).
+class fstinterpweights(testcase):
+	def tearDown(self):
+		eu.fstcacheclear()
+		testcase.tearDown(self)
+
+	# Bilinear weights of points inside the source grid interpolate a linear field exactly.
+	def test_positions(self):
+		(ni, nj) = (6, 4)
+		field = np.add.outer(np.arange(ni)*2.0, np.arange(nj)*3.0)
+		x = np.array([[0.0, 2.5], [4.25, 5.0]])
+		y = np.array([[0.0, 1.5], [2.75, 3.0]])
+		w = eu.fstweightsfrompositions(x, y, ni, nj, 'linear', x.shape)
+		np.testing.assert_allclose(eu.fstweightsapply(w, field), x*2.0 + y*3.0, rtol = 1.0e-6)
+		w = eu.fstweightsfrompositions(x, y, ni, nj, 'nearest', x.shape)
+		np.testing.assert_array_equal(eu.fstweightsapply(w, field), np.floor(x + 0.5)*2.0 + np.floor(y + 0.5)*3.0)
+
+	# Points outside the source grid (e.g., between the last and first columns of a global grid) are not clipped to the edge; the weights are rejected.
+	def test_outside(self):
+		(ni, nj) = (8, 4)
+		for (x, y) in [([1.0, ni - 0.5], [1.0, 1.0]), ([-0.25, 1.0], [1.0, 1.0]), ([1.0, 1.0], [1.0, nj - 0.9]), ([1.0, np.nan], [1.0, 1.0])]:
+			for degree in ['nearest', 'linear']:
+				self.assertIsNone(eu.fstweightsfrompositions(x, y, ni, nj, degree, (2, )))
+
+	# Rejected weights in the cache are counted as rejected and not as hits.
+	def test_rejectedstats(self):
+		grid = {'id': 1, 'grtyp': 'L', 'ni': 3, 'nj': 2}
+		rec = {'grtyp': 'L', 'ig1': 1, 'ig2': 2, 'ig3': 3, 'ig4': 4, 'ni': 8, 'nj': 4}
+		eu.FSTWEIGHTSCACHE[eu.fstweightskey(grid, rec, 'linear')] = None
+		self.assertIsNone(eu.fstweightsfromrecord(grid, None, rec, 'linear'))
+		self.assertIsNone(eu.fstweightsfromrecord(grid, None, rec, 'linear'))
+		stats = eu.fstcachestats()
+		self.assertEqual((stats['WeightsHits'], stats['WeightsMisses'], stats['WeightsRejected']), (0, 0, 2))
+
+# netCDF format files.
+@unittest.skipUnless(eu.RUNNETCDF, 'netCDF4 is not loaded')
+class ncroundtrip(testcase):
+
+	# Frames written by 'ncframewriter' read back by 'r2cfromnc' match the frames of the 'r2c' format file.
+	def test_framewriter(self):
+		(frames, times) = makemultiframefile('qo.r2c')
+		r2c = makemultiframe()
+		with eu.ncframewriter(r2c, 'qo.nc', chunkframes = 8) as w:
+			for i in range(10):
+				w.writeframe(frames[i], times[i])
+			w.writeframes(frames[10:], times[10:])
+		a = eu.r2cfile()
+		eu.r2cfromr2c(a, 'qo.r2c', asarray = True)
+		b = eu.r2cfile()
+		eu.r2cfromnc(b, 'qo.nc', asarray = True)
+		self.assertEqual(b.attr[0].FrameCount, NFRAMES)
+		np.testing.assert_allclose(b.attr[0].AttributeData, a.attr[0].AttributeData, rtol = 1.0e-6)
+		np.testing.assert_array_equal(b.attr[0].FrameTimes, a.attr[0].FrameTimes)
+		for k in ['xOrigin', 'yOrigin', 'xCount', 'yCount', 'xDelta', 'yDelta']:
+			self.assertEqual(getattr(b.grid, k), getattr(a.grid, k))
+
+	# Selective reads ('start', 'stop', 'xybox') match the same selection of the 'r2c' format file.
+	def test_selection(self):
+		(frames, times) = makemultiframefile('qo.r2c')
+		r2c = makemultiframe()
+		with eu.ncframewriter(r2c, 'qo.nc') as w:
+			w.writeframes(frames, times)
+		a = eu.r2cfile()
+		eu.r2cfromr2c(a, 'qo.r2c', asarray = True, start = times[5], stop = times[9], xybox = (1, 4, 2, 5))
+		b = eu.r2cfile()
+		eu.r2cfromnc(b, 'qo.nc', asarray = True, start = times[5], stop = times[9], xybox = (1, 4, 2, 5))
+		np.testing.assert_allclose(b.attr[0].AttributeData, a.attr[0].AttributeData, rtol = 1.0e-6)
+		self.assertEqual((b.grid.xOrigin, b.grid.xCount, b.grid.yCount), (a.grid.xOrigin, a.grid.xCount, a.grid.yCount))
+
+	# Single-frame attributes written by 'ncfilefromr2c' keep their names, types, units, and data.
+	def test_singleframe(self):
+		r2c = makesingleframefile('dd.r2c')
+		eu.ncfilefromr2c(r2c, 'dd.nc')
+		b = eu.r2cfile()
+		eu.r2cfromnc(b, 'dd.nc')
+		self.assertEqual([a.AttributeName for a in b.attr], [a.AttributeName for a in r2c.attr])
+		self.assertEqual([a.AttributeUnits for a in b.attr], [a.AttributeUnits for a in r2c.attr])
+		for (a0, a1) in zip(r2c.attr, b.attr):
+			np.testing.assert_allclose(a1.AttributeData, a0.AttributeData, rtol = 1.0e-6)
+
+	# Frames written to several 'ncframewriter' objects on background threads are all written on the same thread.
+	def test_backgroundwriter(self):
+		(frames, times) = makeframes()
+		writers = [eu.ncframewriter(makemultiframe(), 'qo%d.nc' % i) for i in range(3)]
+		with eu.r2cbackgroundwriter(threads = 3) as b:
+			for i in range(NFRAMES):
+				for w in writers:
+					b.writeframe(w, frames[i], times[i])
+			self.assertEqual(len(set([b.assigned[id(w)] for w in writers])), 1)
+		for w in writers:
+			w.close()
+		for i in range(3):
+			a = eu.r2cfile()
+			eu.r2cfromnc(a, 'qo%d.nc' % i, asarray = True)
+			np.testing.assert_allclose(a.attr[0].AttributeData, frames, rtol = 1.0e-6)
+
+if (__name__ == '__main__'):
+	unittest.main()
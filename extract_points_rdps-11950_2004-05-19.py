@@ -146,6 +146,9 @@ for i, c in enumerate(PROCESS_FSTCONVFLD):
 	c.fid.writerow(np.concatenate((['Latitude'], la)))
 	c.fid.writerow(np.concatenate((['Longitude'], lo)))
 
+# Group the fields by the records they are derived from.
+PLAN = fstconversionplan(PROCESS_FSTCONVFLD)
+
 # Iterate time loop.
 while FST_CURRENT_TIME < FST_STOP_BEFORE_TIME:
 
@@ -160,15 +163,23 @@ while FST_CURRENT_TIME < FST_STOP_BEFORE_TIME:
 	print('%s %s' % (strftime('%Y/%m/%d %H:%M:%S', FRIENDLY_TIME.timetuple()), fstsrc['path']))
 
 	# Records.
-	for i, c in enumerate(PROCESS_FSTCONVFLD):
-		rec = latlonvalfromfst(la, lo, fstfid, fstnomvar = c.fstnomvar.lower().replace('_deacc', ''), fstetiket = c.fstetiket, fstip1 = c.fstip1, fstip2 = fstsrc['ip2'], intpopt = c.intpopt, constmul = c.constmul, constadd = c.constadd, constrmax = c.constrmax, constrmin = c.constrmin)
+	# Fields derived from the same records are read and interpolated once (see 'fstconversionplan').
+	for group in PLAN:
+		c = PROCESS_FSTCONVFLD[group[0]]
+		fstnomvars = fstnomvarsfromplan(PROCESS_FSTCONVFLD, group)
+		fields = latlonvalsfromfst(la, lo, fstfid, fstnomvars, fstetiket = c.fstetiket, fstip1 = c.fstip1, fstip2 = fstsrc['ip2'], intpopt = c.intpopt)
 		if ('_deacc' in c.fstnomvar.lower()):
 			p0src = utctimetofstfname_rdps(FST_CURRENT_TIME, fstsrc['ip2'] - int(FST_RECORD_MINUTES/60))
 			p0fid = rmn.fstopenall(p0src['path'])
-			p0 = latlonvalfromfst(la, lo, p0fid, fstnomvar = c.fstnomvar.lower().replace('_deacc', ''), fstetiket = c.fstetiket, fstip1 = c.fstip1, fstip2 = p0src['ip2'], intpopt = c.intpopt, constmul = c.constmul, constadd = c.constadd, constrmax = c.constrmax, constrmin = c.constrmin)
+			p0fields = latlonvalsfromfst(la, lo, p0fid, fstnomvars, fstetiket = c.fstetiket, fstip1 = c.fstip1, fstip2 = p0src['ip2'], intpopt = c.intpopt)
 			rmn.fstcloseall(p0fid)
-			rec = rec - p0
-		c.fid.writerow(np.concatenate(([str(FRIENDLY_TIME)], rec)))
+		for i in group:
+			c = PROCESS_FSTCONVFLD[i]
+			n = c.fstnomvar.lower().replace('_deacc', '')
+			rec = fstfieldtransform(fields[n], c.constmul, c.constadd, c.constrmax, c.constrmin)
+			if ('_deacc' in c.fstnomvar.lower()):
+				rec = rec - fstfieldtransform(p0fields[n], c.constmul, c.constadd, c.constrmax, c.constrmin)
+			c.fid.writerow(np.concatenate(([str(FRIENDLY_TIME)], rec)))
 
 	# Close the file.
 	rmn.fstcloseall(fstfid)
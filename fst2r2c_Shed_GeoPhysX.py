@@ -23,11 +23,12 @@ def push_error(m):
 
 # r2c structures, core fst-related routines imported from ensim_utils.
 
-def r2cfromgemphyvf(fstmatchgrid, fstfid, r2c, PHYSVF_ip1):
+def r2cfromgemphyvf(fstmatchgrid, fields, r2c, PHYSVF_ip1):
 
 	# Fetch land covers from GemPhysX.
 	# Special covers: glaciers, wetlands, water, impervious.
 	# Separate keywords in case smart filtering is added in a future version of MESH.
+	# The records must be present in 'fields' (see 'r2cfieldsfromkeys').
 
 	SumClass = np.zeros((r2c.grid.xCount, r2c.grid.yCount))
 	if (not r2c.meta is None):
@@ -87,7 +88,7 @@ def r2cfromgemphyvf(fstmatchgrid, fstfid, r2c, PHYSVF_ip1):
 		elif (ip1 == 1174):
 			a.AttributeName = 'mixed shrubs'
 		a.AttributeName = ('VF %d ' % ip1) + a.AttributeName + ''
-		r2cattributefromfst(a, fstmatchgrid, fstfid, fstnomvar = 'VF', fstip1 = ip1)
+		r2cattributefromfield(a, fstmatchgrid, fields[fstrecordkey('VF', fstip1 = ip1)])
 		r2c.attr.append(a)
 		SumClass += a.AttributeData
 		if (not r2c.meta is None):
@@ -95,21 +96,22 @@ def r2cfromgemphyvf(fstmatchgrid, fstfid, r2c, PHYSVF_ip1):
 	if (not np.all(SumClass > 0.0)):
 		push_message('WARNING: Cells exist in the basin where the total fraction of land cover is zero.')
 
-def r2cfromgemphysoil(fstmatchgrid, fstfid, r2c, PHYSSOIL_ip1):
+def r2cfromgemphysoil(fstmatchgrid, fields, r2c, PHYSSOIL_ip1):
 
 	# Fetch soil texture for soil layers.
+	# The records must be present in 'fields' (see 'r2cfieldsfromkeys').
 
 	i = 1
 	for ip1 in PHYSSOIL_ip1:
 		a = r2cattribute(AttributeName = ('SAND %d' % i), AttributeUnits = '%')
-		r2cattributefromfst(a, fstmatchgrid, fstfid, fstnomvar = 'J1', fstip1 = ip1)
+		r2cattributefromfield(a, fstmatchgrid, fields[fstrecordkey('J1', fstip1 = ip1)])
 		r2c.attr.append(a)
 		i += 1
 
 	i = 1
 	for ip1 in PHYSSOIL_ip1:
 		a = r2cattribute(AttributeName = ('CLAY %d' % i), AttributeUnits = '%')
-		r2cattributefromfst(a, fstmatchgrid, fstfid = fstfid, fstnomvar = 'J2', fstip1 = ip1)
+		r2cattributefromfield(a, fstmatchgrid, fields[fstrecordkey('J2', fstip1 = ip1)])
 		r2c.attr.append(a)
 		i += 1
 
@@ -150,40 +152,45 @@ def r2ccreateshed(fstmatchgrid, fpathr2cout, fshed = None, fphys = None, PHYSVF_
 		#    (if two outlets exist in the basin, the last two RANK in the stride will have NEXT == 0).
 		#    Typically, the number of grids in the basin < the total number of grids (but this is not always the case converting from fst).
 
+		# Read the records together in one pass of the file.
+
+		keys = [ fstrecordkey(n) for n in [ 'RANK', 'NEXT', 'DA', 'BKFL', 'CSLP', 'ELEV', 'CLEN', 'CHNL', 'REAC', 'GRDA', 'VEGL', 'VEGH' ] ]
+		shed = r2cfieldsfromkeys(fstmatchgrid, fshed, keys)
+
 		Rank = r2cattribute(AttributeName = 'Rank', AttributeType = 'integer')
-		r2cattributefromfst(Rank, fstmatchgrid, fstfid = fshed, fstnomvar = 'RANK')
+		r2cattributefromfield(Rank, fstmatchgrid, shed[fstrecordkey('RANK')])
 		r2c.attr.append(Rank)
 		if (not np.count_nonzero(np.unique(Rank.AttributeData)) == np.amax(Rank.AttributeData)):
 			push_message('WARNING: The succession of ranked cells is not continuous. This condition will not crash Watroute, but may result in lost water.')
 
 		Next = r2cattribute(AttributeName = 'Next', AttributeType = 'integer')
-		r2cattributefromfst(Next, fstmatchgrid, fstfid = fshed, fstnomvar = 'NEXT')
+		r2cattributefromfield(Next, fstmatchgrid, shed[fstrecordkey('NEXT')])
 		r2c.attr.append(Next)
 		if (not np.any(Next.AttributeData[Rank.AttributeData > 0] == 0)):
 			push_message('WARNING: No outlets exist in the basin. Outlets are cells with Rank where Next is zero. This condition is undesirable, but will not crash Watroute.')
 
 		a = r2cattribute(AttributeName = 'DA', AttributeUnits = 'km**2')
-		r2cattributefromfst(a, fstmatchgrid, fstfid = fshed, fstnomvar = 'DA')
+		r2cattributefromfield(a, fstmatchgrid, shed[fstrecordkey('DA')])
 		r2c.attr.append(a)
 		if (not np.any(a.AttributeData[Next.AttributeData > 0] > 0.0)):
 			push_message('WARNING: Cells exist in the basin where drainage area is zero. This condition will trigger divide-by-zero traps in Watroute.')
 
 		a = r2cattribute(AttributeName = 'Bankfull', AttributeUnits = 'm**3')
-		r2cattributefromfst(a, fstmatchgrid, fstfid = fshed, fstnomvar = 'BKFL')
+		r2cattributefromfield(a, fstmatchgrid, shed[fstrecordkey('BKFL')])
 		r2c.attr.append(a)
 
 		a = r2cattribute(AttributeName = 'ChnlSlope', AttributeUnits = 'm m**-1')
-		r2cattributefromfst(a, fstmatchgrid, fstfid = fshed, fstnomvar = 'CSLP')
+		r2cattributefromfield(a, fstmatchgrid, shed[fstrecordkey('CSLP')])
 		r2c.attr.append(a)
 		if (not np.any(a.AttributeData[Next.AttributeData > 0] > 0.0)):
 			push_message('WARNING: Cells exist in the basin where channel slope is zero. This condition may cause undesirable results in Watroute.')
 
 		Elev = r2cattribute(AttributeName = 'Elev', AttributeUnits = 'm')
-		r2cattributefromfst(Elev, fstmatchgrid, fstfid = fshed, fstnomvar = 'ELEV')
+		r2cattributefromfield(Elev, fstmatchgrid, shed[fstrecordkey('ELEV')])
 		r2c.attr.append(Elev)
 
 		a = r2cattribute(AttributeName = 'ChnlLength', AttributeUnits = 'm')
-		r2cattributefromfst(a, fstmatchgrid, fstfid = fshed, fstnomvar = 'CLEN')
+		r2cattributefromfield(a, fstmatchgrid, shed[fstrecordkey('CLEN')])
 		r2c.attr.append(a)
 		if (not np.any(a.AttributeData[Next.AttributeData > 0] > 0.0)):
 			push_message('WARNING: Cells exist in the basin where channel length is zero. This condition may cause undesirable results in Watroute.')
@@ -192,27 +199,27 @@ def r2ccreateshed(fstmatchgrid, fpathr2cout, fshed = None, fphys = None, PHYSVF_
 		r2c.attr.append(IAK)
 
 		a = r2cattribute(AttributeName = 'Chnl', AttributeType = 'integer')
-		r2cattributefromfst(a, fstmatchgrid, fstfid = fshed, fstnomvar = 'CHNL')
+		r2cattributefromfield(a, fstmatchgrid, shed[fstrecordkey('CHNL')])
 		a.AttributeData = a.AttributeData.astype(int)
 		r2c.attr.append(a)
 
 		a = r2cattribute(AttributeName = 'Reach', AttributeType = 'integer')
-		r2cattributefromfst(a, fstmatchgrid, fstfid = fshed, fstnomvar = 'REAC')
+		r2cattributefromfield(a, fstmatchgrid, shed[fstrecordkey('REAC')])
 		a.AttributeData = a.AttributeData.astype(int)
 		r2c.attr.append(a)
 
 		GridArea = r2cattribute(AttributeName = 'GridArea', AttributeUnits = 'm**2')
-		r2cattributefromfst(GridArea, fstmatchgrid, fstfid = fshed, fstnomvar = 'GRDA')
+		r2cattributefromfield(GridArea, fstmatchgrid, shed[fstrecordkey('GRDA')])
 		r2c.attr.append(GridArea)
 		if (not np.any(GridArea.AttributeData[Next.AttributeData > 0] > 0.0)):
 			push_message('WARNING: Cells exist in the basin where grid area is zero. This condition will nullify results and may trigger divide-by-zero traps in the land surface scheme.')
 
 		a = r2cattribute(AttributeName = 'VegLow', AttributeUnits = 'fraction')
-		r2cattributefromfst(a, fstmatchgrid, fstfid = fshed, fstnomvar = 'VEGL')
+		r2cattributefromfield(a, fstmatchgrid, shed[fstrecordkey('VEGL')])
 		r2c.attr.append(a)
 
 		a = r2cattribute(AttributeName = 'VegHigh', AttributeUnits = 'fraction')
-		r2cattributefromfst(a, fstmatchgrid, fstfid = fshed, fstnomvar = 'VEGH')
+		r2cattributefromfield(a, fstmatchgrid, shed[fstrecordkey('VEGH')])
 		r2c.attr.append(a)
 
 	else:
@@ -282,14 +289,21 @@ def r2ccreateshed(fstmatchgrid, fpathr2cout, fshed = None, fphys = None, PHYSVF_
 
 	if (not fphys is None):
 
+		# Read the records together in one pass of the file.
+
+		keys = [ fstrecordkey('SLOP') ]
+		if (PHYSVF_MODE == 'gru'):
+			keys += [ fstrecordkey('VF', fstip1 = ip1) for ip1 in PHYSVF_ip1 ]
+		phys = r2cfieldsfromkeys(fstmatchgrid, fphys, keys)
+
 		a = r2cattribute(AttributeName = 'IntSlope', AttributeUnits = 'm m**-1')
-		r2cattributefromfst(a, fstmatchgrid, fstfid = fphys, fstnomvar = 'SLOP')
+		r2cattributefromfield(a, fstmatchgrid, phys[fstrecordkey('SLOP')])
 		r2c.attr.append(a)
 
 		# PHYSVF_MODE = 'gru'
 
 		if (PHYSVF_MODE == 'gru'):
-			r2cfromgemphyvf(fstmatchgrid, fphys, r2c, PHYSVF_ip1)
+			r2cfromgemphyvf(fstmatchgrid, phys, r2c, PHYSVF_ip1)
 
 		# PHYSVF_MODE = 'frac'
 
@@ -346,85 +360,100 @@ def r2ccreateparam(fstmatchgrid, fpathr2cout, fshed = None, fphys = None, PHYSVF
 
 	if (not fshed is None):
 
+		# Read the records together in one pass of the file.
+
+		keys = [ fstrecordkey('NEXT') ]
+		keys += [ fstrecordkey(n, fstetiket = 'CONSTANT') for n in [ 'R2N', 'R1N', 'MNDR', 'WIDP', 'AA2', 'AA3', 'AA4', 'PWR', 'FLZ' ] ]
+		shed = r2cfieldsfromkeys(fstmatchgrid, fshed, keys)
+
 		# Next is used in sanity checks not saved to the parameter file.
 
 		Next = r2cattribute()
-		r2cattributefromfst(Next, fstmatchgrid, fstfid = fshed, fstnomvar = 'NEXT')
+		r2cattributefromfield(Next, fstmatchgrid, shed[fstrecordkey('NEXT')])
 
 		# Watroute channel routing parameters.
 
 		a = r2cattribute(AttributeName = 'R2N')
-		r2cattributefromfst(a, fstmatchgrid, fstfid = fshed, fstnomvar = 'R2N', fstetiket = 'CONSTANT')
+		r2cattributefromfield(a, fstmatchgrid, shed[fstrecordkey('R2N', fstetiket = 'CONSTANT')])
 		r2c.attr.append(a)
 		if (not np.any(a.AttributeData[Next.AttributeData > 0] > 0.0)):
 			push_message('WARNING: Cells exist in the basin where R2N is not assigned. This condition may cause undesirable results in Watroute.')
 
 		a = r2cattribute(AttributeName = 'R1N')
-		r2cattributefromfst(a, fstmatchgrid, fstfid = fshed, fstnomvar = 'R1N', fstetiket = 'CONSTANT')
+		r2cattributefromfield(a, fstmatchgrid, shed[fstrecordkey('R1N', fstetiket = 'CONSTANT')])
 		r2c.attr.append(a)
 		if (not np.any(a.AttributeData[Next.AttributeData > 0] > 0.0)):
 			push_message('WARNING: Cells exist in the basin where R1N is not assigned. This condition may cause undesirable results in Watroute.')
 
 		a = r2cattribute(AttributeName = 'MNDR')
-		r2cattributefromfst(a, fstmatchgrid, fstfid = fshed, fstnomvar = 'MNDR', fstetiket = 'CONSTANT')
+		r2cattributefromfield(a, fstmatchgrid, shed[fstrecordkey('MNDR', fstetiket = 'CONSTANT')])
 		r2c.attr.append(a)
 
 		a = r2cattribute(AttributeName = 'WIDEP')
-		r2cattributefromfst(a, fstmatchgrid, fstfid = fshed, fstnomvar = 'WIDP', fstetiket = 'CONSTANT')
+		r2cattributefromfield(a, fstmatchgrid, shed[fstrecordkey('WIDP', fstetiket = 'CONSTANT')])
 		r2c.attr.append(a)
 
 		a = r2cattribute(AttributeName = 'AA2')
-		r2cattributefromfst(a, fstmatchgrid, fstfid = fshed, fstnomvar = 'AA2', fstetiket = 'CONSTANT')
+		r2cattributefromfield(a, fstmatchgrid, shed[fstrecordkey('AA2', fstetiket = 'CONSTANT')])
 		r2c.attr.append(a)
 
 		a = r2cattribute(AttributeName = 'AA3')
-		r2cattributefromfst(a, fstmatchgrid, fstfid = fshed, fstnomvar = 'AA3', fstetiket = 'CONSTANT')
+		r2cattributefromfield(a, fstmatchgrid, shed[fstrecordkey('AA3', fstetiket = 'CONSTANT')])
 		r2c.attr.append(a)
 
 		a = r2cattribute(AttributeName = 'AA4')
-		r2cattributefromfst(a, fstmatchgrid, fstfid = fshed, fstnomvar = 'AA4', fstetiket = 'CONSTANT')
+		r2cattributefromfield(a, fstmatchgrid, shed[fstrecordkey('AA4', fstetiket = 'CONSTANT')])
 		r2c.attr.append(a)
 
 		# Baseflow parameters.
 
 		a = r2cattribute(AttributeName = 'PWR')
-		r2cattributefromfst(a, fstmatchgrid, fstfid = fshed, fstnomvar = 'PWR', fstetiket = 'CONSTANT')
+		r2cattributefromfield(a, fstmatchgrid, shed[fstrecordkey('PWR', fstetiket = 'CONSTANT')])
 		r2c.attr.append(a)
 
 		a = r2cattribute(AttributeName = 'FLZ')
-		r2cattributefromfst(a, fstmatchgrid, fstfid = fshed, fstnomvar = 'FLZ', fstetiket = 'CONSTANT')
+		r2cattributefromfield(a, fstmatchgrid, shed[fstrecordkey('FLZ', fstetiket = 'CONSTANT')])
 		r2c.attr.append(a)
 
 	if (not fphys is None):
 
+		# Read the records together in one pass of the file.
+
+		keys = []
+		if (PHYSVF_MODE == 'frac'):
+			keys += [ fstrecordkey('VF', fstip1 = ip1) for ip1 in PHYSVF_ip1 ]
+		keys += [ fstrecordkey(n) for n in [ 'ZP', 'DRND', 'SLOP' ] ]
+		keys += [ fstrecordkey(n, fstip1 = ip1) for n in [ 'J1', 'J2' ] for ip1 in PHYSSOIL_ip1 ]
+		phys = r2cfieldsfromkeys(fstmatchgrid, fphys, keys)
+
 		# PHYSVF_MODE = 'frac'
 
 		if (PHYSVF_MODE == 'frac'):
-			r2cfromgemphyvf(fstmatchgrid, fphys, r2c, PHYSVF_ip1)
+			r2cfromgemphyvf(fstmatchgrid, phys, r2c, PHYSVF_ip1)
 
 		# Canopy parameters.
 
 		a = r2cattribute(AttributeName = 'LNZ0', AttributeUnits = 'ln(m)')
-		r2cattributefromfst(a, fstmatchgrid, fstfid = fphys, fstnomvar = 'ZP')
+		r2cattributefromfield(a, fstmatchgrid, phys[fstrecordkey('ZP')])
 		r2c.attr.append(a)
 
 		# Interflow parameters.
 
 		a = r2cattribute(AttributeName = 'DDEN', AttributeUnits = 'km km**-2')
-		r2cattributefromfst(a, fstmatchgrid, fstfid = fphys, fstnomvar = 'DRND', constmul = 1000.0)
+		r2cattributefromfield(a, fstmatchgrid, phys[fstrecordkey('DRND')], constmul = 1000.0)
 		r2c.attr.append(a)
 		if (not np.all(a > 0.0)):
 			push_message('WARNING: Cells exist in the basin where drainage density is zero. This condition may trigger bad math traps in WATROF/WATDRN.')
 
 		a = r2cattribute(AttributeName = 'XSLP', AttributeUnits = 'm m**-1')
-		r2cattributefromfst(a, fstmatchgrid, fstfid = fphys, fstnomvar = 'SLOP')
+		r2cattributefromfield(a, fstmatchgrid, phys[fstrecordkey('SLOP')])
 		r2c.attr.append(a)
 		if (not np.all(a > 0.0)):
 			push_message('WARNING: Cells exist in the basin where soil slope is zero. This condition may trigger bad math traps in WATROF/WATDRN.')
 
 		# Fetch soil texture for soil layers.
 
-		r2cfromgemphysoil(fstmatchgrid, fphys, r2c, PHYSSOIL_ip1)
+		r2cfromgemphysoil(fstmatchgrid, phys, r2c, PHYSSOIL_ip1)
 
 	# Write output.
 
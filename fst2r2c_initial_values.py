@@ -26,24 +26,30 @@ def push_error(m):
 def r2cfromflowinit(fstmatchgrid, fstfid, r2c):
 
 	# Fetch initial flow fields including routing states.
+	# The records are read together in one pass of the file.
+
+	keys = [ fstrecordkey('QI1', fstip1 = 0) ]
+	keys += [ fstrecordkey('QO1', fstip3 = ip3) for ip3 in [ 0, 10, 20, 30 ] ]
+	keys += [ fstrecordkey(n, fstip1 = 0) for n in [ 'STOR', 'OVER', 'LZS' ] ]
+	fields = r2cfieldsfromkeys(fstmatchgrid, fstfid, keys)
 
 	a = r2cattribute(AttributeName = 'QI1', AttributeUnits = 'i\"m**3 s**-1\"')
-	r2cattributefromfst(a, fstmatchgrid, fstfid, fstnomvar = 'QI1', fstip1 = 0)
+	r2cattributefromfield(a, fstmatchgrid, fields[fstrecordkey('QI1', fstip1 = 0)])
 	r2c.attr.append(a)
 	for ip3 in [ 0, 10, 20, 30 ]:
 		a = r2cattribute(AttributeName = 'QO1', AttributeUnits = '\"m**3 s**-1\"')
 		if (ip3 != 0):
 			a.AttributeName = ('\"QO1 %d\"' % ip3)
-		r2cattributefromfst(a, fstmatchgrid, fstfid, fstnomvar = 'QO1', fstip3 = ip3)
+		r2cattributefromfield(a, fstmatchgrid, fields[fstrecordkey('QO1', fstip3 = ip3)])
 		r2c.attr.append(a)
 	a = r2cattribute(AttributeName = 'STOR', AttributeUnits = 'm**3')
-	r2cattributefromfst(a, fstmatchgrid, fstfid, fstnomvar = 'STOR', fstip1 = 0)
+	r2cattributefromfield(a, fstmatchgrid, fields[fstrecordkey('STOR', fstip1 = 0)])
 	r2c.attr.append(a)
 	a = r2cattribute(AttributeName = 'OVER', AttributeUnits = 'm**2')
-	r2cattributefromfst(a, fstmatchgrid, fstfid, fstnomvar = 'OVER', fstip1 = 0)
+	r2cattributefromfield(a, fstmatchgrid, fields[fstrecordkey('OVER', fstip1 = 0)])
 	r2c.attr.append(a)
 	a = r2cattribute(AttributeName = 'LZS', AttributeUnits = 'mm')
-	r2cattributefromfst(a, fstmatchgrid, fstfid, fstnomvar = 'LZS', fstip1 = 0)
+	r2cattributefromfield(a, fstmatchgrid, fields[fstrecordkey('LZS', fstip1 = 0)])
 	r2c.attr.append(a)
 
 def r2ccreatevalinit(fstmatchgrid, fpathr2cout, fst = None):
@@ -237,13 +237,40 @@ def utctimetofstfname_capa(utctime):
 
 	return { 'path' : fstsrcpath, 'ip2' : filetime.hour }
 
+def utctimetofstfname(fpathsystem, utctime, ip2 = None):
+
+	# Source file by system.
+	# 'ip2' is only passed if provided.
+
+	if (fpathsystem in ['rdps', 'gem', 'rdrs']):
+		f = utctimetofstfname_rdps
+	elif (fpathsystem in ['gdps']):
+		f = utctimetofstfname_gdps
+	elif (fpathsystem in ['hrdps']):
+		f = utctimetofstfname_hrdps
+	elif (fpathsystem in ['rdpa', 'capa']):
+		f = utctimetofstfname_capa
+	else:
+		print('ERROR: Unknown system path \'%s\'.' % fpathsystem)
+		exit()
+	if (ip2 is None):
+		return f(utctime)
+	else:
+		return f(utctime, ip2)
+
 def r2ctimeseriesfromfst(
 	R2CSHED_INFILE = 'MESH_drainage_database.r2c',
 	PROCESS_FSTCONVFLD = [],
 	START_TIME = datetime(2004, 10, 1, tzinfo = tz.tzutc()),
 	STOP_BEFORE_TIME = datetime(2012, 10, 1, tzinfo = tz.tzutc()),
 	I_COUNTER = 1,
-	LOCAL_TIME_ZONE = tz.tzutc()
+	LOCAL_TIME_ZONE = tz.tzutc(),
+	WRITER_THREADS = 1,
+	RESUME = False,
+	CHECKPOINT_FILE = 'fst2r2c_timeseries.checkpoint',
+	CHECKPOINT_FRAMES = 24,
+	WEIGHTS = False,
+	WEIGHTS_DIR = None
 	):
 
 	# Stop if input file is not defined.
@@ -304,82 +331,154 @@ def r2ctimeseriesfromfst(
 		PROCESS_FSTCONVFLD.append(r2cconversionfieldfromfst(fpathr2cout = 'basin_precip_acc.r2c', fstnomvar = 'PR_deacc', AttributeName = 'Total_precipitation_accumulated_at_surface', AttributeUnits = 'kg m**-2', constmul = 1000.0))
 		PROCESS_FSTCONVFLD.append(r2cconversionfieldfromfst(fpathr2cout = 'basin_precip_rate.r2c', fstnomvar = 'PR_deacc', AttributeName = 'Total_precipitation_rate_at_surface', AttributeUnits = '\"kg m**-2 s**-1\"', constmul = 0.27777777777777777778*(60.0/FST_RECORD_MINUTES)))
 
-	# Read header from r2c input file and create r2c output files.
+	# Read header from r2c input file.
+	# Read 'Rank' from the r2c input file for 'seq' output files (only active cells are written).
+
+	rank = None
+	if (any([c.fileformat == 'seq' for c in PROCESS_FSTCONVFLD])):
+		shed = r2cfile()
+		r2cfromr2c(shed, R2CSHED_INFILE, readmeta = False, attributes = ['Rank'])
+		if (not shed.attr):
+			print('ERROR: \'Rank\' is required for \'seq\' output files but does not exist in the shed file. The script cannot continue.')
+			exit()
+		rank = shed.attr[0].AttributeData
+	for c in PROCESS_FSTCONVFLD:
+		r2cgridfromr2c(c.r2c, R2CSHED_INFILE)
 
+	# Resume from existing output files.
+	# The output files are trimmed after the last frame complete in all of the files; processing continues from the next time-step.
+	# Processing stops if only some of the output files contain frames (e.g., if a file was removed or the fields were changed).
+	# The checkpoint file must have been written for the same period and fields.
+
+	I_COUNTER_START = I_COUNTER
+	frames = 0
+	if (RESUME):
+		checkpoint = checkpointfromfile(CHECKPOINT_FILE)
+		if (not checkpoint is None):
+			if (checkpoint.get('StartTime') != START_TIME.isoformat() or checkpoint.get('StartCounter') != str(I_COUNTER) or checkpoint.get('OutputFiles') != ' '.join([c.fpathr2cout for c in PROCESS_FSTCONVFLD])):
+				print('ERROR: The checkpoint file \'%s\' was written for a different start time or fields. The script cannot continue.' % CHECKPOINT_FILE)
+				exit()
+		counts = [filetrimframesfromfield(c, rank) for c in PROCESS_FSTCONVFLD]
+		if (max(counts) > 0 and min(counts) <= 0):
+			print('ERROR: Some of the output files are missing or contain no frames; the frames in the other files would be discarded. The script cannot continue.')
+			for c, n in zip(PROCESS_FSTCONVFLD, counts):
+				print('    %s: %s' % (c.fpathr2cout, ('%d frames' % n) if (n >= 0) else 'missing or incomplete header'))
+			exit()
+		frames = min(counts)
+		if (frames > 0):
+			for c in PROCESS_FSTCONVFLD:
+				filetrimframesfromfield(c, rank, frames)
+				c.r2c.attr[0].FrameCount = frames
+			if (not checkpoint is None and int(checkpoint.get('FrameCount', 0)) > frames):
+				print('WARNING: The output files contain fewer frames (%d) than recorded in the checkpoint file (%d).' % (frames, int(checkpoint['FrameCount'])))
+			FST_CURRENT_TIME = FST_START_TIME + dt.relativedelta(minutes = frames*FST_RECORD_MINUTES)
+			I_COUNTER += frames
+			print('REMARK: Resuming at frame %d.' % I_COUNTER)
+		else:
+			frames = 0
+
+	# Create r2c output files (or open the existing files to resume).
+	# The output files are kept open until processing has completed.
+
+	writers = []
 	for i, c in enumerate(PROCESS_FSTCONVFLD):
-		r2cgridfromr2c(c.r2c, R2CSHED_INFILE)
-		r2cfilecreateheader(c.r2c, c.fpathr2cout)
+		writers.append(framewriterfromfield(c, rank, resume = (frames > 0)))
 
 	# Iterate time loop.
-
-	fstopenpath = None
-	fstfid = None
-	p0openpath = None
-	p0fid = None
-	while FST_CURRENT_TIME < FST_STOP_BEFORE_TIME:
-
-		# Open file.
-
-#		fstsrc = utctimetofstfname_rdps(FST_CURRENT_TIME)
-#		fstsrc = utctimetofstfname_gem(FST_CURRENT_TIME)
-#		fstsrc = utctimetofstfname_capa(FST_CURRENT_TIME)
-#		fstfid = rmn.fstopenall(fstsrc['path'])
-
-		# Records.
-		# Add DST offset to print only standard time to file (to avoid irregular time-stamps).
-
-		FRIENDLY_TIME = FST_CURRENT_TIME.replace(tzinfo = None) + UTC_STD_OFFSET
-#		print('%s %s %s %03d' % (strftime('%Y/%m/%d %H:%M:%S', FRIENDLY_TIME.timetuple()), fstsrc['path'], 'ip2', fstsrc['ip2']))
-		print('INFO: Processing for datetime \'%s\'' % strftime('%Y/%m/%d %H:%M:%S', FRIENDLY_TIME.timetuple()))
-		for i, c in enumerate(PROCESS_FSTCONVFLD):
-			if (c.fpathsystem in ['rdps', 'gem']):
-				fstsrc = utctimetofstfname_rdps(FST_CURRENT_TIME)
-			elif (c.fpathsystem in ['gdps']):
-				fstsrc = utctimetofstfname_gdps(FST_CURRENT_TIME)
-			elif (c.fpathsystem in ['hrdps']):
-				fstsrc = utctimetofstfname_hrdps(FST_CURRENT_TIME)
-			elif (c.fpathsystem in ['rdpa', 'capa']):
-				fstsrc = utctimetofstfname_capa(FST_CURRENT_TIME)
-			elif (c.fpathsystem == 'rdrs'):
-				fstsrc = utctimetofstfname_rdps(FST_CURRENT_TIME)
-			else:
-				print('ERROR: Unknown system path \'%s\'.' % c.fpathsystem)
-				exit()
-			if (fstsrc['path'] != fstopenpath):
-				if (fstfid is not None):
-					rmn.fstcloseall(fstfid)
-				fstopenpath = fstsrc['path']
-				fstfid = rmn.fstopenall(fstsrc['path'])
-#			print('INFO: Processing \'%s\' for \'%s\' from %s with ip2 = %03d' % (c.fstnomvar, c.r2c.attr[0].AttributeName, fstsrc['path'], fstsrc['ip2']))
-			r2cattributefromfst(c.r2c.attr[0], fstmatchgrid, fstfid, fstnomvar = c.fstnomvar.upper().replace('_DEACC', ''), fstetiket = c.fstetiket, fstip1 = c.fstip1, fstip2 = fstsrc['ip2'], intpopt = c.intpopt, constmul = c.constmul, constadd = c.constadd, constrmax = c.constrmax, constrmin = c.constrmin)
-			if ('_DEACC' in c.fstnomvar.upper()):
-#				p0src = utctimetofstfname_gem(FST_CURRENT_TIME, fstsrc['ip2'] - int(FST_RECORD_MINUTES/60))
-				if (c.fpathsystem in ['rdps', 'gem']):
-					p0src = utctimetofstfname_rdps(FST_CURRENT_TIME, fstsrc['ip2'] - int(FST_RECORD_MINUTES/60))
-				elif (c.fpathsystem in ['gdps']):
-					p0src = utctimetofstfname_gdps(FST_CURRENT_TIME, fstsrc['ip2'] - int(FST_RECORD_MINUTES/60))
-				elif (c.fpathsystem in ['hrdps']):
-					p0src = utctimetofstfname_hrdps(FST_CURRENT_TIME, fstsrc['ip2'] - int(FST_RECORD_MINUTES/60))
-				elif (c.fpathsystem in ['rdpa', 'capa']):
-					p0src = utctimetofstfname_capa(FST_CURRENT_TIME, fstsrc['ip2'] - int(FST_RECORD_MINUTES/60))
-				elif (c.fpathsystem == 'rdrs'):
-					p0src = utctimetofstfname_rdps(FST_CURRENT_TIME, fstsrc['ip2'] - int(FST_RECORD_MINUTES/60))
-				if (p0src['path'] != p0openpath):
-					if (p0fid is not None):
-						rmn.fstcloseall(p0fid)
-					p0openpath = p0src['path']
-					p0fid = rmn.fstopenall(p0src['path'])
-				p1 = c.r2c.attr[0].AttributeData
-				r2cattributefromfst(c.r2c.attr[0], fstmatchgrid, p0fid, fstnomvar = c.fstnomvar.upper().replace('_DEACC', ''), fstetiket = c.fstetiket, fstip1 = c.fstip1, fstip2 = p0src['ip2'], intpopt = c.intpopt, constmul = c.constmul, constadd = c.constadd, constrmax = c.constrmax, constrmin = c.constrmin)
-#				rmn.fstcloseall(p0fid)
-				c.r2c.attr[0].AttributeData = p1 - c.r2c.attr[0].AttributeData
-			r2cfileappendmultiframe(c.r2c, c.fpathr2cout, I_COUNTER, FRIENDLY_TIME)
-#			rmn.fstcloseall(fstfid)
-
-		# Increment time and frame counter.
-
-		FST_CURRENT_TIME += dt.relativedelta(minutes = FST_RECORD_MINUTES)
-		I_COUNTER += 1
+	# Fields derived from the same records are grouped so that the records are read and interpolated once per time-step (see 'fstconversionplan').
+	# Frames are written on background threads while the next records are read and interpolated.
+	# Close the output files if processing stops.
+
+	plan = fstconversionplan(PROCESS_FSTCONVFLD)
+	background = r2cbackgroundwriter(threads = WRITER_THREADS)
+	try:
+		fstopenpath = None
+		fstfid = None
+		p0openpath = None
+		p0fid = None
+		while FST_CURRENT_TIME < FST_STOP_BEFORE_TIME:
+
+			# Open file.
+
+#			fstsrc = utctimetofstfname_rdps(FST_CURRENT_TIME)
+#			fstsrc = utctimetofstfname_gem(FST_CURRENT_TIME)
+#			fstsrc = utctimetofstfname_capa(FST_CURRENT_TIME)
+#			fstfid = rmn.fstopenall(fstsrc['path'])
+
+			# Records.
+			# Add DST offset to print only standard time to file (to avoid irregular time-stamps).
+
+			FRIENDLY_TIME = FST_CURRENT_TIME.replace(tzinfo = None) + UTC_STD_OFFSET
+#			print('%s %s %s %03d' % (strftime('%Y/%m/%d %H:%M:%S', FRIENDLY_TIME.timetuple()), fstsrc['path'], 'ip2', fstsrc['ip2']))
+			print('INFO: Processing for datetime \'%s\'' % strftime('%Y/%m/%d %H:%M:%S', FRIENDLY_TIME.timetuple()))
+			for group in plan:
+
+				# Read and interpolate the records of the group once (see 'fstconversionplan').
+
+				c = PROCESS_FSTCONVFLD[group[0]]
+				fstnomvars = fstnomvarsfromplan(PROCESS_FSTCONVFLD, group)
+				fstsrc = utctimetofstfname(c.fpathsystem, FST_CURRENT_TIME)
+				if (fstsrc['path'] != fstopenpath):
+					if (fstfid is not None):
+						rmn.fstcloseall(fstfid)
+					fstopenpath = fstsrc['path']
+					fstfid = rmn.fstopenall(fstsrc['path'])
+#				print('INFO: Processing \'%s\' for \'%s\' from %s with ip2 = %03d' % (c.fstnomvar, c.r2c.attr[0].AttributeName, fstsrc['path'], fstsrc['ip2']))
+				fields = r2cfieldsfromfst(fstmatchgrid, fstfid, fstnomvars, fstetiket = c.fstetiket, fstip1 = c.fstip1, fstip2 = fstsrc['ip2'], intpopt = c.intpopt, weights = WEIGHTS, weightsdir = WEIGHTS_DIR)
+				if ('_DEACC' in c.fstnomvar.upper()):
+#					p0src = utctimetofstfname_gem(FST_CURRENT_TIME, fstsrc['ip2'] - int(FST_RECORD_MINUTES/60))
+					p0src = utctimetofstfname(c.fpathsystem, FST_CURRENT_TIME, fstsrc['ip2'] - int(FST_RECORD_MINUTES/60))
+					if (p0src['path'] != p0openpath):
+						if (p0fid is not None):
+							rmn.fstcloseall(p0fid)
+						p0openpath = p0src['path']
+						p0fid = rmn.fstopenall(p0src['path'])
+					p0fields = r2cfieldsfromfst(fstmatchgrid, p0fid, fstnomvars, fstetiket = c.fstetiket, fstip1 = c.fstip1, fstip2 = p0src['ip2'], intpopt = c.intpopt, weights = WEIGHTS, weightsdir = WEIGHTS_DIR)
+#					rmn.fstcloseall(p0fid)
+
+				# Apply the transform of each field to the shared result.
+
+				for i in group:
+					c = PROCESS_FSTCONVFLD[i]
+					n = c.fstnomvar.lower().replace('_deacc', '')
+					r2cattributefromfield(c.r2c.attr[0], fstmatchgrid, fields[n], constmul = c.constmul, constadd = c.constadd, constrmax = c.constrmax, constrmin = c.constrmin)
+					if ('_DEACC' in c.fstnomvar.upper()):
+						p1 = c.r2c.attr[0].AttributeData
+						r2cattributefromfield(c.r2c.attr[0], fstmatchgrid, p0fields[n], constmul = c.constmul, constadd = c.constadd, constrmax = c.constrmax, constrmin = c.constrmin)
+						c.r2c.attr[0].AttributeData = p1 - c.r2c.attr[0].AttributeData
+					background.writeframe(writers[i], c.r2c.attr[0].AttributeData, FRIENDLY_TIME)
+#				rmn.fstcloseall(fstfid)
+
+			# Increment time and frame counter.
+
+			FST_CURRENT_TIME += dt.relativedelta(minutes = FST_RECORD_MINUTES)
+			I_COUNTER += 1
+
+			# Save a checkpoint every 'CHECKPOINT_FRAMES' frames and at the end of the period.
+			# Frames are written and flushed to the output files before the checkpoint file is written.
+
+			if (CHECKPOINT_FRAMES > 0 and ((I_COUNTER - I_COUNTER_START) % CHECKPOINT_FRAMES == 0 or FST_CURRENT_TIME >= FST_STOP_BEFORE_TIME)):
+				background.flush()
+				for w in writers:
+					w.flush()
+				checkpointfilecreate(CHECKPOINT_FILE, {
+					'StartTime': START_TIME.isoformat(),
+					'StartCounter': I_COUNTER_START,
+					'FrameCount': I_COUNTER - I_COUNTER_START,
+					'NextTime': strftime('%Y/%m/%d %H:%M:%S', (FST_CURRENT_TIME.replace(tzinfo = None) + UTC_STD_OFFSET).timetuple()),
+					'NextCounter': I_COUNTER,
+					'OutputFiles': ' '.join([c.fpathr2cout for c in PROCESS_FSTCONVFLD]) })
+
+	# Stop the background threads; an error of a thread is only raised if no other exception is being raised (as in 'r2cbackgroundwriter.__exit__').
+
+	except BaseException:
+		background.close(raiseerror = False)
+		raise
+	else:
+		background.close()
+	finally:
+		for w in writers:
+			w.close()
 
 	# Close file.
 
@@ -388,6 +487,10 @@ def r2ctimeseriesfromfst(
 		if (p0fid is not None):
 			rmn.fstcloseall(p0fid)
 	print('INFO: Processing has completed at frame %d.' % (I_COUNTER - 1))
+	stats = fstcachestats()
+	print('INFO: Grid cache: %d hits, %d misses; interpolation sets: %d hits, %d misses.' % (stats['GridHits'], stats['GridMisses'], stats['SetHits'], stats['SetMisses']))
+	if (WEIGHTS):
+		print('INFO: Interpolation weights: %d hits, %d misses; %d records interpolated by ezscint (weights rejected).' % (stats['WeightsHits'], stats['WeightsMisses'], stats['WeightsRejected']))
 
 	# Return counter.
 	return I_COUNTER
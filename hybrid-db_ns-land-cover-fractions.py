@@ -133,9 +133,7 @@ if (diagnostic_output != ''):
 # Read the input drainage database file.
 print("INFO: Reading %s." % input_drainage_database)
 drainage_r2c = r2cfile()
-r2cgridfromr2c(drainage_r2c, input_drainage_database)
-r2cmetafromr2c(drainage_r2c, input_drainage_database)
-r2cattributesfromr2c(drainage_r2c, input_drainage_database)
+r2cfromr2c(drainage_r2c, input_drainage_database)
 
 # Gather necessary attributes to derive information about the domain.
 drainage_rank = []
@@ -162,11 +160,10 @@ for i, a in enumerate(drainage_r2c.attr):
         drainage_ylat = drainage_r2c.attr[i].AttributeData
 
 # Read the input LSS database file.
+# Only the attributes used to map the domains are read from the file.
 print("INFO: Reading %s." % input_lss_database)
 lss_r2c = r2cfile()
-r2cgridfromr2c(lss_r2c, input_lss_database)
-r2cmetafromr2c(lss_r2c, input_lss_database)
-r2cattributesfromr2c(lss_r2c, input_lss_database)
+r2cfromr2c(lss_r2c, input_lss_database, attributes = ["Rank", "Longitude", "Latitude"])
 
 # Gather necessary attributes to derive information about the domain.
 lss_rank = []
@@ -327,10 +324,12 @@ if (diagnostic_output != ''):
     subbasins = np.zeros((drainage_r2c.grid.xCount, drainage_r2c.grid.yCount))
     for i, c in enumerate(cells):
         subbasins[np.where(drainage_rank == (i + 1))] = c.value
+
+    # Reuse the drainage database already read from file.
     r2c = r2cfile()
-    r2cgridfromr2c(r2c, input_drainage_database)
-    r2cmetafromr2c(r2c, input_drainage_database)
-    r2cattributesfromr2c(r2c, input_drainage_database)
+    r2c.meta = drainage_r2c.meta
+    r2c.grid = drainage_r2c.grid
+    r2c.attr = list(drainage_r2c.attr)
     r2c.attr.insert((len(r2c.attr) - r2c.meta.ClassCount), r2cattribute(AttributeName = 'GeophyDist', AttributeData = geophydist))
     r2c.attr.insert((len(r2c.attr) - r2c.meta.ClassCount), r2cattribute(AttributeName = 'RankGeophyToShd', AttributeType = 'integer', AttributeData = rankgeophytoshd))
     r2c.attr.insert((len(r2c.attr) - r2c.meta.ClassCount), r2cattribute(AttributeName = 'Subbasins', AttributeType = 'integer', AttributeData = subbasins))